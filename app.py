@@ -1,36 +1,98 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
-from werkzeug.security import generate_password_hash, check_password_hash
+# Load environment variables first: the modules below read their settings at import
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask, Request, render_template, request, jsonify, session, redirect, url_for, Response, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta
 import pytz
 import os
-import base64
-import mysql.connector
+import time
+import atexit
+import hmac
+import logging
+from db import ConnectionPool, config_from_env as db_config_from_env
+import hatch_summary
+from pagination import page_request
+from read_cache import ReadCache
+from passwords import PasswordHasher, StepUpTokens, HashingBusy
+from event_broker import EventBroker, EventTooLarge, CONTENT_TYPE as EVENTS_CONTENT_TYPE
+import tracing
+from metrics import registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE, COUNT_BUCKETS
+import migrate
 from functools import wraps
-from dotenv import load_dotenv
-# ML imports
-import tensorflow as tf
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import click
+# ML imports (TensorFlow is imported by model_manager when models load)
 import numpy as np
-from PIL import Image
-import io
+from inference import InferenceEngine, INFERENCE_MAX_BATCH_SIZE
+from model_backends import INFERENCE_BACKEND, BACKENDS, compare_backends
+from model_manager import ModelManager, MODEL_LOAD_MODE, MODEL_READY_TIMEOUT
+from prediction_cache import PredictionCache
+from image_upload import (
+    ImageUpload, UploadError, read_image_upload, read_bulk_images, BULK_UPLOAD_MAX_BYTES
+)
+from pending_predictions import PendingPredictionStore
+from image_store import ImageStore
+from image_writer import ImageWriter
+from camera_client import CameraUnavailable, client_for as camera_client_for
+from camera_stream import (
+    open_stream as open_camera_stream, all_stats as camera_stream_stats_all,
+    viewer_stats as camera_viewer_stats, CONTENT_TYPE as CAMERA_STREAM_CONTENT_TYPE
+)
+from capture_scheduler import CaptureScheduler, CAPTURE_SCHEDULER_ENABLED, CAPTURE_MIN_INTERVAL_MINUTES
+from preprocessing import (
+    preprocess, benchmark as benchmark_preprocessing, PIPELINE_VERSION as PREPROCESS_PIPELINE_VERSION
+)
 
 # Camera Configuration - ADD THIS SECTION
 CAMERA_ENABLED = os.environ.get('CAMERA_ENABLED', 'false').lower() == 'true'
 CAMERA_URL = os.environ.get('CAMERA_URL', '')
 
-print(f"📷 Camera enabled: {CAMERA_ENABLED}")
-if CAMERA_ENABLED:
-    print(f"📡 Camera URL: {CAMERA_URL}")
+tracing.configure_logging()
+logger = logging.getLogger(__name__)
+logger.info('Camera enabled: %s', CAMERA_ENABLED, extra={'fields': {'camera_url': CAMERA_URL or None}})
 
-# Load environment variables
-load_dotenv()
+# Keep-alive camera client with cached status and a circuit breaker
+camera_client = camera_client_for(CAMERA_URL)
+
+# Extra cameras scheduled captures may use besides CAMERA_URL (comma separated)
+CAPTURE_CAMERA_URLS = {
+    url.strip().rstrip('/') for url in os.environ.get('CAPTURE_CAMERA_URLS', '').split(',') if url.strip()
+}
+
+class HatchlyRequest(Request):
+    """Request with a larger body limit for the bulk upload endpoints"""
+    large_upload_endpoints = {'predict_batch'}
+
+    @property
+    def max_content_length(self):
+        if self.endpoint in self.large_upload_endpoints:
+            return BULK_UPLOAD_MAX_BYTES
+        return super().max_content_length
+
+class TracedJSONProvider(DefaultJSONProvider):
+    """JSON encoding that shows up as a span in request traces"""
+
+    def dumps(self, obj, **kwargs):
+        with tracing.span('json.dumps'):
+            return super().dumps(obj, **kwargs)
 
 app = Flask(__name__)
+app.request_class = HatchlyRequest
+app.json = TracedJSONProvider(app)
 secret_key = os.environ.get('SECRET_KEY')
 if not secret_key:
     raise ValueError("❌ SECRET_KEY is not set in environment variables!")
 app.secret_key = secret_key
 
+# scrypt runs on a bounded pool; destructive actions accept a step-up token
+# for a few minutes after one password check (see passwords.py)
+password_hasher = PasswordHasher()
+step_up_tokens = StepUpTokens(secret_key)
+
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 app.config['SESSION_PERMANENT'] = True
@@ -40,12 +102,7 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SECURE'] = False
 
 # Database configuration
-DB_CONFIG = {
-    'host': os.environ.get('DB_HOST', 'localhost'),
-    'user': os.environ.get('DB_USER', 'root'),
-    'password': os.environ.get('DB_PASSWORD'),
-    'database': os.environ.get('DB_NAME', 'hatchly_db')
-}
+DB_CONFIG = db_config_from_env()
 
 if not DB_CONFIG['password']:
     raise ValueError("❌ DB_PASSWORD is not set in environment variables!")
@@ -55,34 +112,134 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
 # ML Model Configuration
 MODEL_PATH = 'models/latest_model.h5'
-model = None
+MODEL_TFLITE_PATH = 'models/latest_model.tflite'
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', INFERENCE_BACKEND).lower()
 BINARY_MODEL_PATH ='models/binary_model.keras'
-binary_model = None
+BINARY_MODEL_TFLITE_PATH = 'models/binary_model.tflite'
+BINARY_MODEL_BACKEND = os.environ.get('BINARY_MODEL_BACKEND', INFERENCE_BACKEND).lower()
+PRAWN_EGG_THRESHOLD = 0.7
+# Run the binary gate and the regressor as one combined graph
+FUSED_INFERENCE = os.environ.get('FUSED_INFERENCE', 'false').lower() == 'true'
+FUSED_MODEL_TFLITE_PATH = 'models/fused_model.tflite'
 
-def load_ml_model():
-    """Load the trained model"""
-    global model
-    try:
-        from tensorflow.keras.models import load_model as load_keras_model
-        model = load_keras_model(MODEL_PATH, compile=False)
-        model.compile(
-            optimizer='adam',
-            loss='mae',
-            metrics=['mae']
-        )
-        print(f"✅ Model loaded from {MODEL_PATH}")
-        return True
-    except Exception as e:
-        print(f"❌ Error loading model: {e}")
-        print(f"   Model will use dummy predictions")
-        return False
+model_manager = ModelManager(
+    model_path=MODEL_PATH,
+    binary_model_path=BINARY_MODEL_PATH,
+    model_backend=MODEL_BACKEND,
+    binary_model_backend=BINARY_MODEL_BACKEND,
+    model_tflite_path=MODEL_TFLITE_PATH,
+    binary_model_tflite_path=BINARY_MODEL_TFLITE_PATH,
+    fused=FUSED_INFERENCE,
+    fused_tflite_path=FUSED_MODEL_TFLITE_PATH,
+    warmup_batch_sizes=(1, INFERENCE_MAX_BATCH_SIZE)
+)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# One pool per worker process; see db.py
+db_pool = ConnectionPool(DB_CONFIG)
+
 def get_db_connection():
-    """Create database connection"""
-    return mysql.connector.connect(**DB_CONFIG)
+    """Check out a pooled database connection.
+
+    conn.close() returns it to the pool, and it also works as a context
+    manager. Connections a request does not return are returned when the
+    request ends.
+    """
+    with tracing.span('db.connect'):
+        conn = db_pool.connect()
+    if has_request_context():
+        g.setdefault('db_connections', []).append(conn)
+    return conn
+
+@app.teardown_request
+def return_db_connections(exc):
+    """Return connections left checked out by early returns or exceptions"""
+    for conn in g.pop('db_connections', []):
+        if not conn.returned:
+            conn.close()
+
+# Prometheus metrics, summed over every worker on the host; see metrics.py
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+SQL_VERBS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE'}
+
+request_seconds = metrics_registry.histogram(
+    'hatchly_http_request_duration_seconds', 'Time to build the response, by route',
+    ('route', 'method', 'status')
+)
+db_query_seconds = metrics_registry.histogram(
+    'hatchly_db_query_duration_seconds', 'Time per SQL statement', ('verb',)
+)
+db_queries_per_request = metrics_registry.histogram(
+    'hatchly_db_queries_per_request', 'SQL statements run by one request', ('route',),
+    buckets=COUNT_BUCKETS
+)
+db_seconds_per_request = metrics_registry.histogram(
+    'hatchly_db_request_duration_seconds', 'Total SQL time of one request', ('route',)
+)
+prediction_stage_seconds = metrics_registry.histogram(
+    'hatchly_prediction_stage_duration_seconds',
+    'Time per prediction stage; model stages are timed per inference batch', ('stage',)
+)
+prediction_rejections = metrics_registry.counter(
+    'hatchly_prediction_rejections_total', 'Images rejected by the quality gates or models, by reason',
+    ('reason',)
+)
+
+@contextmanager
+def prediction_stage(stage):
+    """Time a prediction stage for /metrics and, when traced, as a span"""
+    with tracing.span(f'predict.{stage}'), prediction_stage_seconds.time(stage=stage):
+        yield
+
+def observe_query(statement, seconds):
+    """Pool query observer: per-statement histogram, per-request totals and trace spans"""
+    words = statement.split(None, 1) if isinstance(statement, str) else []
+    verb = words[0].upper() if words else ''
+    db_query_seconds.observe(seconds, verb=verb if verb in SQL_VERBS else 'OTHER')
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+        g.db_seconds = g.get('db_seconds', 0.0) + seconds
+    if tracing.tracing_active():
+        # The statement text only; parameters may hold user data
+        tracing.record_span('db.query', seconds, sql=' '.join(statement.split())[:200] if words else '')
+
+if metrics_registry.enabled or tracing.TRACING_ENABLED or tracing.PROFILE_REQUESTS != 'off':
+    db_pool.query_observer = observe_query
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Tracing / profiling of this request, when switched on; see tracing.py
+    g.request_trace = tracing.begin_request(request.method, request.path,
+                                            request.headers.get(tracing.PROFILE_HEADER))
+
+@app.after_request
+def record_request_metrics(response):
+    """Latency and query totals per route (streamed bodies are timed until the first byte is ready)"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_seconds.observe(time.perf_counter() - started, route=route,
+                                method=request.method, status=response.status_code)
+        db_queries_per_request.observe(g.get('db_queries', 0), route=route)
+        db_seconds_per_request.observe(g.get('db_seconds', 0.0), route=route)
+    request_trace = g.pop('request_trace', None)
+    if request_trace is not None:
+        tracing.end_request(request_trace, request.url_rule.rule if request.url_rule else 'unmatched',
+                            response.status_code)
+        response.headers['X-Trace-Id'] = request_trace.trace_id
+        if request_trace.profile_file:
+            response.headers['X-Profile-File'] = request_trace.profile_file
+    return response
+
+@app.teardown_request
+def end_unfinished_trace(exc):
+    """Close the trace of a request that failed before after_request ran"""
+    request_trace = g.pop('request_trace', None)
+    if request_trace is not None:
+        tracing.end_request(request_trace, request.url_rule.rule if request.url_rule else 'unmatched', 500)
 
 def login_required(f):
     """Decorator to require login"""
@@ -93,32 +250,145 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def load_binary_model():
-    """Load the binary classifier (prawn egg vs not prawn egg)"""
-    global binary_model
+# Per-user cache of the read endpoints; see read_cache.py
+read_cache = ReadCache()
+
+def cached_read(f):
+    """Serve a per-user GET from the read cache, with ETag / 304 support"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = session.get('user_id')
+        key = request.full_path
+        with tracing.span('read_cache.version'):
+            version = read_cache.version(user_id)
+        etag = ReadCache.etag(version, key)
+        if request.if_none_match.contains(etag):
+            read_cache.not_modified()
+            response = Response(status=304)
+        else:
+            body = read_cache.get(user_id, key, version)
+            if body is not None:
+                response = Response(body, mimetype='application/json')
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200 or not (response.get_json(silent=True) or {}).get('success'):
+                    return response
+                read_cache.set(user_id, key, version, response.get_data())
+        response.set_etag(etag)
+        # Always revalidate; the ETag makes that a 304 when nothing changed
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
+
+def invalidates_reads(f):
+    """Bump the user's data version after a mutating route runs"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            return f(*args, **kwargs)
+        finally:
+            try:
+                with tracing.span('read_cache.bump'):
+                    read_cache.bump(session.get('user_id'))
+            except OSError as e:
+                logger.warning('Read cache invalidation failed: %s', e)
+    return decorated_function
+
+# Per-user change events pushed over /api/events; see event_broker.py
+event_broker = EventBroker()
+
+def publish_event(user_id, event, data):
+    """Tell the user's open pages about a committed change"""
     try:
-        from tensorflow.keras.models import load_model as load_keras_model
-        binary_model = load_keras_model(BINARY_MODEL_PATH)
-        print(f"✅ Binary model loaded from {BINARY_MODEL_PATH}")
-        return True
-    except Exception as e:
-        print(f"⚠️  Binary model not loaded: {e}")
-        return False
+        with tracing.span('events.publish', event=event):
+            event_broker.publish(user_id, event, data)
+    except (OSError, EventTooLarge) as e:
+        logger.warning('Event publish failed: %s', e)
+
+def fused_predictions(image_batch):
+    """(prawn egg probabilities, predicted days) from one pass, or None if not fused"""
+    fused_model = model_manager.fused_model
+    if fused_model is None:
+        return None
+    with prediction_stage('fused_model'):
+        prawn_prob, days = fused_model.predict(image_batch)
+    return prawn_prob[:, 0], days[:, 0]
+
+def binary_confidences(image_batch):
+    """Prawn egg probability for each image in a batch, or None if no binary model"""
+    binary_model = model_manager.binary_model
+    if binary_model is None:
+        return None
+    with prediction_stage('binary_model'):
+        prediction = binary_model.predict(image_batch)[0]
+    return prediction[:, 0]
+
+def regression_days(image_batch):
+    """Predicted days until hatch for each image in a batch"""
+    with prediction_stage('regression_model'):
+        prediction = model_manager.model.predict(image_batch)[0]
+    return prediction[:, 0]
 
 def is_prawn_egg(image_array, threshold=0.5):
     """Check if image contains prawn egg"""
-    global binary_model
-    if binary_model is None:
-        return True, 1.0
     try:
-        prediction = binary_model.predict(image_array, verbose=0)
-        confidence = float(prediction[0][0])
+        confidences = binary_confidences(image_array)
+        if confidences is None:
+            return True, 1.0
+        confidence = float(confidences[0])
         is_prawn = confidence >= threshold
         return is_prawn, confidence
     except Exception as e:
-        print(f"Binary model error: {e}")
+        logger.exception('Binary model error: %s', e)
         return True, 1.0
 
+# Concurrent /api/predict requests share one batched pass through both models
+inference_engine = InferenceEngine(
+    binary_fn=binary_confidences,
+    regression_fn=regression_days,
+    gate_threshold=PRAWN_EGG_THRESHOLD,
+    fused_fn=fused_predictions if FUSED_INFERENCE else None
+)
+
+# Re-submitted images skip preprocessing and inference
+prediction_cache = PredictionCache()
+# Predict results waiting to be saved by token, so the image is uploaded once
+pending_predictions = PendingPredictionStore()
+
+# Content-addressed prediction images under static/uploads; see image_store.py
+image_store = ImageStore(app.config['UPLOAD_FOLDER'])
+
+def mark_image_status(image_path, status):
+    """Called by the image writer thread once a spooled image is written or given up on"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT DISTINCT user_id FROM predictions WHERE image_path = %s AND image_status != 'ready' FOR UPDATE",
+            (image_path,)
+        )
+        user_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "UPDATE predictions SET image_status = %s WHERE image_path = %s AND image_status != 'ready'",
+            (status, image_path)
+        )
+        conn.commit()
+        cursor.close()
+    # Cached prediction lists and dashboards still show the old status
+    for user_id in user_ids:
+        try:
+            read_cache.bump(user_id)
+        except OSError as e:
+            logger.warning('Read cache invalidation failed: %s', e)
+
+# Image writes and removals run behind the request; see image_writer.py
+image_writer = ImageWriter(image_store, mark_image_status)
+atexit.register(image_writer.drain)
+# Decode / preprocess pool for bulk uploads (Pillow releases the GIL)
+BULK_PREPROCESS_WORKERS = int(os.environ.get('BULK_PREPROCESS_WORKERS', '4'))
+bulk_preprocess_pool = ThreadPoolExecutor(
+    max_workers=BULK_PREPROCESS_WORKERS, thread_name_prefix='hatchly-preprocess'
+)
+
 # ============================================
 # ROUTES - Main Pages
 # ============================================
@@ -152,7 +422,7 @@ def login():
         cursor.close()
         conn.close()
         
-        if user and check_password_hash(user['password'], password):
+        if user and password_hasher.check(user['password'], password):
             # Set session
             session.permanent = True
             session['user_id'] = user['id']
@@ -168,8 +438,10 @@ def login():
         else:
             return jsonify({'success': False, 'message': 'Invalid credentials'})
             
+    except HashingBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '2'}
     except Exception as e:
-        print(f"Login error: {e}")
+        logger.exception('Login error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/signup', methods=['POST'])
@@ -198,7 +470,7 @@ def signup():
             return jsonify({'success': False, 'message': 'Username already registered'})
         
         # Hash password and insert user
-        hashed_password = generate_password_hash(password)
+        hashed_password = password_hasher.generate(password)
         cursor.execute(
             'INSERT INTO users (name, email, password) VALUES (%s, %s, %s)',
             (name, username, hashed_password)
@@ -221,8 +493,10 @@ def signup():
             'email': username
         })
         
+    except HashingBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '2'}
     except Exception as e:
-        print(f"Signup error: {e}")
+        logger.exception('Signup error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/logout', methods=['POST'])
@@ -264,13 +538,13 @@ def change_password():
         cursor.execute('SELECT password FROM users WHERE id = %s', (user_id,))
         user = cursor.fetchone()
         
-        if not user or not check_password_hash(user['password'], current_password):
+        if not user or not password_hasher.check(user['password'], current_password):
             cursor.close()
             conn.close()
             return jsonify({'success': False, 'message': 'Current password is incorrect'})
         
-        # Update password
-        hashed_password = generate_password_hash(new_password)
+        # Update password (this also revokes outstanding step-up tokens)
+        hashed_password = password_hasher.generate(new_password)
         cursor.execute('UPDATE users SET password = %s WHERE id = %s', (hashed_password, user_id))
         conn.commit()
         
@@ -279,16 +553,67 @@ def change_password():
         
         return jsonify({'success': True, 'message': 'Password changed successfully'})
         
+    except HashingBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '2'}
     except Exception as e:
-        print(f"Change password error: {e}")
+        logger.exception('Change password error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
+def verify_step_up(cursor, user_id, data):
+    """Re-authenticate a destructive action by 'step_up_token' or 'password'.
+
+    Returns (ok, token): token is a fresh step-up token when the password
+    was checked, else None. cursor must be a dictionary cursor. Raises
+    HashingBusy when the hash pool is saturated.
+    """
+    cursor.execute('SELECT password FROM users WHERE id = %s', (user_id,))
+    user = cursor.fetchone()
+    if not user:
+        return False, None
+    token = data.get('step_up_token')
+    if token and step_up_tokens.verify(token, user_id, user['password']):
+        return True, None
+    password = data.get('password')
+    if password and password_hasher.check(user['password'], password):
+        return True, step_up_tokens.issue(user_id, user['password'])
+    return False, None
+
+@app.route('/api/step_up', methods=['POST'])
+@login_required
+def step_up():
+    """Check the password once and return a short-lived token for destructive actions"""
+    data = request.get_json()
+    user_id = session.get('user_id')
+    if not data.get('password'):
+        return jsonify({'success': False, 'message': 'Password required'})
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        ok, token = verify_step_up(cursor, user_id, {'password': data.get('password')})
+        cursor.close()
+        conn.close()
+        if not ok:
+            return jsonify({'success': False, 'message': 'Incorrect password'})
+        return jsonify({'success': True, 'step_up_token': token, 'expires_in': step_up_tokens.ttl})
+    except HashingBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '2'}
+    except Exception as e:
+        logger.exception('Step-up error: %s', e)
+        return jsonify({'success': False, 'message': 'Server error'})
+
+@app.route('/api/auth/stats')
+@login_required
+def auth_stats():
+    """Password hash pool usage for this worker"""
+    return jsonify({'success': True, 'password_hashing': password_hasher.stats()})
+
 # ============================================
 # API ROUTES - Prawn Management
 # ============================================
 
 @app.route('/api/save_prawn', methods=['POST'])
 @login_required
+@invalidates_reads
 def save_prawn():
     """Save new prawn"""
     data = request.get_json()
@@ -330,38 +655,50 @@ def save_prawn():
         cursor.close()
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'prawn': {
-                'id': prawn_id,
-                'name': name,
-                'location_id': location_id,
-                'location_name': location['name']
-            }
-        })
+        prawn = {
+            'id': prawn_id,
+            'name': name,
+            'location_id': location_id,
+            'location_name': location['name']
+        }
+        publish_event(user_id, 'prawn.created', prawn)
+        return jsonify({'success': True, 'prawn': prawn})
         
     except Exception as e:
-        print(f"Save prawn error: {e}")
+        logger.exception('Save prawn error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/get_prawns', methods=['GET'])
 @login_required
+@cached_read
 def get_prawns():
-    """Get all prawns for current user"""
+    """Get all prawns for current user.
+
+    With ?cursor= (empty for the first page) and optional ?limit=, returns
+    one page plus 'next_cursor'; see pagination.py.
+    """
     user_id = session.get('user_id')
+    try:
+        page = page_request(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute(
-            '''SELECT p.*, l.name as location_name 
+        query = '''SELECT p.*, l.name as location_name 
                FROM prawns p 
                LEFT JOIN locations l ON p.location_id = l.id 
-               WHERE p.user_id = %s ORDER BY p.created_at DESC''',
-            (user_id,)
-        )
-        prawns = cursor.fetchall()
+               WHERE p.user_id = %s'''
+        params = (user_id,)
+        if page is None:
+            cursor.execute(query + ' ORDER BY p.created_at DESC', params)
+            prawns = cursor.fetchall()
+        else:
+            where, where_params = page.where('p')
+            cursor.execute(query + where + page.order_limit('p'), params + where_params)
+            prawns, next_cursor = page.split(cursor.fetchall())
         
         # Convert datetime objects to strings
         for prawn in prawns:
@@ -371,55 +708,65 @@ def get_prawns():
         cursor.close()
         conn.close()
         
+        if page is not None:
+            return jsonify({'success': True, 'prawns': prawns, 'next_cursor': next_cursor})
         return jsonify({'success': True, 'prawns': prawns})
         
     except Exception as e:
-        print(f"Get prawns error: {e}")
+        logger.exception('Get prawns error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/delete_prawn', methods=['POST'])
 @login_required
+@invalidates_reads
 def delete_prawn():
     """Delete prawn and its predictions"""
     data = request.get_json()
     user_id = session.get('user_id')
     prawn_id = data.get('prawn_id')
-    password = data.get('password')
     
-    if not prawn_id or not password:
+    if not prawn_id or not (data.get('password') or data.get('step_up_token')):
         return jsonify({'success': False, 'message': 'Prawn ID and password required'})
     
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        # Verify password
-        cursor.execute('SELECT password FROM users WHERE id = %s', (user_id,))
-        user = cursor.fetchone()
-        
-        if not user or not check_password_hash(user['password'], password):
+        # Verify password, or a step-up token from a recent password check
+        verified, step_up_token = verify_step_up(cursor, user_id, data)
+        if not verified:
             cursor.close()
             conn.close()
-            return jsonify({'success': False, 'message': 'Incorrect password'})
+            return jsonify({'success': False, 'message': 'Incorrect password', 'step_up_required': True})
         
         # Delete predictions first (foreign key)
         cursor.execute('DELETE FROM predictions WHERE prawn_id = %s', (prawn_id,))
+        cursor.execute('DELETE FROM capture_schedules WHERE prawn_id = %s AND user_id = %s',
+                       (prawn_id, user_id))
         
         # Delete prawn
         cursor.execute('DELETE FROM prawns WHERE id = %s AND user_id = %s', (prawn_id, user_id))
+        hatch_summary.remove_prawns(cursor, [prawn_id], user_id)
         conn.commit()
         
         cursor.close()
         conn.close()
         
-        return jsonify({'success': True, 'message': 'Prawn deleted successfully'})
+        publish_event(user_id, 'prawn.deleted', {'id': prawn_id})
+        response = {'success': True, 'message': 'Prawn deleted successfully'}
+        if step_up_token:
+            response.update(step_up_token=step_up_token, step_up_expires_in=step_up_tokens.ttl)
+        return jsonify(response)
         
+    except HashingBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '2'}
     except Exception as e:
-        print(f"Delete prawn error: {e}")
+        logger.exception('Delete prawn error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/rename_prawn', methods=['POST'])
 @login_required
+@invalidates_reads
 def rename_prawn():
     """Rename a prawn"""
     data = request.get_json()
@@ -435,16 +782,20 @@ def rename_prawn():
         cursor = conn.cursor()
         cursor.execute('UPDATE prawns SET name = %s WHERE id = %s AND user_id = %s',
                        (new_name.strip(), prawn_id, user_id))
+        renamed = cursor.rowcount
         conn.commit()
         cursor.close()
         conn.close()
+        if renamed:
+            publish_event(user_id, 'prawn.updated', {'id': prawn_id, 'name': new_name.strip()})
         return jsonify({'success': True, 'message': 'Prawn renamed successfully'})
     except Exception as e:
-        print(f"Rename prawn error: {e}")
+        logger.exception('Rename prawn error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/transfer_prawn', methods=['POST'])
 @login_required
+@invalidates_reads
 def transfer_prawn():
     """Transfer a prawn to a different location"""
     data = request.get_json()
@@ -468,36 +819,288 @@ def transfer_prawn():
             return jsonify({'success': False, 'message': 'Invalid location'})
         cursor.execute('UPDATE prawns SET location_id = %s WHERE id = %s AND user_id = %s',
                        (new_location_id, prawn_id, user_id))
+        hatch_summary.move_prawns(cursor, [prawn_id], user_id, new_location_id)
         conn.commit()
         cursor.close()
         conn.close()
+        publish_event(user_id, 'prawn.updated', {
+            'id': prawn_id, 'location_id': location['id'], 'location_name': location['name']
+        })
         return jsonify({'success': True, 'message': 'Location changed successfully', 'new_location': location['name']})
     except Exception as e:
-        print(f"Transfer prawn error: {e}")
+        logger.exception('Transfer prawn error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 # ============================================
 # API ROUTES - Predictions (ML INTEGRATED)
 # ============================================
 
+def get_image_upload(json_field, require_data_url=False):
+    """Image from the request: base64 in JSON (legacy clients), multipart or raw binary.
+
+    Returns (upload, fields) where fields holds the other request values.
+    Raises UploadError for oversized or non-image uploads.
+    """
+    if request.is_json:
+        data = request.get_json() or {}
+        image_data = data.get(json_field)
+        if not image_data or (require_data_url and not image_data.startswith('data:image')):
+            return None, data
+        return ImageUpload.from_data_url(image_data), data
+    return read_image_upload(request, 'image'), request.values
+
+def check_image_quality(prepared):
+    """Brightness and texture gates. Returns a rejection payload, or None if the image passes."""
+    # Brightness check
+    avg_brightness = prepared.brightness
+    if avg_brightness < 0.05:  # Too dark
+        prediction_rejections.inc(reason='too_dark')
+        return {
+            'success': False,
+            'error': 'Image too dark. Cannot detect prawn eggs. Please use better lighting.',
+            'no_prawn_detected': True
+        }
+    
+    if avg_brightness > 0.98:  # Too bright/white
+        prediction_rejections.inc(reason='overexposed')
+        return {
+            'success': False,
+            'error': 'Image overexposed. Cannot detect prawn eggs. Please adjust lighting.',
+            'no_prawn_detected': True
+        }
+    
+    # Color variance check (eggs have texture)
+    color_std = prepared.contrast
+    if color_std < 0.05:  # Too uniform (blank/solid color)
+        prediction_rejections.inc(reason='uniform')
+        return {
+            'success': False,
+            'error': 'No prawn eggs detected. Image appears blank or uniform.',
+            'no_prawn_detected': True
+        }
+    return None
+
+def interpret_prediction(prawn_confidence, predicted_days):
+    """Apply the prawn egg gate, range and confidence checks to raw model output.
+
+    Returns (payload, status) as /api/predict sends it.
+    """
+    is_prawn = prawn_confidence >= PRAWN_EGG_THRESHOLD
+    logger.debug('Binary check', extra={'fields': {
+        'is_prawn': bool(is_prawn), 'prawn_confidence': round(float(prawn_confidence), 4)
+    }})
+    if not is_prawn:
+        prediction_rejections.inc(reason='not_prawn_egg')
+        return {
+            'success': False,
+            'error': 'Hindi makilala ang prawn egg sa larawan. Pakisiguro na malinaw ang larawan ng prawn eggs.',
+            'no_prawn_detected': True,
+            'debug_info': f'Prawn egg confidence: {prawn_confidence*100:.1f}%'
+        }, 400
+    
+    # Ensure non-negative prediction
+    if predicted_days < -1:
+        prediction_rejections.inc(reason='invalid_result')
+        return {
+            'success': False,
+            'error': 'Invalid prediction result. Image may not contain prawn eggs.',
+            'no_prawn_detected': True,
+            'debug_info': f'Predicted: {predicted_days:.2f} days'
+        }, 400
+    
+    # Check if prediction is unrealistic
+    if predicted_days > 25:
+        prediction_rejections.inc(reason='out_of_range')
+        return {
+            'success': False,
+            'error': 'Prediction outside normal range. Please upload a clear image of prawn eggs.',
+            'no_prawn_detected': True,
+            'debug_info': f'Predicted: {predicted_days:.2f} days'
+        }, 400
+    
+    # Clamp to valid range
+    predicted_days = max(0, min(21, predicted_days))
+    
+    # Round to nearest integer
+    days_until_hatch = int(round(predicted_days))
+    
+    # Calculate confidence (simple approach)
+    confidence = 100 - abs(predicted_days - days_until_hatch) * 20
+    confidence = max(60, min(99, confidence))
+    
+    # Low confidence warning
+    if confidence < 65:
+        prediction_rejections.inc(reason='low_confidence')
+        return {
+            'success': False,
+            'error': 'Low confidence prediction. Image quality may be poor. Please try again with a clearer image.',
+            'no_prawn_detected': True,
+            'debug_info': f'Confidence: {confidence:.1f}%'
+        }, 400
+    
+    # Calculate current day (assuming 21-day cycle)
+    max_days = 21
+    current_day = max(0, max_days - days_until_hatch)
+    
+    logger.info('Prediction', extra={'fields': {
+        'days_until_hatch': days_until_hatch, 'raw_prediction': round(float(predicted_days), 3),
+        'confidence': round(float(confidence), 1)
+    }})
+    
+    return {
+        'success': True,
+        'days_until_hatch': days_until_hatch,
+        'confidence': float(confidence),
+        'current_day': current_day,
+        'raw_prediction': float(predicted_days)
+    }, 200
+
+def run_prediction(image_file):
+    """Quality gates, binary check and hatch regression for one image.
+
+    image_file is a file object (or path) Pillow can open. Returns
+    (payload, status) for /api/predict. Rejections are returned with
+    status 400; unexpected errors propagate to the caller.
+    """
+    # Preprocess image (draft decode, resize, float32 scale + gate stats)
+    with prediction_stage('preprocess'):
+        prepared = preprocess(image_file)
+    
+    with prediction_stage('quality_gates'):
+        rejection = check_image_quality(prepared)
+    if rejection is not None:
+        return rejection, 400
+    
+    # BINARY CHECK + REGRESSION - batched with other concurrent requests
+    with tracing.span('model.infer'):
+        prawn_confidence, predicted_days = inference_engine.infer(prepared.array)
+    return interpret_prediction(prawn_confidence, predicted_days)
+
+def cached_prediction(upload):
+    """run_prediction() behind the content-hash result cache.
+
+    Returns (payload, status, cache_hit).
+    """
+    cache_key = PredictionCache.key_for_digest(
+        upload.sha256, model_manager.model_version, PREPROCESS_PIPELINE_VERSION
+    )
+    with tracing.span('prediction_cache.get'):
+        cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        payload, status = cached
+        return payload, status, True
+    payload, status = run_prediction(upload.open())
+    with tracing.span('prediction_cache.set'):
+        prediction_cache.set(cache_key, payload, status)
+    return payload, status, False
+
+def predict_uploads(uploads):
+    """run_prediction() for many images at once.
+
+    Images are decoded and preprocessed in a worker pool straight into one
+    batch tensor, and the ones passing the quality gates go through the
+    models in batches of INFERENCE_MAX_BATCH_SIZE. Returns one
+    (payload, status) per upload, in order.
+    """
+    batch = np.empty((len(uploads), 224, 224, 3), dtype=np.float32)
+    
+    def prepare(position):
+        try:
+            with prediction_stage('preprocess'):
+                return preprocess(uploads[position].open(), out=batch[position])
+        except Exception as e:
+            return e
+    
+    with tracing.span('predict.preprocess_pool', images=len(uploads)):
+        prepared = list(bulk_preprocess_pool.map(prepare, range(len(uploads))))
+    
+    results = [None] * len(uploads)
+    passing = []
+    for position, prep in enumerate(prepared):
+        if isinstance(prep, Exception):
+            prediction_rejections.inc(reason='unreadable')
+            results[position] = ({'success': False, 'error': f'Could not read image: {prep}'}, 400)
+            continue
+        with prediction_stage('quality_gates'):
+            rejection = check_image_quality(prep)
+        if rejection is not None:
+            results[position] = (rejection, 400)
+            continue
+        passing.append(position)
+    
+    with tracing.span('model.infer_batch', images=len(passing)):
+        outputs = inference_engine.infer_batch(batch[passing]) if passing else []
+    for position, (prawn_confidence, predicted_days) in zip(passing, outputs):
+        results[position] = interpret_prediction(prawn_confidence, predicted_days)
+    return results
+
+def insert_predictions(cursor, entries):
+    """Insert accepted predictions in the caller's transaction.
+
+    entries are (user_id, prawn_id, upload, payload). Images are spooled
+    for the image writer and the hatch summary is refreshed. Returns the
+    spooled image hashes to pass to image_writer.write() after commit, or to
+    image_writer.unspool() if the commit fails; on error nothing stays spooled.
+    """
+    ph_tz = pytz.timezone('Asia/Manila')
+    created_at = datetime.now(ph_tz).strftime('%Y-%m-%d %H:%M:%S')
+    
+    rows = []
+    spooled = []
+    try:
+        for user_id, prawn_id, upload, payload in entries:
+            if upload.sha256 not in spooled:
+                with tracing.span('image.spool'):
+                    image_writer.spool(upload.getbuffer(), upload.sha256)
+                spooled.append(upload.sha256)
+            rows.append((
+                user_id, prawn_id, image_store.image_path_for(upload.sha256), 'pending',
+                payload['days_until_hatch'], payload['current_day'], payload['confidence'], created_at
+            ))
+        if rows:
+            cursor.executemany(
+                '''INSERT INTO predictions 
+                    (user_id, prawn_id, image_path, image_status, predicted_days, current_day, confidence, created_at) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)''',
+                rows
+            )
+            hatch_summary.refresh(cursor, [row[1] for row in rows])
+    except Exception:
+        for image_sha in spooled:
+            image_writer.unspool(image_sha)
+        raise
+    return spooled
+
 @app.route('/api/predict', methods=['POST'])
 @login_required
 def predict():
-    """Handle ML prediction with trained model"""
-    global model
-    
-    data = request.get_json()
-    image_data = data.get('image')
+    """Handle ML prediction with trained model.
+
+    Accepts the image as base64 in JSON ({"image": ...}), as a multipart
+    'image' file field, or as a raw image/jpeg or image/png body.
+    """
+    try:
+        # Base64 decode (JSON) or body read (multipart / raw)
+        with prediction_stage('decode_upload'):
+            upload, _ = get_image_upload('image')
+    except UploadError as e:
+        return jsonify({'success': False, 'error': e.message}), e.status
     
-    if not image_data:
+    if upload is None:
         return jsonify({
             'success': False,
             'error': 'No image data provided'
         }), 400
     
+    if not model_manager.wait_until_ready(MODEL_READY_TIMEOUT):
+        return jsonify({
+            'success': False,
+            'error': 'Model is still loading. Please try again in a moment.'
+        }), 503
+    
     # If model not loaded, return dummy data
-    if model is None:
-        print("⚠️  Model not loaded, returning dummy prediction")
+    if model_manager.model is None:
+        logger.warning('Model not loaded, returning dummy prediction')
         return jsonify({
             'success': True,
             'days_until_hatch': 7,
@@ -507,116 +1110,20 @@ def predict():
         })
     
     try:
-        # Decode base64 image
-        if image_data.startswith('data:image'):
-            image_base64 = image_data.split(',')[1]
-        else:
-            image_base64 = image_data
-        
-        image_bytes = base64.b64decode(image_base64)
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Preprocess image
-        image = image.convert('RGB')
-        image = image.resize((224, 224))
-        image_array = np.array(image) / 255.0
-        image_array = np.expand_dims(image_array, axis=0)
-        
-        # Brightness check
-        avg_brightness = np.mean(image_array)
-        if avg_brightness < 0.05:  # Too dark
-            return jsonify({
-                'success': False,
-                'error': 'Image too dark. Cannot detect prawn eggs. Please use better lighting.',
-                'no_prawn_detected': True
-            }), 400
-        
-        if avg_brightness > 0.98:  # Too bright/white
-            return jsonify({
-                'success': False,
-                'error': 'Image overexposed. Cannot detect prawn eggs. Please adjust lighting.',
-                'no_prawn_detected': True
-            }), 400
-        
-        # Color variance check (eggs have texture)
-        color_std = np.std(image_array)
-        if color_std < 0.05:  # Too uniform (blank/solid color)
-            return jsonify({
-                'success': False,
-                'error': 'No prawn eggs detected. Image appears blank or uniform.',
-                'no_prawn_detected': True
-            }), 400
-        
-        # BINARY CHECK - Is this a prawn egg?
-        is_prawn, prawn_confidence = is_prawn_egg(image_array, threshold=0.7)
-        print(f"🔍 Binary check - is_prawn: {is_prawn}, confidence: {prawn_confidence*100:.1f}%")
-        if not is_prawn:
-            return jsonify({
-                'success': False,
-                'error': 'Hindi makilala ang prawn egg sa larawan. Pakisiguro na malinaw ang larawan ng prawn eggs.',
-                'no_prawn_detected': True,
-                'debug_info': f'Prawn egg confidence: {prawn_confidence*100:.1f}%'
-            }), 400
-        
-        # Make prediction
-        prediction = model.predict(image_array, verbose=0)
-        predicted_days = float(prediction[0][0])
-        
-        # Ensure non-negative prediction
-        if predicted_days < -1:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid prediction result. Image may not contain prawn eggs.',
-                'no_prawn_detected': True,
-                'debug_info': f'Predicted: {predicted_days:.2f} days'
-            }), 400
-        
-        # Check if prediction is unrealistic
-        if predicted_days > 25:
-            return jsonify({
-                'success': False,
-                'error': 'Prediction outside normal range. Please upload a clear image of prawn eggs.',
-                'no_prawn_detected': True,
-                'debug_info': f'Predicted: {predicted_days:.2f} days'
-            }), 400
-        
-        # Clamp to valid range
-        predicted_days = max(0, min(21, predicted_days))
-        
-        # Round to nearest integer
-        days_until_hatch = int(round(predicted_days))
-        
-        # Calculate confidence (simple approach)
-        confidence = 100 - abs(predicted_days - days_until_hatch) * 20
-        confidence = max(60, min(99, confidence))
-        
-        # Low confidence warning
-        if confidence < 65:
-            return jsonify({
-                'success': False,
-                'error': 'Low confidence prediction. Image quality may be poor. Please try again with a clearer image.',
-                'no_prawn_detected': True,
-                'debug_info': f'Confidence: {confidence:.1f}%'
-            }), 400
-        
-        # Calculate current day (assuming 21-day cycle)
-        max_days = 21
-        current_day = max(0, max_days - days_until_hatch)
-        
-        print(f"✅ Prediction: {days_until_hatch} days (raw: {predicted_days:.2f}, confidence: {confidence:.1f}%)")
-        
-        return jsonify({
-            'success': True,
-            'days_until_hatch': days_until_hatch,
-            'confidence': float(confidence),
-            'current_day': current_day,
-            'raw_prediction': float(predicted_days)
-        })
+        payload, status, cache_hit = cached_prediction(upload)
+        if cache_hit:
+            logger.info('Prediction served from cache', extra={'fields': {'image_sha': upload.sha256}})
+        response = {**payload, 'cached': cache_hit}
+        if status == 200:
+            # Lets /api/save_prediction commit this result without a re-upload
+            with tracing.span('pending_predictions.put'):
+                response['prediction_token'] = pending_predictions.put(
+                    session.get('user_id'), upload, payload
+                )
+        return jsonify(response), status
         
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Prediction error: %s', e)
         
         return jsonify({
             'success': False,
@@ -625,92 +1132,262 @@ def predict():
 
 @app.route('/api/save_prediction', methods=['POST'])
 @login_required
+@invalidates_reads
 def save_prediction():
-    """Save prediction to database"""
-    data = request.get_json()
+    """Save prediction to database.
+
+    Preferred: 'prediction_token' from /api/predict, which commits the image
+    and result the server already holds. Otherwise the image comes as a
+    base64 data URL in JSON ('image_path'), or as an 'image' multipart file /
+    raw image body with the other values in form fields or the query string.
+    """
+    try:
+        upload, data = get_image_upload('image_path', require_data_url=True)
+    except UploadError as e:
+        return jsonify({'success': False, 'message': e.message}), e.status
     user_id = session.get('user_id')
     prawn_id = data.get('prawn_id')
-    image_data = data.get('image_path')
     predicted_days = data.get('predicted_days')
     current_day = data.get('current_day')
     confidence = data.get('confidence')
     
+    pending = None
+    token = data.get('prediction_token')
+    if token:
+        pending = pending_predictions.claim(token, user_id)
+        if pending is None:
+            return jsonify({'success': False, 'message': 'Prediction expired or already saved. Please predict again.'})
+        # Save exactly what the model returned
+        predicted_days = pending.result['days_until_hatch']
+        current_day = pending.result['current_day']
+        confidence = pending.result['confidence']
+        upload = None
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Save image to file
-        image_filename = None
-        if image_data and image_data.startswith('data:image'):
-            # Extract base64 data
-            image_base64 = image_data.split(',')[1]
-            image_bytes = base64.b64decode(image_base64)
-            
-            # Generate filename
-            ph_tz = pytz.timezone('Asia/Manila')
-            ph_now = datetime.now(ph_tz)
-            timestamp = ph_now.strftime('%Y%m%d_%H%M%S')
-            image_filename = f'prediction_{user_id}_{timestamp}.jpg'
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], image_filename)
-            
-            # Save file
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            with open(image_path, 'wb') as f:
-                f.write(image_bytes)
-            
-            # Store relative path
-            image_filename = f'uploads/{image_filename}'
+        ph_tz = pytz.timezone('Asia/Manila')
+        ph_now = datetime.now(ph_tz)
         
-        cursor.execute(
-            '''INSERT INTO predictions 
-                (user_id, prawn_id, image_path, predicted_days, current_day, confidence, created_at) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s)''',
-                (user_id, prawn_id, image_filename, predicted_days, current_day, confidence, ph_now.strftime('%Y-%m-%d %H:%M:%S'))
-            )
-        conn.commit()
+        # Spool the image locally; the image writer stores it after commit
+        image_sha = None
+        image_filename = None
+        if pending is not None:
+            image_sha = pending.sha256
+            with tracing.span('image.spool'):
+                pending.move_image_to(image_writer.spool_path(image_sha))
+            image_writer.adopt(image_sha)
+        elif upload is not None:
+            image_sha = upload.sha256
+            with tracing.span('image.spool'):
+                image_writer.spool(upload.getbuffer(), image_sha)
+        if image_sha is not None:
+            image_filename = image_store.image_path_for(image_sha)
+        
+        try:
+            cursor.execute(
+                '''INSERT INTO predictions 
+                    (user_id, prawn_id, image_path, image_status, predicted_days, current_day, confidence, created_at) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)''',
+                    (user_id, prawn_id, image_filename, 'pending' if image_sha else 'ready',
+                     predicted_days, current_day, confidence, ph_now.strftime('%Y-%m-%d %H:%M:%S'))
+                )
+            prediction_id = cursor.lastrowid
+            hatch_summary.record_prediction(cursor, prediction_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            if pending is not None:
+                # Give the entry its image back so the client can retry
+                pending.release()
+            if image_sha is not None:
+                image_writer.unspool(image_sha)
+            raise
         
         cursor.close()
         conn.close()
         
+        if image_sha is not None:
+            image_writer.write(image_sha)
+        if pending is not None:
+            pending.discard()
+        
+        publish_event(user_id, 'prediction.created', {
+            'id': prediction_id,
+            'prawn_id': prawn_id,
+            'image_path': image_filename,
+            'thumbnail_path': image_store.thumbnail_path(image_filename),
+            'predicted_days': predicted_days,
+            'current_day': current_day,
+            'confidence': confidence,
+            'created_at': ph_now.replace(tzinfo=None, microsecond=0).isoformat()
+        })
         return jsonify({'success': True, 'message': 'Prediction saved'})
         
     except Exception as e:
-        print(f"Save prediction error: {e}")
+        logger.exception('Save prediction error: %s', e)
+        if pending is not None:
+            pending.release()
+        return jsonify({'success': False, 'message': 'Server error'})
+
+@app.route('/api/predict_batch', methods=['POST'])
+@login_required
+@invalidates_reads
+def predict_batch():
+    """Predict and save a whole sampling round in one request.
+
+    multipart/form-data with image_<prawn_id> file fields, or one 'archive'
+    zip whose entries are named <prawn_id>/<file> or <prawn_id>_<file>.
+    Images are preprocessed in a worker pool, run through the models in
+    batches, and every accepted prediction is inserted in one transaction.
+    Returns one result per image, in upload order.
+    """
+    user_id = session.get('user_id')
+    try:
+        items = read_bulk_images(request)
+    except UploadError as e:
+        return jsonify({'success': False, 'message': e.message}), e.status
+    
+    if not items:
+        return jsonify({'success': False, 'message': 'No images provided'}), 400
+    
+    if not model_manager.wait_until_ready(MODEL_READY_TIMEOUT) or model_manager.model is None:
+        return jsonify({'success': False, 'message': 'Model is not available. Please try again later.'}), 503
+    
+    results = [
+        {'index': item.index, 'prawn_id': item.prawn_id, 'filename': item.filename}
+        for item in items
+    ]
+    
+    def reject(item, payload):
+        results[item.index].update(payload)
+        results[item.index]['success'] = False
+    
+    for item in items:
+        if item.error is not None:
+            reject(item, {'error': item.error})
+    
+    try:
+        # Only the user's own prawns. Connections are checked out only
+        # around the queries, never across preprocessing and inference
+        prawn_ids = sorted({item.prawn_id for item in items if item.error is None})
+        owned = set()
+        if prawn_ids:
+            placeholders = ', '.join(['%s'] * len(prawn_ids))
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f'SELECT id FROM prawns WHERE user_id = %s AND id IN ({placeholders})',
+                    (user_id, *prawn_ids)
+                )
+                owned = {row[0] for row in cursor.fetchall()}
+                cursor.close()
+        
+        pending = []
+        for item in items:
+            if item.error is not None:
+                continue
+            if item.prawn_id not in owned:
+                reject(item, {'error': 'Prawn not found'})
+                continue
+            pending.append(item)
+        
+        accepted = []
+        predictions = predict_uploads([item.upload for item in pending])
+        for item, (payload, status) in zip(pending, predictions):
+            if status != 200:
+                reject(item, payload)
+                continue
+            results[item.index].update(payload)
+            accepted.append((user_id, item.prawn_id, item.upload, payload))
+        
+        # Insert every row in one transaction
+        spooled = []
+        if accepted:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            try:
+                spooled = insert_predictions(cursor, accepted)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                for image_sha in spooled:
+                    image_writer.unspool(image_sha)
+                raise
+            finally:
+                cursor.close()
+                conn.close()
+        
+        for image_sha in spooled:
+            image_writer.write(image_sha)
+        if accepted:
+            publish_event(user_id, 'predictions.created', {
+                'prawn_ids': sorted({entry[1] for entry in accepted}), 'count': len(accepted)
+            })
+        
+        logger.info('Bulk prediction', extra={'fields': {
+            'saved': len(accepted), 'rejected': len(items) - len(accepted)
+        }})
+        return jsonify({
+            'success': True,
+            'saved': len(accepted),
+            'rejected': len(items) - len(accepted),
+            'results': results
+        })
+        
+    except Exception as e:
+        logger.exception('Bulk prediction error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/get_predictions', methods=['GET'])
 @login_required
+@cached_read
 def get_predictions():
-    """Get predictions for a prawn"""
+    """Get predictions for a prawn.
+
+    With ?cursor= (empty for the first page) and optional ?limit=, returns
+    one page plus 'next_cursor'; see pagination.py.
+    """
     user_id = session.get('user_id')
     prawn_id = request.args.get('prawn_id')
+    try:
+        page = page_request(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute(
-            '''SELECT p.*, pr.location_id, pr.name as prawn_name
+        query = '''SELECT p.*, pr.location_id, pr.name as prawn_name
             FROM predictions p
             LEFT JOIN prawns pr ON p.prawn_id = pr.id
-            WHERE p.user_id = %s AND p.prawn_id = %s 
-            ORDER BY p.created_at DESC''',
-            (user_id, prawn_id)
-        )
-        predictions = cursor.fetchall()
+            WHERE p.user_id = %s AND p.prawn_id = %s'''
+        params = (user_id, prawn_id)
+        if page is None:
+            cursor.execute(query + ' ORDER BY p.created_at DESC', params)
+            predictions = cursor.fetchall()
+        else:
+            where, where_params = page.where('p')
+            cursor.execute(query + where + page.order_limit('p'), params + where_params)
+            predictions, next_cursor = page.split(cursor.fetchall())
         
         # Convert datetime to string
         for pred in predictions:
             if pred.get('created_at'):
                 pred['created_at'] = pred['created_at'].isoformat()
+            pred['thumbnail_path'] = image_store.thumbnail_path(pred.get('image_path'))
         
         cursor.close()
         conn.close()
         
+        if page is not None:
+            return jsonify({'success': True, 'predictions': predictions, 'next_cursor': next_cursor})
         return jsonify({'success': True, 'predictions': predictions})
         
     except Exception as e:
-        print(f"Get predictions error: {e}")
+        logger.exception('Get predictions error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 # ============================================
@@ -719,6 +1396,7 @@ def get_predictions():
 
 @app.route('/api/delete_prediction', methods=['POST'])
 @login_required
+@invalidates_reads
 def delete_prediction():
     """Delete a single prediction record (and its saved image file)."""
     data = request.get_json()
@@ -734,7 +1412,7 @@ def delete_prediction():
 
         # Fetch the record first so we can delete the image file
         cursor.execute(
-            'SELECT image_path FROM predictions WHERE id = %s AND user_id = %s',
+            'SELECT image_path, prawn_id FROM predictions WHERE id = %s AND user_id = %s',
             (prediction_id, user_id)
         )
         record = cursor.fetchone()
@@ -744,30 +1422,63 @@ def delete_prediction():
             conn.close()
             return jsonify({'success': False, 'message': 'Prediction not found or access denied'})
 
-        # Delete the image file from disk if it exists
-        if record.get('image_path'):
-            full_path = os.path.join(app.config['UPLOAD_FOLDER'], os.path.basename(record['image_path']))
-            if os.path.exists(full_path):
-                try:
-                    os.remove(full_path)
-                except OSError as e:
-                    print(f"Warning: could not delete image file {full_path}: {e}")
-
         # Delete the DB record
+        started = time.time()
         cursor.execute(
             'DELETE FROM predictions WHERE id = %s AND user_id = %s',
             (prediction_id, user_id)
         )
+        hatch_summary.refresh(cursor, [record['prawn_id']])
+        
+        # Identical photos share one stored file; keep it while still referenced
+        image_path = record.get('image_path')
+        if image_path:
+            cursor.execute('SELECT COUNT(*) AS refs FROM predictions WHERE image_path = %s', (image_path,))
+            if cursor.fetchone()['refs'] > 0:
+                image_path = None
         conn.commit()
         cursor.close()
         conn.close()
 
+        # Delete the image file (and thumbnail) in the background
+        if image_path:
+            image_writer.delete(image_path, unless_used_since=started)
+
+        publish_event(user_id, 'prediction.deleted', {'id': prediction_id, 'prawn_id': record['prawn_id']})
         return jsonify({'success': True, 'message': 'Prediction deleted'})
 
     except Exception as e:
-        print(f"Delete prediction error: {e}")
+        logger.exception('Delete prediction error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
+@app.route('/api/db/stats')
+@login_required
+def db_stats():
+    """Connection pool size, utilization and wait times for this worker"""
+    return jsonify({'success': True, **db_pool.stats()})
+
+@app.route('/api/ready')
+def ready():
+    """Readiness probe: 200 only once this worker's models are loaded and warmed up"""
+    if MODEL_LOAD_MODE == 'lazy':
+        model_manager.start()
+    status = model_manager.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/api/inference/stats')
+@login_required
+def inference_stats():
+    """Batch size and latency stats from the inference engine"""
+    return jsonify({
+        'success': True,
+        **inference_engine.stats(),
+        'model_version': model_manager.model_version,
+        'preprocessing': PREPROCESS_PIPELINE_VERSION,
+        'cache': prediction_cache.stats(),
+        'read_cache': read_cache.stats(),
+        'image_writer': image_writer.stats()
+    })
+
 # ============================================
 # API ROUTES - Camera Integration
 # ============================================
@@ -775,29 +1486,28 @@ def delete_prediction():
 @app.route('/api/camera/status')
 @login_required
 def camera_status():
-    """Check if camera is available"""
+    """Check if camera is available (cached by the background status poller)"""
     if not CAMERA_ENABLED:
         return jsonify({
             'success': False,
             'message': 'Camera not enabled'
         })
     
-    try:
-        import requests
-        response = requests.get(f'{CAMERA_URL}/status', timeout=3)
-        data = response.json()
+    status = camera_client.status()
+    if status['camera_online']:
         return jsonify({
             'success': True,
             'camera_online': True,
             'camera_url': f'{CAMERA_URL}/video_feed',
-            **data
-        })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'camera_online': False,
-            'error': str(e)
+            'status_age_seconds': status['age_seconds'],
+            **status['data']
         })
+    return jsonify({
+        'success': False,
+        'camera_online': False,
+        'status_age_seconds': status['age_seconds'],
+        'error': status['error']
+    })
 
 @app.route('/api/camera/capture')
 @login_required
@@ -806,9 +1516,7 @@ def camera_capture():
         return jsonify({'success': False, 'message': 'Camera not enabled'})
     
     try:
-        import requests
-        response = requests.get(f'{CAMERA_URL}/capture', timeout=5)
-        data = response.json()
+        data = camera_client.capture()
         if data.get('success'):
             return jsonify({'success': True, 'image': data['image']})
         else:
@@ -819,21 +1527,261 @@ def camera_capture():
 @app.route('/api/camera/stream')
 @login_required
 def camera_stream():
-    """Proxy camera stream"""
+    """Proxy camera stream.
+
+    All viewers in this worker share one upstream connection and get the
+    latest whole frame, rate limited per viewer; see camera_stream.py.
+    """
     if not CAMERA_ENABLED:
         return jsonify({'error': 'Camera not enabled'}), 400
     
+    body = open_camera_stream(f'{CAMERA_URL}/video_feed')
+    if body is None:
+        # Every viewer slot in this worker is taken
+        return Response('Too many camera viewers\n', status=503, headers={'Retry-After': '30'})
+    return Response(
+        body,
+        content_type=CAMERA_STREAM_CONTENT_TYPE,
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/camera/stream/stats')
+@login_required
+def camera_stream_stats():
+    """Upstream connections, viewers and frame counters for this worker"""
+    return jsonify({'success': True, **camera_viewer_stats(), 'streams': camera_stream_stats_all()})
+
+@app.route('/api/camera/stats')
+@login_required
+def camera_stats():
+    """Status age, breaker state and failure counters of the camera client"""
+    if not CAMERA_ENABLED:
+        return jsonify({'success': False, 'message': 'Camera not enabled'})
+    return jsonify({'success': True, **camera_client.stats()})
+
+# ============================================
+# API ROUTES - Scheduled Captures
+# ============================================
+
+def capture_camera_urls():
+    """Cameras a schedule may point at (never arbitrary user-supplied hosts)"""
+    return ({CAMERA_URL.rstrip('/')} if CAMERA_URL else set()) | CAPTURE_CAMERA_URLS
+
+def run_capture_jobs(jobs):
+    """Capture a frame for every due schedule and predict them as one batch.
+
+    Called by the capture scheduler with the jobs it claimed. Frames go
+    through the same quality gates and models as /api/predict_batch, and
+    every accepted prediction is inserted in one transaction. Returns one
+    status string per job.
+    """
+    statuses = ['pending'] * len(jobs)
+    if not CAMERA_ENABLED:
+        return ['skipped: camera not enabled'] * len(jobs)
+    if not model_manager.wait_until_ready(MODEL_READY_TIMEOUT) or model_manager.model is None:
+        return ['skipped: model not ready'] * len(jobs)
+    
+    conn = get_db_connection()
     try:
-        import requests
-        
-        req = requests.get(f'{CAMERA_URL}/video_feed', stream=True, timeout=5)
-        
-        return Response(
-            req.iter_content(chunk_size=1024),
-            content_type=req.headers['Content-Type']
+        cursor = conn.cursor()
+        prawn_ids = list({job.prawn_id for job in jobs})
+        placeholders = ', '.join(['%s'] * len(prawn_ids))
+        cursor.execute(
+            f'SELECT id, user_id FROM prawns WHERE id IN ({placeholders})',
+            prawn_ids
         )
+        owners = dict(cursor.fetchall())
+        cursor.close()
+    finally:
+        conn.close()
+    
+    # Capture sequentially per camera; the Pi serves one capture at a time
+    captured = []
+    allowed = capture_camera_urls()
+    for position, job in enumerate(jobs):
+        if owners.get(job.prawn_id) != job.user_id:
+            statuses[position] = 'error: prawn not found'
+            continue
+        camera_url = (job.camera_url or CAMERA_URL).rstrip('/')
+        if camera_url not in allowed:
+            statuses[position] = 'error: camera not allowed'
+            continue
+        try:
+            data = camera_client_for(camera_url).capture()
+            if not data.get('success'):
+                statuses[position] = f"error: {data.get('error', 'Capture failed')}"
+                continue
+            captured.append((position, ImageUpload.from_data_url(data['image'])))
+        except CameraUnavailable as e:
+            statuses[position] = f'error: camera unavailable ({e})'
+        except UploadError as e:
+            statuses[position] = f'error: {e.message}'
+    
+    if not captured:
+        return statuses
+    
+    accepted = []
+    predictions = predict_uploads([upload for _, upload in captured])
+    for (position, upload), (payload, status) in zip(captured, predictions):
+        if status != 200:
+            statuses[position] = f"rejected: {payload.get('error') or payload.get('message', 'Prediction failed')}"
+            continue
+        job = jobs[position]
+        accepted.append((job.user_id, job.prawn_id, upload, payload))
+        statuses[position] = f"ok: {payload['days_until_hatch']} days"
+    
+    conn = get_db_connection()
+    spooled = []
+    try:
+        cursor = conn.cursor()
+        spooled = insert_predictions(cursor, accepted)
+        conn.commit()
+        cursor.close()
+    except Exception:
+        conn.rollback()
+        for image_sha in spooled:
+            image_writer.unspool(image_sha)
+        raise
+    finally:
+        conn.close()
+    
+    for image_sha in spooled:
+        image_writer.write(image_sha)
+    for user_id in {entry[0] for entry in accepted}:
+        try:
+            read_cache.bump(user_id)
+        except OSError as e:
+            logger.warning('Read cache invalidation failed: %s', e)
+        saved = [entry for entry in accepted if entry[0] == user_id]
+        publish_event(user_id, 'predictions.created', {
+            'prawn_ids': sorted({entry[1] for entry in saved}), 'count': len(saved)
+        })
+    
+    logger.info('Scheduled captures', extra={'fields': {
+        'saved': len(accepted), 'not_saved': len(jobs) - len(accepted)
+    }})
+    return statuses
+
+capture_scheduler = CaptureScheduler(get_db_connection, run_capture_jobs)
+
+@app.route('/api/capture_schedules', methods=['GET'])
+@login_required
+def get_capture_schedules():
+    """Capture schedules of the current user, with their last result"""
+    user_id = session.get('user_id')
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute('''
+            SELECT cs.id, cs.prawn_id, p.name AS prawn_name, p.location_id, l.name AS location_name,
+                   cs.camera_url, cs.interval_minutes, cs.enabled, cs.next_run_at, cs.last_run_at,
+                   cs.last_status
+            FROM capture_schedules cs
+            JOIN prawns p ON cs.prawn_id = p.id
+            LEFT JOIN locations l ON p.location_id = l.id
+            WHERE cs.user_id = %s
+            ORDER BY l.name, p.name
+        ''', (user_id,))
+        schedules = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        for schedule in schedules:
+            schedule['enabled'] = bool(schedule['enabled'])
+            for field in ('next_run_at', 'last_run_at'):
+                if schedule[field]:
+                    schedule[field] = schedule[field].isoformat()
+        return jsonify({'success': True, 'schedules': schedules, 'scheduler': capture_scheduler.stats()})
+    except Exception as e:
+        logger.exception('Get capture schedules error: %s', e)
+        return jsonify({'success': False, 'message': 'Server error'})
+
+@app.route('/api/save_capture_schedule', methods=['POST'])
+@login_required
+def save_capture_schedule():
+    """Create or update the capture schedule of a prawn, or of every prawn in a location"""
+    data = request.get_json()
+    user_id = session.get('user_id')
+    prawn_id = data.get('prawn_id')
+    location_id = data.get('location_id')
+    camera_url = (data.get('camera_url') or '').strip().rstrip('/') or None
+    enabled = bool(data.get('enabled', True))
+    
+    try:
+        interval_minutes = int(data.get('interval_minutes'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Interval (minutes) required'})
+    if interval_minutes < CAPTURE_MIN_INTERVAL_MINUTES:
+        return jsonify({'success': False,
+                        'message': f'Interval must be at least {CAPTURE_MIN_INTERVAL_MINUTES} minutes'})
+    if not prawn_id and not location_id:
+        return jsonify({'success': False, 'message': 'Prawn or location required'})
+    if camera_url is not None and camera_url not in capture_camera_urls():
+        return jsonify({'success': False, 'message': 'Unknown camera'})
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        if prawn_id:
+            cursor.execute('SELECT id FROM prawns WHERE id = %s AND user_id = %s', (prawn_id, user_id))
+        else:
+            cursor.execute('SELECT id FROM prawns WHERE location_id = %s AND user_id = %s',
+                           (location_id, user_id))
+        prawn_ids = [row[0] for row in cursor.fetchall()]
+        if not prawn_ids:
+            cursor.close()
+            conn.close()
+            return jsonify({'success': False, 'message': 'No prawns found'})
+        
+        cursor.executemany(
+            '''INSERT INTO capture_schedules
+                (user_id, prawn_id, camera_url, interval_minutes, enabled, next_run_at)
+                VALUES (%s, %s, %s, %s, %s, NOW()) AS new
+                ON DUPLICATE KEY UPDATE
+                    camera_url = new.camera_url,
+                    interval_minutes = new.interval_minutes,
+                    enabled = new.enabled,
+                    next_run_at = LEAST(capture_schedules.next_run_at,
+                                        DATE_ADD(NOW(), INTERVAL new.interval_minutes MINUTE))''',
+            [(user_id, pid, camera_url, interval_minutes, enabled) for pid in prawn_ids]
+        )
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({'success': True, 'message': 'Capture schedule saved', 'prawn_ids': prawn_ids})
+    except Exception as e:
+        logger.exception('Save capture schedule error: %s', e)
+        return jsonify({'success': False, 'message': 'Server error'})
+
+@app.route('/api/delete_capture_schedule', methods=['POST'])
+@login_required
+def delete_capture_schedule():
+    """Stop scheduled captures for a prawn, or for every prawn in a location"""
+    data = request.get_json()
+    user_id = session.get('user_id')
+    prawn_id = data.get('prawn_id')
+    location_id = data.get('location_id')
+    if not prawn_id and not location_id:
+        return jsonify({'success': False, 'message': 'Prawn or location required'})
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        if prawn_id:
+            cursor.execute('DELETE FROM capture_schedules WHERE prawn_id = %s AND user_id = %s',
+                           (prawn_id, user_id))
+        else:
+            cursor.execute('''
+                DELETE cs FROM capture_schedules cs
+                JOIN prawns p ON cs.prawn_id = p.id
+                WHERE p.location_id = %s AND cs.user_id = %s
+            ''', (location_id, user_id))
+        deleted = cursor.rowcount
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({'success': True, 'message': 'Capture schedule deleted', 'deleted': deleted})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        logger.exception('Delete capture schedule error: %s', e)
+        return jsonify({'success': False, 'message': 'Server error'})
 
 # ============================================
 # API ROUTES - Location Management
@@ -841,6 +1789,7 @@ def camera_stream():
 
 @app.route('/api/get_locations', methods=['GET'])
 @login_required
+@cached_read
 def get_locations():
     """Get all locations for current user"""
     user_id = session.get('user_id')
@@ -856,11 +1805,12 @@ def get_locations():
         conn.close()
         return jsonify({'success': True, 'locations': locations})
     except Exception as e:
-        print(f"Get locations error: {e}")
+        logger.exception('Get locations error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/save_location', methods=['POST'])
 @login_required
+@invalidates_reads
 def save_location():
     """Save new location"""
     data = request.get_json()
@@ -881,13 +1831,16 @@ def save_location():
         location_id = cursor.lastrowid
         cursor.close()
         conn.close()
-        return jsonify({'success': True, 'location': {'id': location_id, 'name': name.strip()}})
+        location = {'id': location_id, 'name': name.strip()}
+        publish_event(user_id, 'location.created', location)
+        return jsonify({'success': True, 'location': location})
     except Exception as e:
-        print(f"Save location error: {e}")
+        logger.exception('Save location error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/rename_location', methods=['POST'])
 @login_required
+@invalidates_reads
 def rename_location():
     """Rename existing location"""
     data = request.get_json()
@@ -905,33 +1858,318 @@ def rename_location():
             conn.close()
             return jsonify({'success': False, 'message': 'Location name already exists'})
         cursor.execute('UPDATE locations SET name = %s WHERE id = %s AND user_id = %s', (new_name.strip(), location_id, user_id))
+        renamed = cursor.rowcount
         conn.commit()
         cursor.close()
         conn.close()
+        if renamed:
+            publish_event(user_id, 'location.updated', {'id': location_id, 'name': new_name.strip()})
         return jsonify({'success': True, 'message': 'Location renamed successfully'})
     except Exception as e:
-        print(f"Rename location error: {e}")
+        logger.exception('Rename location error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 @app.route('/api/delete_location', methods=['POST'])
 @login_required
+@invalidates_reads
 def delete_location():
-    """Delete location"""
+    """Delete location.
+
+    If prawns are still in it, 'reassign_location_id' names the location
+    they move to; the move and the delete happen in one transaction.
+    """
     data = request.get_json()
     user_id = session.get('user_id')
     location_id = data.get('location_id')
+    reassign_location_id = data.get('reassign_location_id')
     if not location_id:
         return jsonify({'success': False, 'message': 'Location ID required'})
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        cursor = conn.cursor(dictionary=True)
+        target = None
+        if reassign_location_id:
+            cursor.execute('SELECT id, name FROM locations WHERE id = %s AND user_id = %s',
+                           (reassign_location_id, user_id))
+            target = cursor.fetchone()
+            if not target or str(target['id']) == str(location_id):
+                cursor.close()
+                conn.close()
+                return jsonify({'success': False, 'message': 'Invalid location'})
+            cursor.execute('UPDATE prawns SET location_id = %s WHERE user_id = %s AND location_id = %s',
+                           (target['id'], user_id, location_id))
+            moved = cursor.rowcount
+            hatch_summary.move_location(cursor, user_id, location_id, target['id'])
+        else:
+            moved = 0
+            cursor.execute('SELECT COUNT(*) AS prawns FROM prawns WHERE user_id = %s AND location_id = %s',
+                           (user_id, location_id))
+            remaining = cursor.fetchone()['prawns']
+            if remaining:
+                cursor.close()
+                conn.close()
+                return jsonify({
+                    'success': False,
+                    'message': 'Location still has prawns. Choose where to move them.',
+                    'reassign_required': True,
+                    'prawn_count': remaining
+                })
         cursor.execute('DELETE FROM locations WHERE id = %s AND user_id = %s', (location_id, user_id))
+        deleted = cursor.rowcount
+        if not deleted:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            return jsonify({'success': False, 'message': 'Location not found'})
         conn.commit()
         cursor.close()
         conn.close()
-        return jsonify({'success': True, 'message': 'Location deleted successfully'})
+        event = {'id': location_id}
+        if target is not None:
+            event['reassigned_to'] = target
+        publish_event(user_id, 'location.deleted', event)
+        return jsonify({'success': True, 'message': 'Location deleted successfully', 'prawns_moved': moved})
     except Exception as e:
-        print(f"Delete location error: {e}")
+        logger.exception('Delete location error: %s', e)
+        return jsonify({'success': False, 'message': 'Server error'})
+
+# ============================================
+# API ROUTES - Bulk Changes
+# ============================================
+
+BULK_MUTATION_MAX_IDS = int(os.environ.get('BULK_MUTATION_MAX_IDS', '500'))
+
+def bulk_ids(values, what):
+    """Distinct integer ids from a JSON list. Raises ValueError with a message."""
+    if not isinstance(values, list) or not values:
+        raise ValueError(f'{what} IDs required')
+    try:
+        ids = list(dict.fromkeys(int(value) for value in values))
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {what.lower()} ID')
+    if len(ids) > BULK_MUTATION_MAX_IDS:
+        raise ValueError(f'At most {BULK_MUTATION_MAX_IDS} {what.lower()}s per request')
+    return ids
+
+def owned_prawn_ids(cursor, user_id, prawn_ids):
+    """The given prawn ids that belong to the user, locked for this transaction"""
+    placeholders = ', '.join(['%s'] * len(prawn_ids))
+    cursor.execute(
+        f'SELECT id FROM prawns WHERE user_id = %s AND id IN ({placeholders}) FOR UPDATE',
+        [user_id] + prawn_ids
+    )
+    return [row['id'] for row in cursor.fetchall()]
+
+def delete_prediction_rows(cursor, user_id, column, ids):
+    """Delete the user's predictions WHERE column IN ids, keeping summaries current.
+
+    Returns (deleted rows [{id, prawn_id}], image paths no row references any
+    more). Remove those files with image_writer.delete() after commit.
+    """
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        f'SELECT id, prawn_id, image_path FROM predictions WHERE user_id = %s AND {column} IN ({placeholders})',
+        [user_id] + ids
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        return [], []
+    row_ids = [row['id'] for row in rows]
+    placeholders = ', '.join(['%s'] * len(row_ids))
+    cursor.execute(f'DELETE FROM predictions WHERE id IN ({placeholders})', row_ids)
+    hatch_summary.refresh(cursor, [row['prawn_id'] for row in rows])
+    
+    # Identical photos share one stored file; keep the ones still referenced
+    image_paths = sorted({row['image_path'] for row in rows if row['image_path']})
+    if image_paths:
+        placeholders = ', '.join(['%s'] * len(image_paths))
+        cursor.execute(
+            f'SELECT DISTINCT image_path FROM predictions WHERE image_path IN ({placeholders})',
+            image_paths
+        )
+        still_used = {row['image_path'] for row in cursor.fetchall()}
+        image_paths = [path for path in image_paths if path not in still_used]
+    return [{'id': row['id'], 'prawn_id': row['prawn_id']} for row in rows], image_paths
+
+@app.route('/api/bulk_move_prawns', methods=['POST'])
+@login_required
+@invalidates_reads
+def bulk_move_prawns():
+    """Move many prawns to one location in a single transaction"""
+    data = request.get_json()
+    user_id = session.get('user_id')
+    new_location_id = data.get('new_location_id')
+    try:
+        prawn_ids = bulk_ids(data.get('prawn_ids'), 'Prawn')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    if not new_location_id:
+        return jsonify({'success': False, 'message': 'Prawn IDs and location required'})
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute('SELECT id, name FROM locations WHERE id = %s AND user_id = %s',
+                       (new_location_id, user_id))
+        location = cursor.fetchone()
+        if not location:
+            cursor.close()
+            conn.close()
+            return jsonify({'success': False, 'message': 'Invalid location'})
+        moved = owned_prawn_ids(cursor, user_id, prawn_ids)
+        if moved:
+            placeholders = ', '.join(['%s'] * len(moved))
+            cursor.execute(
+                f'UPDATE prawns SET location_id = %s WHERE user_id = %s AND id IN ({placeholders})',
+                [location['id'], user_id] + moved
+            )
+            hatch_summary.move_prawns(cursor, moved, user_id, location['id'])
+        conn.commit()
+        cursor.close()
+        conn.close()
+        if moved:
+            publish_event(user_id, 'prawns.updated', {
+                'ids': moved, 'location_id': location['id'], 'location_name': location['name']
+            })
+        return jsonify({'success': True, 'moved': moved, 'new_location': location['name']})
+    except Exception as e:
+        logger.exception('Bulk move prawns error: %s', e)
+        return jsonify({'success': False, 'message': 'Server error'})
+
+@app.route('/api/bulk_rename_prawns', methods=['POST'])
+@login_required
+@invalidates_reads
+def bulk_rename_prawns():
+    """Rename many prawns with one UPDATE: {'renames': [{'prawn_id', 'new_name'}, ...]}"""
+    data = request.get_json()
+    user_id = session.get('user_id')
+    renames = data.get('renames')
+    if not isinstance(renames, list) or not renames:
+        return jsonify({'success': False, 'message': 'Prawn IDs and new names required'})
+    
+    names = {}
+    for rename in renames:
+        new_name = (rename.get('new_name') or '').strip() if isinstance(rename, dict) else ''
+        if not new_name:
+            return jsonify({'success': False, 'message': 'Prawn ID and new name required'})
+        names[rename.get('prawn_id')] = new_name
+    try:
+        prawn_ids = bulk_ids(list(names), 'Prawn')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    names = {int(prawn_id): name for prawn_id, name in names.items()}
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        renamed = owned_prawn_ids(cursor, user_id, prawn_ids)
+        if renamed:
+            cases = ' '.join(['WHEN %s THEN %s'] * len(renamed))
+            placeholders = ', '.join(['%s'] * len(renamed))
+            params = [value for prawn_id in renamed for value in (prawn_id, names[prawn_id])]
+            cursor.execute(
+                f'UPDATE prawns SET name = CASE id {cases} END WHERE user_id = %s AND id IN ({placeholders})',
+                params + [user_id] + renamed
+            )
+        conn.commit()
+        cursor.close()
+        conn.close()
+        if renamed:
+            publish_event(user_id, 'prawns.updated', {
+                'names': {str(prawn_id): names[prawn_id] for prawn_id in renamed}
+            })
+        return jsonify({'success': True, 'renamed': renamed})
+    except Exception as e:
+        logger.exception('Bulk rename prawns error: %s', e)
+        return jsonify({'success': False, 'message': 'Server error'})
+
+@app.route('/api/bulk_delete_prawns', methods=['POST'])
+@login_required
+@invalidates_reads
+def bulk_delete_prawns():
+    """Delete many prawns with their predictions, schedules and image files.
+
+    Needs the password or a step-up token, like delete_prawn.
+    """
+    data = request.get_json()
+    user_id = session.get('user_id')
+    try:
+        prawn_ids = bulk_ids(data.get('prawn_ids'), 'Prawn')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    if not (data.get('password') or data.get('step_up_token')):
+        return jsonify({'success': False, 'message': 'Prawn IDs and password required'})
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        verified, step_up_token = verify_step_up(cursor, user_id, data)
+        if not verified:
+            cursor.close()
+            conn.close()
+            return jsonify({'success': False, 'message': 'Incorrect password', 'step_up_required': True})
+        
+        started = time.time()
+        deleted = owned_prawn_ids(cursor, user_id, prawn_ids)
+        orphaned = []
+        if deleted:
+            placeholders = ', '.join(['%s'] * len(deleted))
+            _, orphaned = delete_prediction_rows(cursor, user_id, 'prawn_id', deleted)
+            cursor.execute(
+                f'DELETE FROM capture_schedules WHERE user_id = %s AND prawn_id IN ({placeholders})',
+                [user_id] + deleted
+            )
+            cursor.execute(
+                f'DELETE FROM prawns WHERE user_id = %s AND id IN ({placeholders})',
+                [user_id] + deleted
+            )
+            hatch_summary.remove_prawns(cursor, deleted, user_id)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        for image_path in orphaned:
+            image_writer.delete(image_path, unless_used_since=started)
+        if deleted:
+            publish_event(user_id, 'prawns.deleted', {'ids': deleted})
+        response = {'success': True, 'deleted': deleted}
+        if step_up_token:
+            response.update(step_up_token=step_up_token, step_up_expires_in=step_up_tokens.ttl)
+        return jsonify(response)
+    except HashingBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '2'}
+    except Exception as e:
+        logger.exception('Bulk delete prawns error: %s', e)
+        return jsonify({'success': False, 'message': 'Server error'})
+
+@app.route('/api/bulk_delete_predictions', methods=['POST'])
+@login_required
+@invalidates_reads
+def bulk_delete_predictions():
+    """Delete many prediction records and the image files no longer used"""
+    data = request.get_json()
+    user_id = session.get('user_id')
+    try:
+        prediction_ids = bulk_ids(data.get('prediction_ids'), 'Prediction')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        started = time.time()
+        deleted, orphaned = delete_prediction_rows(cursor, user_id, 'id', prediction_ids)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        for image_path in orphaned:
+            image_writer.delete(image_path, unless_used_since=started)
+        if deleted:
+            publish_event(user_id, 'predictions.deleted', {'predictions': deleted})
+        return jsonify({'success': True, 'deleted': [row['id'] for row in deleted]})
+    except Exception as e:
+        logger.exception('Bulk delete predictions error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
 
 # ============================================
@@ -940,6 +2178,7 @@ def delete_location():
 
 @app.route('/api/get_dashboard_data', methods=['GET'])
 @login_required
+@cached_read
 def get_dashboard_data():
     """Get all dashboard data in one call"""
     user_id = session.get('user_id')
@@ -961,47 +2200,64 @@ def get_dashboard_data():
             if prawn.get('created_at'):
                 prawn['created_at'] = prawn['created_at'].isoformat()
         
-        # Get latest prediction per prawn + total count
-        total_predictions = 0
-        upcoming_hatches = []
-        latest_predictions = []
+        prawns_by_id = {prawn['id']: prawn for prawn in prawns}
         
-        for prawn in prawns:
-            cursor.execute(
-                '''SELECT p.*, pr.location_id
-                   FROM predictions p
-                   LEFT JOIN prawns pr ON p.prawn_id = pr.id
-                   WHERE p.user_id = %s AND p.prawn_id = %s
-                   ORDER BY p.created_at DESC''',
-                (user_id, prawn['id'])
-            )
-            preds = cursor.fetchall()
-            total_predictions += len(preds)
-            
-            for pred in preds:
-                if pred.get('created_at'):
-                    pred['created_at'] = pred['created_at'].isoformat()
-                pred['prawn_name'] = prawn['name']
-                pred['location_name'] = prawn.get('location_name', '')
-                latest_predictions.append(pred)
-            
-            # Latest prediction for upcoming hatches
-            if preds:
-                latest = preds[0]
-                if latest['predicted_days'] <= 5:
-                    upcoming_hatches.append({
-                        'prawn': prawn,
-                        'prediction': latest,
-                        'days': latest['predicted_days']
-                    })
-        
-        # Sort latest predictions by date
-        latest_predictions.sort(
-            key=lambda x: x['created_at'], reverse=True
+        # Total predictions across the user's prawns (from the hatch summary)
+        cursor.execute(
+            'SELECT COALESCE(SUM(prediction_count), 0) AS total FROM prawn_hatch_summary WHERE user_id = %s',
+            (user_id,)
+        )
+        total_predictions = int(cursor.fetchone()['total'])
+        
+        # Latest 6 predictions for the feed
+        cursor.execute(
+            '''SELECT p.*, pr.location_id, pr.name AS prawn_name, l.name AS location_name
+               FROM predictions p
+               JOIN prawns pr ON pr.id = p.prawn_id AND pr.user_id = %s
+               LEFT JOIN locations l ON pr.location_id = l.id
+               WHERE p.user_id = %s
+               ORDER BY p.created_at DESC, p.id DESC
+               LIMIT 6''',
+            (user_id, user_id)
         )
+        latest_predictions = cursor.fetchall()
+        for pred in latest_predictions:
+            if pred.get('created_at'):
+                pred['created_at'] = pred['created_at'].isoformat()
+            pred['thumbnail_path'] = image_store.thumbnail_path(pred.get('image_path'))
         
-        # Sort upcoming by days
-        upcoming_hatches.sort(key=lambda x: x['days'])
+        # Latest prediction per prawn, kept only if hatching within 5 days
+        cursor.execute(
+            '''SELECT * FROM prawn_hatch_summary
+               WHERE user_id = %s AND predicted_days <= 5
+               ORDER BY predicted_days ASC''',
+            (user_id,)
+        )
+        upcoming_hatches = []
+        for summary in cursor.fetchall():
+            prawn = prawns_by_id.get(summary['prawn_id'])
+            if prawn is None:
+                continue
+            latest = {
+                'id': summary['latest_prediction_id'],
+                'user_id': summary['user_id'],
+                'prawn_id': summary['prawn_id'],
+                'image_path': summary['latest_image_path'],
+                'thumbnail_path': image_store.thumbnail_path(summary['latest_image_path']),
+                'predicted_days': summary['predicted_days'],
+                'current_day': summary['current_day'],
+                'confidence': summary['confidence'],
+                'created_at': summary['latest_created_at'].isoformat() if summary.get('latest_created_at') else None,
+                'projected_hatch_date': summary['projected_hatch_date'].isoformat() if summary.get('projected_hatch_date') else None,
+                'location_id': summary['location_id'],
+                'prawn_name': prawn['name'],
+                'location_name': prawn.get('location_name', '')
+            }
+            upcoming_hatches.append({
+                'prawn': prawn,
+                'prediction': latest,
+                'days': latest['predicted_days']
+            })
         
         cursor.close()
         conn.close()
@@ -1012,14 +2268,205 @@ def get_dashboard_data():
             'total_predictions': total_predictions,
             'upcoming_count': len(upcoming_hatches),
             'upcoming_hatches': upcoming_hatches,
-            'latest_predictions': latest_predictions[:6],
+            'latest_predictions': latest_predictions,
             'prawns': prawns
         })
         
     except Exception as e:
-        print(f"Dashboard data error: {e}")
+        logger.exception('Dashboard data error: %s', e)
         return jsonify({'success': False, 'message': 'Server error'})
+
+# ============================================
+# API ROUTES - Live Updates
+# ============================================
+
+@app.route('/api/events')
+@login_required
+def events():
+    """Server-Sent Events stream of the user's prawn, prediction and location changes.
+
+    Each event carries a small delta (see publish_event calls); a 'resync'
+    event means the client missed events and should reload its lists.
+    """
+    user_id = session.get('user_id')
+    body = event_broker.subscribe(user_id, request.headers.get('Last-Event-ID'))
+    if body is None:
+        # Every stream slot in this worker is taken; EventSource retries
+        return Response('Too many live streams\n', status=503, headers={'Retry-After': '30'})
+    return Response(
+        body,
+        content_type=EVENTS_CONTENT_TYPE,
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/events/stats')
+@login_required
+def events_stats():
+    """Open streams and event counters for this worker"""
+    return jsonify({'success': True, **event_broker.stats()})
+
+# ============================================
+# METRICS
+# ============================================
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint, summed over every worker on this host.
+
+    Not behind the login so Prometheus can scrape it; set METRICS_TOKEN to
+    require 'Authorization: Bearer <token>'.
+    """
+    if not metrics_registry.enabled:
+        return jsonify({'error': 'Not found'}), 404
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get('Authorization', ''),
+                                                 f'Bearer {METRICS_TOKEN}'):
+        return Response('Unauthorized\n', status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
     
+# ============================================
+# CLI - Inference backends
+# ============================================
+
+@app.cli.command('compare-backends')
+@click.option('--images', 'image_dir', default=None,
+              help='Folder of sample images (random input if omitted)')
+@click.option('--batch-size', default=1, show_default=True)
+@click.option('--runs', default=20, show_default=True)
+@click.option('--tolerance', default=1e-3, show_default=True,
+              help='Max allowed absolute output difference from keras')
+def compare_backends_command(image_dir, batch_size, runs, tolerance):
+    """Latency and output parity of keras / tf_function / tflite for both models"""
+    failed = []
+    model_manager.load()
+    batch = np.random.rand(batch_size, 224, 224, 3).astype(np.float32)
+    if image_dir:
+        files = sorted(f for f in os.listdir(image_dir) if allowed_file(f))[:batch_size]
+        if files:
+            batch = np.empty((len(files), 224, 224, 3), dtype=np.float32)
+            for i, f in enumerate(files):
+                preprocess(os.path.join(image_dir, f), out=batch[i])
+
+    for label, backend in (('Regression model', model_manager.model),
+                           ('Binary model', model_manager.binary_model)):
+        if backend is None:
+            click.echo(f"{label}: not loaded, skipped")
+            continue
+        click.echo(f"{label} (batch of {len(batch)}, {runs} runs):")
+        for row in compare_backends(backend.keras_model, batch, BACKENDS, runs):
+            if 'error' in row:
+                click.echo(f"  {row['backend']:<12} ERROR {row['error']}")
+                failed.append(f"{label} / {row['backend']}")
+                continue
+            parity = 'OK' if row['max_abs_diff'] <= tolerance else 'MISMATCH'
+            if parity != 'OK':
+                failed.append(f"{label} / {row['backend']}")
+            click.echo(
+                f"  {row['backend']:<12} build {row['build_ms']:>8.1f} ms  "
+                f"p50 {row['latency_ms_p50']:>7.2f} ms  p95 {row['latency_ms_p95']:>7.2f} ms  "
+                f"max |diff| {row['max_abs_diff']:.2e}  {parity}"
+            )
+
+    if failed:
+        raise click.ClickException(f"Backend parity check failed: {', '.join(failed)}")
+
+@app.cli.command('benchmark-preprocessing')
+@click.option('--images', 'image_dir', required=True, help='Folder of sample photos')
+@click.option('--runs', default=10, show_default=True)
+def benchmark_preprocessing_command(image_dir, runs):
+    """Per-image time and peak memory of the old vs the lean preprocessing"""
+    paths = [os.path.join(image_dir, f) for f in sorted(os.listdir(image_dir)) if allowed_file(f)]
+    if not paths:
+        raise click.ClickException(f"No images found in {image_dir}")
+    results = benchmark_preprocessing(paths, runs)
+    click.echo(f"{len(paths)} images x {runs} runs")
+    for label in ('legacy', 'lean'):
+        row = results[label]
+        click.echo(f"  {label:<7} p50 {row['ms_p50']:>7.2f} ms  p95 {row['ms_p95']:>7.2f} ms  "
+                   f"peak {row['peak_kb']:>9.1f} KB")
+    click.echo(f"  max |diff| of model input: {results['max_abs_diff']:.4f}")
+
+# ============================================
+# CLI - Database maintenance
+# ============================================
+
+@app.cli.command('db-migrate')
+@click.option('--dry-run', is_flag=True, help='List pending migrations without applying them')
+def db_migrate_command(dry_run):
+    """Apply pending schema migrations from migrations/"""
+    conn = db_pool.connect()
+    try:
+        if dry_run:
+            waiting = migrate.pending(conn)
+            for migration in waiting:
+                click.echo(f"  pending {migration.version:04d} {migration.name}")
+            click.echo(f"{len(waiting)} pending migrations")
+            return
+        applied = migrate.migrate_locked(
+            conn, on_apply=lambda m: click.echo(f"  applying {m.version:04d} {m.name}")
+        )
+        click.echo(f"{len(applied)} migrations applied")
+    finally:
+        conn.close()
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """EXPLAIN every query in app.py and its SQL modules; fail on any full table scan"""
+    queries = migrate.project_queries(os.path.dirname(os.path.abspath(__file__)))
+    conn = get_db_connection()
+    try:
+        results = migrate.check_query_plans(conn, queries)
+    finally:
+        conn.close()
+    failed = [r for r in results if r[3]]
+    for function, line, sql, problems in results:
+        status = f"FULL SCAN of {', '.join(problems)}" if problems else 'OK'
+        click.echo(f"  {function:<40} line {line:<5} {status}")
+    click.echo(f"{len(results)} queries checked, {len(queries) - len(results)} skipped (plain inserts)")
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} queries scan a whole table; run flask db-migrate, add an index "
+            f"or list the table in migrate.SMALL_TABLES"
+        )
+
+@app.cli.command('flush-image-spool')
+def flush_image_spool_command():
+    """Write every spooled image (e.g. after failures) and wait for it to finish"""
+    count = image_writer.resume()
+    click.echo(f"{count} spooled images queued")
+    if not image_writer.drain():
+        raise click.ClickException('Image writer did not finish in time')
+    click.echo(f"Done: {image_writer.stats()}")
+
+@app.cli.command('rebuild-hatch-summary')
+@click.option('--user-id', type=int, default=None, help='Only this user (default: everyone)')
+@click.option('--check', is_flag=True, help='Report drift without changing anything')
+def rebuild_hatch_summary_command(user_id, check):
+    """Recompute prawn_hatch_summary from the predictions table"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        drifted = hatch_summary.drift(cursor, user_id)
+        click.echo(f"{len(drifted)} prawn summaries out of date"
+                   + (f": {', '.join(map(str, drifted[:20]))}" if drifted else ''))
+        if check:
+            if drifted:
+                raise click.ClickException('Hatch summary has drifted; run without --check to repair')
+            return
+        rows = hatch_summary.rebuild(cursor, user_id)
+        conn.commit()
+        cursor.close()
+        click.echo(f"Rebuilt {rows} prawn summaries")
+    finally:
+        conn.close()
+
+@app.cli.command('run-capture-jobs')
+def run_capture_jobs_command():
+    """Run the scheduled captures that are due now, once"""
+    model_manager.start(background=False)
+    count = capture_scheduler.run_once()
+    image_writer.drain()
+    click.echo(f"{count} capture jobs run: {capture_scheduler.stats()}")
+
 @app.errorhandler(404)
 def not_found(e):
     return jsonify({'error': 'Not found'}), 404
@@ -1030,12 +2477,22 @@ def server_error(e):
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-print("="*60)
-print("🦐 HATCHLY - Prawn Egg Hatch Prediction System")
-print("="*60)
-load_ml_model()
-load_binary_model()
-print("="*60)
+if MODEL_LOAD_MODE == 'preload':
+    # gunicorn --preload: load weights once in the master so workers share
+    # them copy-on-write. Warm-up runs per worker (see gunicorn.conf.py).
+    model_manager.load()
+elif MODEL_LOAD_MODE == 'background':
+    model_manager.start()
+if CAPTURE_SCHEDULER_ENABLED and MODEL_LOAD_MODE != 'preload':
+    # With --preload the scheduler starts in each worker (gunicorn.conf.py)
+    capture_scheduler.start()
+logger.info('Hatchly started', extra={'fields': {
+    'model_load_mode': MODEL_LOAD_MODE, 'capture_scheduler': CAPTURE_SCHEDULER_ENABLED,
+    'tracing': tracing.TRACING_ENABLED, 'profile_requests': tracing.PROFILE_REQUESTS
+}})
 
 if __name__ == '__main__':
+    # Under gunicorn the master does this in on_starting (gunicorn.conf.py)
+    migrate.run_at_startup(DB_CONFIG)
+    image_writer.start()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""
+Hatchly camera client
+
+One client per camera, shared by every request in a worker process:
+
+  - A keep-alive requests.Session, so calls reuse the TCP connection to the
+    Raspberry Pi instead of reconnecting every time.
+  - A background poller hits /status every CAMERA_STATUS_INTERVAL seconds;
+    /api/camera/status returns that cached result immediately, with its age.
+  - A circuit breaker: after CAMERA_BREAKER_THRESHOLD consecutive failures
+    the camera is treated as offline and calls fail at once with
+    CameraUnavailable instead of waiting for a timeout. The poller keeps
+    probing, and its first successful probe closes the breaker again.
+
+client_for() returns the shared client for a camera URL, so scheduled
+captures (capture_scheduler.py) reuse the same session and breaker.
+"""
+
+import os
+import threading
+import time
+
+CAMERA_STATUS_INTERVAL = float(os.environ.get('CAMERA_STATUS_INTERVAL', '5'))
+CAMERA_CONNECT_TIMEOUT = float(os.environ.get('CAMERA_CONNECT_TIMEOUT', '2'))
+CAMERA_READ_TIMEOUT = float(os.environ.get('CAMERA_READ_TIMEOUT', '5'))
+CAMERA_BREAKER_THRESHOLD = int(os.environ.get('CAMERA_BREAKER_THRESHOLD', '3'))
+CAMERA_BREAKER_RESET = float(os.environ.get('CAMERA_BREAKER_RESET', '30'))
+
+
+class CameraUnavailable(Exception):
+    """The camera is offline, or the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half_open after a cool-down"""
+
+    def __init__(self, threshold=CAMERA_BREAKER_THRESHOLD, reset_after=CAMERA_BREAKER_RESET):
+        self.threshold = max(1, threshold)
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self.counters = {'opened': 0, 'rejected': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """True if a call may go through (closed, or one trial when half open)"""
+        with self._lock:
+            state = self._state()
+            if state == 'open':
+                self.counters['rejected'] += 1
+                return False
+            if state == 'half_open':
+                # Let this call try; keep the others out until it reports back
+                self._opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                if self._opened_at is None:
+                    self.counters['opened'] += 1
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._state(),
+                'consecutive_failures': self._failures,
+                **self.counters
+            }
+
+
+class CameraClient:
+    """Keep-alive HTTP client for the camera with cached status and a breaker"""
+
+    def __init__(self, base_url, status_interval=CAMERA_STATUS_INTERVAL,
+                 connect_timeout=CAMERA_CONNECT_TIMEOUT, read_timeout=CAMERA_READ_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.status_interval = status_interval
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self._poller = None
+        self._first_status = threading.Event()
+        self._status = None
+        self.counters = {
+            'requests': 0,
+            'failures': 0,
+            'polls': 0,
+            'poll_failures': 0
+        }
+
+    def _ensure_session(self):
+        """Session and poller, once per process (gunicorn forks workers)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._session
+        with self._lock:
+            if self._pid != pid:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._first_status = threading.Event()
+                self._status = None
+                self._poller = threading.Thread(
+                    target=self._poll, name='hatchly-camera-status', daemon=True
+                )
+                self._pid = pid
+                self._poller.start()
+        return self._session
+
+    def _get(self, path, timeout=None, use_breaker=True):
+        session = self._ensure_session()
+        if use_breaker and not self.breaker.allow():
+            raise CameraUnavailable('Camera is offline (circuit open)')
+        with self._lock:
+            self.counters['requests'] += 1
+        try:
+            response = session.get(f'{self.base_url}{path}', timeout=timeout or self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            self.breaker.record_failure()
+            with self._lock:
+                self.counters['failures'] += 1
+            raise CameraUnavailable(str(e)) from e
+        self.breaker.record_success()
+        return data
+
+    def _poll(self):
+        while True:
+            checked_at = time.time()
+            try:
+                # The poller is the breaker's health probe, so it always calls
+                data = self._get('/status', use_breaker=False)
+                status = {'camera_online': True, 'data': data, 'error': None}
+            except CameraUnavailable as e:
+                status = {'camera_online': False, 'data': None, 'error': str(e)}
+            with self._lock:
+                self.counters['polls'] += 1
+                if not status['camera_online']:
+                    self.counters['poll_failures'] += 1
+                self._status = {**status, 'checked_at': checked_at}
+            self._first_status.set()
+            time.sleep(self.status_interval)
+
+    def status(self, first_wait=None):
+        """The poller's latest result. Only the very first call in a process
+        waits (up to first_wait seconds) for the first probe to finish."""
+        self._ensure_session()
+        if first_wait is None:
+            first_wait = sum(self.timeout)
+        self._first_status.wait(first_wait)
+        with self._lock:
+            status = dict(self._status) if self._status else {
+                'camera_online': False, 'data': None, 'error': 'Camera status not checked yet',
+                'checked_at': None
+            }
+        status['age_seconds'] = (round(time.time() - status['checked_at'], 3)
+                                 if status['checked_at'] else None)
+        return status
+
+    def capture(self):
+        """JSON from the camera's /capture ({'success', 'image' | 'error'})"""
+        return self._get('/capture')
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        status = self.status(first_wait=0)
+        return {
+            'camera_online': status['camera_online'],
+            'status_age_seconds': status['age_seconds'],
+            'last_error': status['error'],
+            'breaker': self.breaker.stats(),
+            **counters
+        }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client_for(base_url):
+    """The process-wide client for a camera base URL"""
+    base_url = base_url.rstrip('/')
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = _clients[base_url] = CameraClient(base_url)
+        return client
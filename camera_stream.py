@@ -0,0 +1,250 @@
+"""
+Hatchly camera stream fan-out
+
+Every viewer of /api/camera/stream used to open its own connection to the
+camera's /video_feed, and each one cost the Raspberry Pi another encoder
+session. Now each worker process keeps one upstream connection per camera
+URL and shares it:
+
+  - A reader thread parses the upstream MJPEG into whole JPEG frames (by
+    the SOI / EOI markers, so the camera's boundary string does not matter)
+    and keeps only the latest one.
+  - Each viewer waits for a newer frame than the last one it was sent.
+    There is no per-viewer queue, so a slow client skips frames instead of
+    buffering them, and no viewer can slow down the others.
+  - Each viewer is limited to CAMERA_STREAM_MAX_FPS.
+  - The upstream connection opens with the first viewer, reconnects with
+    backoff while anyone is watching, and closes CAMERA_STREAM_IDLE_TIMEOUT
+    seconds after the last viewer leaves.
+  - Each viewer still holds a worker thread, so open_stream() serves at
+    most CAMERA_MAX_VIEWERS viewers per worker, across all cameras, and
+    returns None for the next one (the route answers 503).
+"""
+
+import os
+import threading
+import time
+
+CAMERA_STREAM_MAX_FPS = float(os.environ.get('CAMERA_STREAM_MAX_FPS', '10'))
+CAMERA_STREAM_IDLE_TIMEOUT = float(os.environ.get('CAMERA_STREAM_IDLE_TIMEOUT', '10'))
+CAMERA_STREAM_CONNECT_TIMEOUT = float(os.environ.get('CAMERA_STREAM_CONNECT_TIMEOUT', '5'))
+CAMERA_MAX_VIEWERS = int(os.environ.get('CAMERA_MAX_VIEWERS', '1'))
+
+BOUNDARY = 'frame'
+CONTENT_TYPE = f'multipart/x-mixed-replace; boundary={BOUNDARY}'
+
+_SOI = b'\xff\xd8'
+_EOI = b'\xff\xd9'
+_READ_SIZE = 16 * 1024
+# Drop the buffer if no complete frame shows up within this many bytes
+_MAX_FRAME_BYTES = 8 * 1024 * 1024
+_BACKOFF = (0.5, 1.0, 2.0, 5.0)
+
+
+class FrameParser:
+    """Splits an MJPEG byte stream into JPEG frames"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, chunk):
+        """Add bytes; returns the complete frames found, oldest first"""
+        self._buffer += chunk
+        frames = []
+        while True:
+            start = self._buffer.find(_SOI)
+            if start < 0:
+                # Keep a trailing 0xff in case it starts the next marker
+                del self._buffer[:max(0, len(self._buffer) - 1)]
+                break
+            end = self._buffer.find(_EOI, start + 2)
+            if end < 0:
+                del self._buffer[:start]
+                if len(self._buffer) > _MAX_FRAME_BYTES:
+                    self._buffer.clear()
+                break
+            frames.append(bytes(self._buffer[start:end + 2]))
+            del self._buffer[:end + 2]
+        return frames
+
+
+class MJPEGBroadcaster:
+    """One upstream MJPEG connection shared by any number of viewers"""
+
+    def __init__(self, url, connect_timeout=CAMERA_STREAM_CONNECT_TIMEOUT,
+                 idle_timeout=CAMERA_STREAM_IDLE_TIMEOUT):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._viewers = 0
+        self._last_viewer_at = time.monotonic()
+        self._reader = None
+        self._error = None
+        self.counters = {
+            'connects': 0,
+            'frames_in': 0,
+            'frames_out': 0,
+            'frames_skipped': 0,
+            'upstream_errors': 0
+        }
+
+    # ------------------------------------------
+    # Upstream
+    # ------------------------------------------
+
+    def _ensure_reader(self):
+        # Called with self._cond held
+        if self._reader is None or not self._reader.is_alive():
+            self._reader = threading.Thread(
+                target=self._read_upstream, name='hatchly-camera-stream', daemon=True
+            )
+            self._reader.start()
+
+    def _idle(self):
+        with self._cond:
+            return (self._viewers == 0
+                    and time.monotonic() - self._last_viewer_at > self.idle_timeout)
+
+    def _read_upstream(self):
+        import requests
+
+        attempt = 0
+        while not self._idle():
+            try:
+                with requests.get(self.url, stream=True,
+                                  timeout=(self.connect_timeout, self.connect_timeout)) as response:
+                    response.raise_for_status()
+                    with self._cond:
+                        self.counters['connects'] += 1
+                        self._error = None
+                    attempt = 0
+                    parser = FrameParser()
+                    for chunk in response.iter_content(chunk_size=_READ_SIZE):
+                        frames = parser.feed(chunk)
+                        if frames:
+                            with self._cond:
+                                self._frame = frames[-1]
+                                self._seq += len(frames)
+                                self.counters['frames_in'] += len(frames)
+                                self._cond.notify_all()
+                        if self._idle():
+                            break
+            except Exception as e:
+                with self._cond:
+                    self.counters['upstream_errors'] += 1
+                    self._error = str(e)
+                    self._cond.notify_all()
+                time.sleep(_BACKOFF[min(attempt, len(_BACKOFF) - 1)])
+                attempt += 1
+        with self._cond:
+            self._frame = None
+            # A viewer may have arrived while we were shutting down
+            if self._viewers:
+                self._reader = None
+                self._ensure_reader()
+
+    # ------------------------------------------
+    # Viewers
+    # ------------------------------------------
+
+    def stream(self, max_fps=CAMERA_STREAM_MAX_FPS):
+        """Generator of multipart/x-mixed-replace parts for one viewer"""
+        with self._cond:
+            self._viewers += 1
+            self._ensure_reader()
+        min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        last_seq = 0
+        sent_at = 0.0
+        try:
+            while True:
+                wait = sent_at + min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._seq != last_seq and self._frame is not None,
+                                               timeout=self.connect_timeout * 2):
+                        if self._error is not None:
+                            return
+                        continue
+                    frame = self._frame
+                    if last_seq:
+                        self.counters['frames_skipped'] += max(0, self._seq - last_seq - 1)
+                    last_seq = self._seq
+                    self.counters['frames_out'] += 1
+                sent_at = time.monotonic()
+                yield (f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                       f'Content-Length: {len(frame)}\r\n\r\n').encode() + frame + b'\r\n'
+        finally:
+            with self._cond:
+                self._viewers -= 1
+                self._last_viewer_at = time.monotonic()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'url': self.url,
+                'viewers': self._viewers,
+                'connected': self._reader is not None and self._reader.is_alive() and self._error is None,
+                'last_error': self._error,
+                **self.counters
+            }
+
+
+class _Viewer:
+    """Response iterable that frees its viewer slot when the response is closed,
+    even if the client went away before the first frame"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._closed = False
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._chunks.close()
+        with _broadcasters_lock:
+            _viewer_slots['open'] -= 1
+
+
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+_viewer_slots = {'open': 0, 'rejected': 0}
+
+
+def broadcaster_for(url):
+    """The process-wide broadcaster for a camera stream URL"""
+    with _broadcasters_lock:
+        broadcaster = _broadcasters.get(url)
+        if broadcaster is None:
+            broadcaster = _broadcasters[url] = MJPEGBroadcaster(url)
+        return broadcaster
+
+
+def open_stream(url, max_viewers=CAMERA_MAX_VIEWERS, max_fps=CAMERA_STREAM_MAX_FPS):
+    """Response body for one viewer of a camera stream, or None when this
+    worker already serves max_viewers viewers (each one holds a worker thread)"""
+    with _broadcasters_lock:
+        if _viewer_slots['open'] >= max_viewers:
+            _viewer_slots['rejected'] += 1
+            return None
+        _viewer_slots['open'] += 1
+    return _Viewer(broadcaster_for(url).stream(max_fps))
+
+
+def viewer_stats():
+    with _broadcasters_lock:
+        return {'viewers': _viewer_slots['open'], 'max_viewers': CAMERA_MAX_VIEWERS,
+                'viewers_rejected': _viewer_slots['rejected']}
+
+
+def all_stats():
+    with _broadcasters_lock:
+        broadcasters = list(_broadcasters.values())
+    return [b.stats() for b in broadcasters]
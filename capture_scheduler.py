@@ -0,0 +1,180 @@
+"""
+Hatchly scheduled capture-and-predict
+
+Rows in capture_schedules ask for a prawn to be photographed and predicted
+every interval_minutes without anyone keeping the page open. Each worker
+process runs one scheduler thread that wakes every CAPTURE_SCHEDULER_TICK
+seconds and:
+
+  1. Claims up to CAPTURE_MAX_JOBS_PER_TICK due rows with a single UPDATE
+     that writes its own random token to claimed_by. The UPDATE is atomic,
+     so two workers (or hosts) never claim the same row; the claim is a
+     lease of CAPTURE_CLAIM_LEASE seconds, after which a job whose worker
+     died is picked up again.
+  2. Hands every claimed job to run_jobs(jobs) at once, which captures the
+     frames and runs them through the models as one batch (see
+     run_capture_jobs() in app.py). It returns a status string per job.
+  3. Completes each row: last_run_at / last_status are recorded, the next
+     run is scheduled interval_minutes from now and the claim is cleared.
+
+A job is rescheduled even when its capture or prediction fails, so an
+offline camera is retried at the normal interval rather than every tick.
+The scheduler is off unless CAPTURE_SCHEDULER_ENABLED is true;
+`flask run-capture-jobs` runs one tick by hand.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+
+CAPTURE_SCHEDULER_ENABLED = os.environ.get('CAPTURE_SCHEDULER_ENABLED', 'false').lower() == 'true'
+CAPTURE_SCHEDULER_TICK = float(os.environ.get('CAPTURE_SCHEDULER_TICK', '30'))
+CAPTURE_CLAIM_LEASE = int(os.environ.get('CAPTURE_CLAIM_LEASE', '300'))
+CAPTURE_MAX_JOBS_PER_TICK = int(os.environ.get('CAPTURE_MAX_JOBS_PER_TICK', '16'))
+CAPTURE_MIN_INTERVAL_MINUTES = int(os.environ.get('CAPTURE_MIN_INTERVAL_MINUTES', '5'))
+
+JOB_FIELDS = ('id', 'user_id', 'prawn_id', 'camera_url', 'interval_minutes')
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureJob:
+    """One claimed capture_schedules row"""
+
+    def __init__(self, id, user_id, prawn_id, camera_url, interval_minutes):
+        self.id = id
+        self.user_id = user_id
+        self.prawn_id = prawn_id
+        self.camera_url = camera_url
+        self.interval_minutes = interval_minutes
+
+
+class CaptureScheduler:
+    """Per-process thread that claims and runs due capture schedules.
+
+    connect() returns a database connection (closed after each tick).
+    run_jobs(jobs) runs a list of CaptureJob and returns one status string
+    per job, in order; it must not raise for a single failing job.
+    """
+
+    def __init__(self, connect, run_jobs, tick=CAPTURE_SCHEDULER_TICK,
+                 lease=CAPTURE_CLAIM_LEASE, max_jobs=CAPTURE_MAX_JOBS_PER_TICK):
+        self.connect = connect
+        self.run_jobs = run_jobs
+        self.tick = tick
+        self.lease = lease
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self.counters = {
+            'ticks': 0,
+            'claimed': 0,
+            'completed': 0,
+            'errors': 0
+        }
+        self.last_tick_at = None
+        self.last_error = None
+
+    def start(self):
+        """Start the scheduler thread, once per process (gunicorn forks workers)"""
+        pid = os.getpid()
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name='hatchly-capture-scheduler', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.tick)
+            try:
+                self.run_once()
+            except Exception as e:
+                with self._lock:
+                    self.counters['errors'] += 1
+                    self.last_error = str(e)
+                logger.exception('Capture scheduler error: %s', e)
+
+    def run_once(self):
+        """Claim, run and complete the jobs that are due now. Returns the job count."""
+        token = uuid.uuid4().hex
+        conn = self.connect()
+        try:
+            jobs = self._claim(conn, token)
+        finally:
+            conn.close()
+        with self._lock:
+            self.counters['ticks'] += 1
+            self.counters['claimed'] += len(jobs)
+            self.last_tick_at = time.time()
+        if not jobs:
+            return 0
+
+        try:
+            statuses = self.run_jobs(jobs)
+        except Exception as e:
+            statuses = [f'error: {e}'] * len(jobs)
+            raise
+        finally:
+            conn = self.connect()
+            try:
+                self._complete(conn, token, jobs, statuses)
+            finally:
+                conn.close()
+            with self._lock:
+                self.counters['completed'] += len(jobs)
+        return len(jobs)
+
+    def _claim(self, conn, token):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                '''UPDATE capture_schedules
+                   SET claimed_by = %s, claimed_until = DATE_ADD(NOW(), INTERVAL %s SECOND)
+                   WHERE enabled = 1 AND next_run_at <= NOW()
+                     AND (claimed_until IS NULL OR claimed_until < NOW())
+                   ORDER BY next_run_at
+                   LIMIT %s''',
+                (token, self.lease, self.max_jobs)
+            )
+            conn.commit()
+            cursor.execute(
+                f'SELECT {", ".join(JOB_FIELDS)} FROM capture_schedules WHERE claimed_by = %s',
+                (token,)
+            )
+            return [CaptureJob(*row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _complete(self, conn, token, jobs, statuses):
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(
+                '''UPDATE capture_schedules
+                   SET last_run_at = NOW(), last_status = %s,
+                       next_run_at = DATE_ADD(NOW(), INTERVAL interval_minutes MINUTE),
+                       claimed_by = NULL, claimed_until = NULL
+                   WHERE id = %s AND claimed_by = %s''',
+                [(status[:255], job.id, token) for job, status in zip(jobs, statuses)]
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': CAPTURE_SCHEDULER_ENABLED,
+                'running': (self._pid == os.getpid() and self._thread is not None
+                            and self._thread.is_alive()),
+                'tick_seconds': self.tick,
+                'last_tick_at': self.last_tick_at,
+                'last_error': self.last_error,
+                **self.counters
+            }
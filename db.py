@@ -0,0 +1,285 @@
+"""
+Hatchly MySQL connection pool
+
+One pool per worker process. get_db_connection() in app.py hands out a
+PooledConnection: close() returns it to the pool instead of closing the
+socket, and it can be used as a context manager. Any connection a request
+forgot to return (e.g. an exception before conn.close()) is returned by a
+teardown hook, so routes cannot leak connections.
+
+On checkout, connections idle longer than DB_POOL_PING_AFTER are pinged
+and replaced if stale; connections older than DB_POOL_RECYCLE are
+reopened. On return, any open transaction is rolled back so the next user
+never inherits uncommitted work or an old read snapshot.
+
+If the pool has a query_observer, cursors report every execute() and
+executemany() to it as observer(statement, seconds); app.py feeds these into
+the per-request query metrics.
+"""
+
+import os
+import threading
+import time
+
+import mysql.connector
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', '30'))
+DB_POOL_RECYCLE = float(os.environ.get('DB_POOL_RECYCLE', '1800'))
+
+
+def config_from_env():
+    """mysql.connector settings from DB_HOST, DB_USER, DB_PASSWORD and DB_NAME"""
+    return {
+        'host': os.environ.get('DB_HOST', 'localhost'),
+        'user': os.environ.get('DB_USER', 'root'),
+        'password': os.environ.get('DB_PASSWORD'),
+        'database': os.environ.get('DB_NAME', 'hatchly_db')
+    }
+
+
+class PoolTimeout(Exception):
+    """No connection became free within DB_POOL_TIMEOUT"""
+
+
+class PooledConnection:
+    """Proxy for a pooled mysql.connector connection"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._returned = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        observer = self._pool.query_observer
+        if observer is None:
+            return cursor
+        return ObservedCursor(cursor, observer)
+
+    def close(self):
+        """Return the connection to the pool (safe to call twice)"""
+        if self._returned:
+            return
+        self._returned = True
+        self._pool.release(self._raw)
+
+    @property
+    def returned(self):
+        return self._returned
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            try:
+                self._raw.rollback()
+            except Exception:
+                pass
+        self.close()
+        return False
+
+
+class ObservedCursor:
+    """Cursor proxy that times each statement"""
+
+    def __init__(self, raw, observer):
+        self._raw = raw
+        self._observer = observer
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def _timed(self, method, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(operation, *args, **kwargs)
+        finally:
+            self._observer(operation, time.perf_counter() - started)
+
+    def execute(self, operation, *args, **kwargs):
+        return self._timed(self._raw.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._timed(self._raw.executemany, operation, *args, **kwargs)
+
+
+class _Slot:
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections with health checks and wait stats"""
+
+    def __init__(self, config, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 ping_after=DB_POOL_PING_AFTER, recycle=DB_POOL_RECYCLE):
+        self.config = dict(config)
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.recycle = recycle
+        self.query_observer = None
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = []
+        self._slots = {}
+        self._in_use = 0
+        self._opening = 0
+        self.counters = {
+            'checkouts': 0,
+            'created': 0,
+            'reconnects': 0,
+            'recycled': 0,
+            'discarded': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0
+        }
+
+    def _check_pid(self):
+        # A forked worker must not share the parent's sockets
+        if self._pid != os.getpid():
+            self._reset()
+
+    def connect(self):
+        """Check out a connection, waiting up to the pool timeout"""
+        self._check_pid()
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    slot = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use + self._opening < self.size:
+                    self._opening += 1
+                    slot = None
+                    break
+                waited = True
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise PoolTimeout(f'No database connection free after {self.timeout:.1f}s')
+                self._cond.wait(remaining)
+
+            wait = time.monotonic() - started
+            self.counters['checkouts'] += 1
+            if waited:
+                self.counters['waits'] += 1
+            self.counters['wait_seconds_total'] += wait
+            self.counters['wait_seconds_max'] = max(self.counters['wait_seconds_max'], wait)
+
+        if slot is None:
+            try:
+                slot = self._open()
+            finally:
+                with self._cond:
+                    self._opening -= 1
+                    if slot is not None:
+                        self._in_use += 1
+                    self._cond.notify()
+        else:
+            try:
+                slot = self._validate(slot)
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+        slot.last_used = time.monotonic()
+        return PooledConnection(self, slot.conn)
+
+    def _open(self):
+        conn = mysql.connector.connect(**self.config)
+        slot = _Slot(conn)
+        with self._cond:
+            self._slots[id(conn)] = slot
+            self.counters['created'] += 1
+        return slot
+
+    def _replace(self, slot, counter):
+        self._drop(slot)
+        with self._cond:
+            self.counters[counter] += 1
+        return self._open()
+
+    def _validate(self, slot):
+        """Reopen connections that are too old or fail a ping after being idle"""
+        now = time.monotonic()
+        if self.recycle and now - slot.created_at > self.recycle:
+            return self._replace(slot, 'recycled')
+        if now - slot.last_used > self.ping_after:
+            try:
+                slot.conn.ping(reconnect=False)
+            except Exception:
+                return self._replace(slot, 'reconnects')
+        return slot
+
+    def _drop(self, slot):
+        with self._cond:
+            self._slots.pop(id(slot.conn), None)
+        try:
+            slot.conn.close()
+        except Exception:
+            pass
+
+    def release(self, conn):
+        """Return a raw connection; broken ones are discarded"""
+        if self._pid != os.getpid():
+            return
+        slot = self._slots.get(id(conn))
+        healthy = slot is not None
+        if healthy:
+            try:
+                if conn.unread_result:
+                    conn.consume_results()
+                # End any transaction, including a read-only snapshot
+                conn.rollback()
+            except Exception:
+                healthy = False
+        if slot is not None and not healthy:
+            self._drop(slot)
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                slot.last_used = time.monotonic()
+                self._idle.append(slot)
+            else:
+                self.counters['discarded'] += 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            counters = dict(self.counters)
+            in_use = self._in_use
+            idle = len(self._idle)
+        checkouts = counters['checkouts']
+        return {
+            'pid': os.getpid(),
+            'size': self.size,
+            'in_use': in_use,
+            'idle': idle,
+            'utilization': round(in_use / self.size, 3),
+            'avg_wait_ms': round(counters['wait_seconds_total'] / checkouts * 1000, 3) if checkouts else 0.0,
+            'max_wait_ms': round(counters['wait_seconds_max'] * 1000, 3),
+            **{k: v for k, v in counters.items() if not k.startswith('wait_seconds')}
+        }
@@ -0,0 +1,279 @@
+"""
+Hatchly per-user change events
+
+Mutating routes publish small delta events ('prawn.updated',
+'prediction.created', ...) and /api/events streams them to the user's open
+pages as Server-Sent Events, so a change made on another phone or by a
+scheduled capture shows up without reloading whole lists.
+
+The broker is a stand-in for a real message broker that needs nothing but
+the local disk, like the read cache's version files:
+
+  - Each user has an append-only journal, EVENTS_DIR/user_<id>.events, one
+    JSON event per line. Every gunicorn worker on the host appends to and
+    reads from the same files, so an event published in one worker reaches
+    subscribers in all of them.
+  - A subscriber tails the journal from its current offset, checking its
+    size every EVENTS_POLL_INTERVAL seconds (a stat, no database work).
+  - An event's id is '<journal inode>-<offset after it>'. EventSource sends
+    it back as Last-Event-ID when it reconnects, and the stream resumes
+    right after it.
+  - A journal over EVENTS_MAX_BYTES is rotated to .old on the next publish.
+    An event that would not fit in an empty journal on its own is rejected
+    with EventTooLarge.
+    Subscribers finish the old file before moving to the new one; a client
+    whose Last-Event-ID is older than both gets a 'resync' event and
+    reloads its lists.
+"""
+
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows dev server: one process, no cross-worker appends
+    fcntl = None
+
+EVENTS_DIR = os.environ.get('EVENTS_DIR', 'instance/events')
+EVENTS_MAX_BYTES = int(os.environ.get('EVENTS_MAX_BYTES', str(256 * 1024)))
+EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', '0.5'))
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', '15'))
+# Streams end after this long; EventSource reconnects and resumes by id
+EVENTS_STREAM_SECONDS = float(os.environ.get('EVENTS_STREAM_SECONDS', '300'))
+EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', '2'))
+
+CONTENT_TYPE = 'text/event-stream'
+# Client reconnect delay, in milliseconds
+_RETRY_MS = 3000
+
+
+class EventTooLarge(ValueError):
+    """One serialized event is bigger than a whole journal (EVENTS_MAX_BYTES)"""
+
+
+class _Journal:
+    """An open journal file being tailed by one subscriber"""
+
+    def __init__(self, path, offset=0):
+        self.file = open(path, 'rb')
+        self.inode = os.fstat(self.file.fileno()).st_ino
+        self.file.seek(offset)
+        self._partial = b''
+
+    def read_events(self):
+        """[(offset after the line, line)] of the complete lines appended since the last call"""
+        chunk = self.file.read()
+        if not chunk:
+            return []
+        start = self.file.tell() - len(self._partial) - len(chunk)
+        data = self._partial + chunk
+        lines = data.split(b'\n')
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            start += len(line) + 1
+            if line:
+                events.append((start, line))
+        return events
+
+    def close(self):
+        self.file.close()
+
+
+class _Subscription:
+    """Response iterable that frees its stream slot when the response is closed,
+    even if the client went away before the first chunk"""
+
+    def __init__(self, broker, chunks):
+        self._broker = broker
+        self._chunks = chunks
+        self._closed = False
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._chunks.close()
+        self._broker._release_stream()
+
+
+class EventBroker:
+    """Per-user event journals shared by every worker on the host"""
+
+    def __init__(self, directory=EVENTS_DIR, max_bytes=EVENTS_MAX_BYTES,
+                 poll_interval=EVENTS_POLL_INTERVAL, heartbeat=EVENTS_HEARTBEAT,
+                 stream_seconds=EVENTS_STREAM_SECONDS, max_streams=EVENTS_MAX_STREAMS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.stream_seconds = stream_seconds
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        self._streams = 0
+        self.counters = {
+            'published': 0,
+            'rejected': 0,
+            'delivered': 0,
+            'rotations': 0,
+            'resyncs': 0,
+            'streams_opened': 0,
+            'streams_rejected': 0
+        }
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, user_id):
+        return os.path.join(self.directory, f'user_{int(user_id)}.events')
+
+    # ------------------------------------------
+    # Publishing
+    # ------------------------------------------
+
+    def publish(self, user_id, event, data):
+        """Append one event to the user's journal"""
+        line = json.dumps({'event': event, 'data': data, 'at': round(time.time(), 3)},
+                          separators=(',', ':'), default=str).encode() + b'\n'
+        if len(line) > self.max_bytes:
+            with self._lock:
+                self.counters['rejected'] += 1
+            raise EventTooLarge(f'{event} event is {len(line)} bytes, over the {self.max_bytes} byte journal limit')
+        path = self._path(user_id)
+        while True:
+            with open(path, 'ab') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                # Another worker may have rotated the file while we waited
+                try:
+                    if os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+                size = f.seek(0, os.SEEK_END)
+                if size > 0 and size + len(line) > self.max_bytes:
+                    os.replace(path, f'{path}.old')
+                    with self._lock:
+                        self.counters['rotations'] += 1
+                    continue
+                f.write(line)
+                break
+        with self._lock:
+            self.counters['published'] += 1
+
+    # ------------------------------------------
+    # Subscribing
+    # ------------------------------------------
+
+    def _open(self, user_id, last_event_id):
+        """Journals to read, oldest first, positioned after last_event_id.
+
+        Returns (journals, resync) where resync is True when the client's
+        last event is no longer in either journal.
+        """
+        path = self._path(user_id)
+        if not os.path.exists(path):
+            open(path, 'ab').close()
+        current = _Journal(path)
+        if not last_event_id:
+            current.file.seek(0, os.SEEK_END)
+            return [current], False
+        try:
+            inode, offset = (int(part) for part in last_event_id.split('-', 1))
+        except ValueError:
+            inode, offset = None, None
+        if inode == current.inode and offset <= os.fstat(current.file.fileno()).st_size:
+            current.file.seek(offset)
+            return [current], False
+        try:
+            old = _Journal(f'{path}.old')
+            if old.inode == inode:
+                old.file.seek(offset)
+                current.file.seek(0)
+                return [old, current], False
+            old.close()
+        except OSError:
+            pass
+        current.file.seek(0, os.SEEK_END)
+        return [current], True
+
+    def subscribe(self, user_id, last_event_id=None):
+        """text/event-stream response body for one subscriber, or None when
+        this worker already serves EVENTS_MAX_STREAMS streams (each one
+        holds a worker thread)"""
+        with self._lock:
+            if self._streams >= self.max_streams:
+                self.counters['streams_rejected'] += 1
+                return None
+            self._streams += 1
+            self.counters['streams_opened'] += 1
+        return _Subscription(self, self._stream(user_id, last_event_id))
+
+    def _release_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    def _stream(self, user_id, last_event_id):
+        path = self._path(user_id)
+        journals = []
+        try:
+            journals, resync = self._open(user_id, last_event_id)
+            yield f'retry: {_RETRY_MS}\n\n'.encode()
+            if resync:
+                with self._lock:
+                    self.counters['resyncs'] += 1
+                yield self._format('resync', f'{journals[-1].inode}-{journals[-1].file.tell()}', '{}')
+
+            started = time.monotonic()
+            last_sent = started
+            while time.monotonic() - started < self.stream_seconds:
+                sent = 0
+                while journals:
+                    journal = journals[0]
+                    for offset, line in journal.read_events():
+                        try:
+                            message = json.loads(line)
+                        except ValueError:
+                            continue
+                        yield self._format(message['event'], f'{journal.inode}-{offset}',
+                                           json.dumps(message['data'], separators=(',', ':')))
+                        sent += 1
+                    # Move on from a rotated journal once it is read to the end
+                    if len(journals) > 1:
+                        journals.pop(0).close()
+                        continue
+                    try:
+                        if os.stat(path).st_ino != journal.inode:
+                            journals.append(_Journal(path))
+                            continue
+                    except FileNotFoundError:
+                        pass
+                    break
+                now = time.monotonic()
+                if sent:
+                    last_sent = now
+                    with self._lock:
+                        self.counters['delivered'] += sent
+                elif now - last_sent >= self.heartbeat:
+                    # Keeps proxies from timing out and detects gone clients
+                    last_sent = now
+                    yield b': ping\n\n'
+                time.sleep(self.poll_interval)
+        finally:
+            for journal in journals:
+                journal.close()
+
+    @staticmethod
+    def _format(event, event_id, data):
+        return f'id: {event_id}\nevent: {event}\ndata: {data}\n\n'.encode()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'streams': self._streams,
+                'max_streams': self.max_streams,
+                **self.counters
+            }
@@ -0,0 +1,66 @@
+"""
+Gunicorn configuration for Hatchly
+
+By default each worker imports the app and loads the models itself after
+fork (MODEL_LOAD_MODE=background), so TensorFlow never starts in the master.
+
+GUNICORN_PRELOAD=true is opt-in: the app and both models are loaded once
+in the master and the forked workers share the weights copy-on-write. The
+TensorFlow runtime is not fork-safe once it has started, and workers can
+hang in their first predict, so only use it after checking it with the
+TensorFlow build you deploy.
+
+Metrics are shared through METRICS_DIR (see metrics.py): the master clears
+it on start, each worker flushes its numbers on exit, and the master folds
+an exited worker's file into the archive.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+# Same settings as app.py, before anything below or any hook reads them
+load_dotenv()
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+# Threads let concurrent /api/predict requests share an inference batch
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+
+if preload_app:
+    os.environ.setdefault('MODEL_LOAD_MODE', 'preload')
+
+
+def on_starting(server):
+    # Migrate once, before any worker takes requests
+    import migrate
+    from db import config_from_env
+    migrate.run_at_startup(config_from_env())
+    if preload_app:
+        server.log.warning('GUNICORN_PRELOAD is on: models load in the master before fork, '
+                           'and TensorFlow is not fork-safe once started')
+    from metrics import registry
+    registry.clear()
+
+
+def post_fork(server, worker):
+    from app import model_manager, image_writer, capture_scheduler, CAPTURE_SCHEDULER_ENABLED
+    model_manager.start()
+    # Resume spool files a crash or restart left behind
+    image_writer.start()
+    if CAPTURE_SCHEDULER_ENABLED:
+        capture_scheduler.start()
+
+
+def worker_exit(server, worker):
+    # Finish queued image writes before the worker goes away
+    from app import image_writer
+    image_writer.drain()
+    from metrics import registry
+    registry.flush()
+
+
+def child_exit(server, worker):
+    from metrics import registry
+    registry.retire(worker.pid)
@@ -0,0 +1,180 @@
+"""
+Hatchly per-prawn hatch summary
+
+prawn_hatch_summary holds one row per prawn that has predictions: the latest
+prediction's days / current day / confidence / image, the projected hatch
+date and the number of predictions. The dashboard reads upcoming hatches and
+totals from it instead of recomputing them from the predictions table.
+
+Every function takes the caller's cursor and never commits, so the summary
+changes in the same transaction as the prediction or prawn it follows:
+
+  - record_prediction()  after inserting one prediction (save_prediction)
+  - refresh()            recompute some prawns (predict_batch, delete_prediction)
+  - remove_prawns()      delete_prawn, bulk prawn delete
+  - move_prawns()        transfer_prawn, bulk prawn move
+  - move_location()      deleting a location with its prawns reassigned
+
+rebuild() recomputes everything from predictions; `flask rebuild-hatch-summary`
+runs it to repair drift. Only predictions whose user owns the prawn count,
+as on the dashboard. The table is created by migrations/0002.
+"""
+
+from decimal import Decimal
+
+TABLE = 'prawn_hatch_summary'
+
+_COLUMNS = (
+    'prawn_id, user_id, location_id, latest_prediction_id, predicted_days, current_day, '
+    'confidence, latest_image_path, latest_created_at, projected_hatch_date, prediction_count'
+)
+
+# Summary fields, in _COMPUTED's column order
+SUMMARY_FIELDS = (
+    'user_id', 'location_id', 'latest_prediction_id', 'predicted_days', 'current_day',
+    'confidence', 'latest_image_path', 'latest_created_at', 'projected_hatch_date',
+    'prediction_count'
+)
+
+# Latest prediction and count per prawn, computed from predictions
+_COMPUTED = f'''SELECT latest.prawn_id, pr.user_id, pr.location_id, latest.id,
+           latest.predicted_days, latest.current_day, latest.confidence, latest.image_path,
+           latest.created_at,
+           DATE_ADD(DATE(latest.created_at), INTERVAL latest.predicted_days DAY),
+           latest.prediction_count
+    FROM (
+        SELECT p.id, p.prawn_id, p.predicted_days, p.current_day, p.confidence,
+               p.image_path, p.created_at,
+               ROW_NUMBER() OVER (
+                   PARTITION BY p.prawn_id ORDER BY p.created_at DESC, p.id DESC
+               ) AS rn,
+               COUNT(*) OVER (PARTITION BY p.prawn_id) AS prediction_count
+        FROM predictions p
+        JOIN prawns pr ON pr.id = p.prawn_id AND pr.user_id = p.user_id
+        WHERE {{where}}
+    ) latest
+    JOIN prawns pr ON pr.id = latest.prawn_id
+    WHERE latest.rn = 1'''
+
+# True when the row being inserted (aliased new) is newer than the stored latest prediction
+_IS_NEWER = (
+    f'({TABLE}.latest_created_at IS NULL OR (new.latest_created_at, new.latest_prediction_id)'
+    f' >= ({TABLE}.latest_created_at, {TABLE}.latest_prediction_id))'
+)
+
+def record_prediction(cursor, prediction_id):
+    """Fold one newly inserted prediction into its prawn's summary row"""
+    newer = _IS_NEWER
+    cursor.execute(
+        f'''INSERT INTO {TABLE} ({_COLUMNS})
+            SELECT {_COLUMNS} FROM (
+                SELECT pr.id AS prawn_id, pr.user_id, pr.location_id,
+                       p.id AS latest_prediction_id, p.predicted_days, p.current_day,
+                       p.confidence, p.image_path AS latest_image_path,
+                       p.created_at AS latest_created_at,
+                       DATE_ADD(DATE(p.created_at), INTERVAL p.predicted_days DAY) AS projected_hatch_date,
+                       1 AS prediction_count
+                FROM predictions p
+                JOIN prawns pr ON pr.id = p.prawn_id AND pr.user_id = p.user_id
+                WHERE p.id = %s
+            ) AS new
+            ON DUPLICATE KEY UPDATE
+                prediction_count = {TABLE}.prediction_count + 1,
+                location_id = new.location_id,
+                predicted_days = IF({newer}, new.predicted_days, {TABLE}.predicted_days),
+                current_day = IF({newer}, new.current_day, {TABLE}.current_day),
+                confidence = IF({newer}, new.confidence, {TABLE}.confidence),
+                latest_image_path = IF({newer}, new.latest_image_path, {TABLE}.latest_image_path),
+                projected_hatch_date = IF({newer}, new.projected_hatch_date, {TABLE}.projected_hatch_date),
+                latest_prediction_id = IF({newer}, new.latest_prediction_id, {TABLE}.latest_prediction_id),
+                latest_created_at = IF({newer}, new.latest_created_at, {TABLE}.latest_created_at)''',
+        (prediction_id,)
+    )
+
+
+def refresh(cursor, prawn_ids):
+    """Recompute the summary rows of the given prawns from predictions"""
+    prawn_ids = sorted({prawn_id for prawn_id in prawn_ids if prawn_id is not None})
+    if not prawn_ids:
+        return 0
+    placeholders = ', '.join(['%s'] * len(prawn_ids))
+    cursor.execute(f'DELETE FROM {TABLE} WHERE prawn_id IN ({placeholders})', prawn_ids)
+    cursor.execute(
+        f'INSERT INTO {TABLE} ({_COLUMNS}) '
+        + _COMPUTED.format(where=f'p.prawn_id IN ({placeholders})'),
+        prawn_ids
+    )
+    return cursor.rowcount
+
+
+def remove_prawns(cursor, prawn_ids, user_id):
+    prawn_ids = list(prawn_ids)
+    if not prawn_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(prawn_ids))
+    cursor.execute(
+        f'DELETE FROM {TABLE} WHERE prawn_id IN ({placeholders}) AND user_id = %s',
+        prawn_ids + [user_id]
+    )
+
+
+def move_prawns(cursor, prawn_ids, user_id, location_id):
+    prawn_ids = list(prawn_ids)
+    if not prawn_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(prawn_ids))
+    cursor.execute(
+        f'UPDATE {TABLE} SET location_id = %s WHERE prawn_id IN ({placeholders}) AND user_id = %s',
+        [location_id] + prawn_ids + [user_id]
+    )
+
+
+def move_location(cursor, user_id, from_location_id, to_location_id):
+    cursor.execute(
+        f'UPDATE {TABLE} SET location_id = %s WHERE user_id = %s AND location_id = %s',
+        (to_location_id, user_id, from_location_id)
+    )
+
+
+def _normalize(value):
+    # The FLOAT column does not round-trip the source value exactly
+    if isinstance(value, (float, Decimal)):
+        return round(float(value), 3)
+    return value
+
+
+def _rows(cursor, query, params):
+    cursor.execute(query, params)
+    return {row[0]: tuple(_normalize(v) for v in row[1:]) for row in cursor.fetchall()}
+
+
+def drift(cursor, user_id=None):
+    """Prawn ids whose stored summary row is missing, stale or orphaned"""
+    if user_id is None:
+        computed = _rows(cursor, _COMPUTED.format(where='1 = 1'), ())
+        stored = _rows(cursor, f'SELECT prawn_id, {", ".join(SUMMARY_FIELDS)} FROM {TABLE}', ())
+    else:
+        computed = _rows(cursor, _COMPUTED.format(where='p.user_id = %s'), (user_id,))
+        stored = _rows(
+            cursor,
+            f'SELECT prawn_id, {", ".join(SUMMARY_FIELDS)} FROM {TABLE} WHERE user_id = %s',
+            (user_id,)
+        )
+    return sorted(
+        prawn_id for prawn_id in computed.keys() | stored.keys()
+        if computed.get(prawn_id) != stored.get(prawn_id)
+    )
+
+
+def rebuild(cursor, user_id=None):
+    """Replace the summary (for one user, or everyone) with freshly computed rows"""
+    if user_id is None:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(f'INSERT INTO {TABLE} ({_COLUMNS}) ' + _COMPUTED.format(where='1 = 1'))
+    else:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE user_id = %s', (user_id,))
+        cursor.execute(
+            f'INSERT INTO {TABLE} ({_COLUMNS}) ' + _COMPUTED.format(where='p.user_id = %s'),
+            (user_id,)
+        )
+    return cursor.rowcount
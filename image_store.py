@@ -0,0 +1,151 @@
+"""
+Hatchly image store
+
+Prediction images are stored by content instead of by user and timestamp:
+
+  static/uploads/images/ab/cd/<sha256>.jpg   re-encoded original
+  static/uploads/thumbs/ab/cd/<sha256>.jpg   thumbnail for list views
+
+  - The name is the SHA-256 of the uploaded bytes, so two saves in the same
+    second never collide and an identical photo is stored once (a second
+    save of it only refreshes the file's mtime).
+  - Two levels of 256 shard directories keep every directory small.
+  - Originals are EXIF-rotated, bounded to IMAGE_MAX_SIDE pixels and saved
+    as JPEG at IMAGE_JPEG_QUALITY; thumbnails are IMAGE_THUMB_SIDE pixels.
+  - Files are written to a temp name and renamed into place.
+
+Database rows keep the path relative to static/, e.g.
+'uploads/images/ab/cd/<sha256>.jpg'. Rows from before the store point at
+flat 'uploads/prediction_*.jpg' files, which have no thumbnail.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+
+from PIL import Image, ImageOps
+
+IMAGE_MAX_SIDE = int(os.environ.get('IMAGE_MAX_SIDE', '1280'))
+IMAGE_THUMB_SIDE = int(os.environ.get('IMAGE_THUMB_SIDE', '256'))
+IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', '85'))
+
+_IMAGES = 'images'
+_THUMBS = 'thumbs'
+
+
+class StoredImage:
+    """Where an image was stored, relative to static/"""
+
+    def __init__(self, sha256, image_path, thumbnail_path, created):
+        self.sha256 = sha256
+        self.image_path = image_path
+        self.thumbnail_path = thumbnail_path
+        self.created = created  # False when an identical image was already stored
+
+
+class ImageStore:
+    """Content-addressed, sharded store of re-encoded images and thumbnails"""
+
+    def __init__(self, root, url_prefix='uploads', max_side=IMAGE_MAX_SIDE,
+                 thumb_side=IMAGE_THUMB_SIDE, quality=IMAGE_JPEG_QUALITY):
+        self.root = root
+        self.url_prefix = url_prefix
+        self.max_side = max_side
+        self.thumb_side = thumb_side
+        self.quality = quality
+
+    @staticmethod
+    def _relative(kind, sha256):
+        return f'{kind}/{sha256[:2]}/{sha256[2:4]}/{sha256}.jpg'
+
+    def _full_path(self, relative):
+        return os.path.join(self.root, *relative.split('/'))
+
+    def _to_relative(self, image_path):
+        """'uploads/images/..' -> 'images/..', or None for paths outside the store"""
+        prefix = f'{self.url_prefix}/{_IMAGES}/'
+        if image_path and image_path.startswith(prefix):
+            return image_path[len(self.url_prefix) + 1:]
+        return None
+
+    def image_path_for(self, sha256):
+        """Path put() stores an image under, known before it is written"""
+        return f'{self.url_prefix}/{self._relative(_IMAGES, sha256)}'
+
+    def exists(self, sha256):
+        """True if put() has stored this image (and its thumbnail)"""
+        return (os.path.exists(self._full_path(self._relative(_IMAGES, sha256)))
+                and os.path.exists(self._full_path(self._relative(_THUMBS, sha256))))
+
+    def thumbnail_path(self, image_path):
+        """Thumbnail path for a stored image path, or None (e.g. legacy files)"""
+        relative = self._to_relative(image_path)
+        if relative is None:
+            return None
+        return f'{self.url_prefix}/{_THUMBS}/{relative[len(_IMAGES) + 1:]}'
+
+    def put(self, data, sha256=None):
+        """Store image bytes (any buffer). Returns a StoredImage."""
+        if sha256 is None:
+            sha256 = hashlib.sha256(data).hexdigest()
+        image_relative = self._relative(_IMAGES, sha256)
+        thumb_relative = self._relative(_THUMBS, sha256)
+        image_full = self._full_path(image_relative)
+        thumb_full = self._full_path(thumb_relative)
+
+        created = False
+        if os.path.exists(image_full) and os.path.exists(thumb_full):
+            # Dedup hit; refresh mtime so a concurrent delete() leaves it alone
+            now = time.time()
+            os.utime(image_full, (now, now))
+        else:
+            image = Image.open(io.BytesIO(data))
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+            self._write_jpeg(image, image_full)
+            image.thumbnail((self.thumb_side, self.thumb_side), Image.LANCZOS)
+            self._write_jpeg(image, thumb_full)
+            created = True
+
+        return StoredImage(
+            sha256,
+            self.image_path_for(sha256),
+            f'{self.url_prefix}/{thumb_relative}',
+            created
+        )
+
+    def _write_jpeg(self, image, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        image.save(tmp_path, 'JPEG', quality=self.quality, optimize=True)
+        os.replace(tmp_path, path)
+
+    def delete(self, image_path, unless_used_since=None):
+        """Remove an image (and its thumbnail) that no row references any more.
+
+        unless_used_since: skip the removal if put() stored or re-used the
+        image at or after this time, i.e. it was saved again meanwhile.
+        Legacy flat files are removed by name. Returns True if removed.
+        """
+        relative = self._to_relative(image_path)
+        if relative is None:
+            paths = [os.path.join(self.root, os.path.basename(image_path))]
+        else:
+            paths = [self._full_path(relative),
+                     self._full_path(f'{_THUMBS}/{relative[len(_IMAGES) + 1:]}')]
+            if unless_used_since is not None:
+                try:
+                    if os.path.getmtime(paths[0]) >= unless_used_since:
+                        return False
+                except OSError:
+                    pass
+        removed = False
+        for path in paths:
+            try:
+                os.remove(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+        return removed
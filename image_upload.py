@@ -0,0 +1,269 @@
+"""
+Hatchly image uploads
+
+Reads a prediction image from either:
+  - the legacy JSON body (base64 data URL), or
+  - a raw binary body (Content-Type: image/* or application/octet-stream), or
+  - a multipart/form-data upload with the image in a file field.
+
+read_bulk_images() reads many images for one request, each tagged with a
+prawn_id, from multipart fields or a zip archive. A zip may not decompress
+to more than BULK_UPLOAD_MAX_BYTES in total: the sizes its directory
+declares are checked before anything is read, and the bytes actually
+decompressed are counted while reading, since the declared sizes can lie.
+
+Binary bodies are streamed in chunks into one BytesIO buffer that is passed
+straight to Image.open. The SHA-256 used by the prediction cache is computed
+while streaming. Oversized bodies and anything that does not start with a
+known image signature are rejected before the rest is read.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+import posixpath
+import zipfile
+import zlib
+
+IMAGE_UPLOAD_MAX_BYTES = int(os.environ.get('IMAGE_UPLOAD_MAX_BYTES', str(16 * 1024 * 1024)))
+BULK_UPLOAD_MAX_BYTES = int(os.environ.get('BULK_UPLOAD_MAX_BYTES', str(256 * 1024 * 1024)))
+BULK_UPLOAD_MAX_IMAGES = int(os.environ.get('BULK_UPLOAD_MAX_IMAGES', '200'))
+_CHUNK_SIZE = 64 * 1024
+
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+RAW_CONTENT_TYPES = {
+    'image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp', 'image/bmp',
+    'application/octet-stream'
+}
+
+
+class UploadError(Exception):
+    """Rejected upload, with the HTTP status to return"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class ImageUpload:
+    """One uploaded image held in a single in-memory buffer"""
+
+    def __init__(self, buffer, size, sha256, content_type):
+        self.buffer = buffer
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+    def open(self):
+        """File object positioned at the start of the image, for Image.open"""
+        self.buffer.seek(0)
+        return self.buffer
+
+    def getbuffer(self):
+        """Zero-copy view of the image bytes, for writing to disk"""
+        return self.buffer.getbuffer()
+
+    @classmethod
+    def from_bytes(cls, image_bytes):
+        content_type = sniff_image_type(image_bytes[:16])
+        if content_type is None:
+            raise UploadError('Unsupported image format. Please upload a photo (JPEG or PNG).', 415)
+        return cls(io.BytesIO(image_bytes), len(image_bytes),
+                   hashlib.sha256(image_bytes).hexdigest(), content_type)
+
+    @classmethod
+    def from_data_url(cls, image_data):
+        """Decode a base64 image (optionally a data URL) from the JSON API"""
+        if image_data.startswith('data:image'):
+            image_base64 = image_data.split(',')[1]
+        else:
+            image_base64 = image_data
+        # base64 is 4 chars per 3 bytes
+        if len(image_base64) * 3 // 4 > IMAGE_UPLOAD_MAX_BYTES:
+            raise UploadError('Image is too large.', 413)
+        try:
+            image_bytes = base64.b64decode(image_base64)
+        except (binascii.Error, ValueError):
+            raise UploadError('Invalid image data.', 400)
+        return cls.from_bytes(image_bytes)
+
+
+def sniff_image_type(head):
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def read_stream(stream, content_length=None, max_bytes=IMAGE_UPLOAD_MAX_BYTES):
+    """Stream an image into one buffer, rejecting oversized or non-image data early"""
+    if content_length is not None and content_length > max_bytes:
+        raise UploadError('Image is too large.', 413)
+
+    buffer = io.BytesIO()
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    while True:
+        chunk = stream.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        if content_type is None:
+            # Make sure the signature check sees enough bytes
+            while len(chunk) < 16:
+                more = stream.read(_CHUNK_SIZE)
+                if not more:
+                    break
+                chunk += more
+            content_type = sniff_image_type(chunk[:16])
+            if content_type is None:
+                raise UploadError('Unsupported image format. Please upload a photo (JPEG or PNG).', 415)
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadError('Image is too large.', 413)
+        digest.update(chunk)
+        buffer.write(chunk)
+
+    if size == 0:
+        return None
+    return ImageUpload(buffer, size, digest.hexdigest(), content_type)
+
+
+def read_image_upload(req, field='image', max_bytes=IMAGE_UPLOAD_MAX_BYTES):
+    """ImageUpload from a non-JSON Flask request, or None if it carries no image"""
+    if req.mimetype == 'multipart/form-data':
+        file = req.files.get(field)
+        if file is None:
+            return None
+        return read_stream(file.stream, None, max_bytes)
+    if req.mimetype in RAW_CONTENT_TYPES:
+        return read_stream(req.stream, req.content_length, max_bytes)
+    raise UploadError('Unsupported upload type. Send JSON, multipart/form-data or a raw image body.', 415)
+
+
+class BulkItem:
+    """One image of a bulk upload: an ImageUpload, or the error that rejected it"""
+
+    def __init__(self, index, prawn_id, filename, upload=None, error=None):
+        self.index = index
+        self.prawn_id = prawn_id
+        self.filename = filename
+        self.upload = upload
+        self.error = error
+
+
+def _parse_prawn_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _prawn_id_from_zip_name(name):
+    """'<prawn_id>/photo.jpg' or '<prawn_id>_photo.jpg' / '<prawn_id>.jpg'"""
+    parts = name.split('/')
+    if len(parts) > 1:
+        return _parse_prawn_id(parts[0])
+    stem = posixpath.splitext(parts[0])[0]
+    return _parse_prawn_id(stem.split('_', 1)[0])
+
+
+class _OverBudget(Exception):
+    """An archive decompressed to more than its byte budget"""
+
+
+class _BudgetedStream:
+    """Reads from an archive entry, counting against the whole archive's budget"""
+
+    def __init__(self, stream, budget):
+        self._stream = stream
+        self._budget = budget
+
+    def read(self, size=-1):
+        chunk = self._stream.read(size)
+        self._budget['remaining'] -= len(chunk)
+        if self._budget['remaining'] < 0:
+            raise _OverBudget()
+        return chunk
+
+
+def _bulk_item(index, prawn_id, filename, stream, size):
+    if prawn_id is None:
+        return BulkItem(index, None, filename,
+                        error='Cannot tell which prawn this image belongs to.')
+    try:
+        upload = read_stream(stream, size)
+    except UploadError as e:
+        return BulkItem(index, prawn_id, filename, error=e.message)
+    if upload is None:
+        return BulkItem(index, prawn_id, filename, error='Empty image.')
+    return BulkItem(index, prawn_id, filename, upload=upload)
+
+
+def read_bulk_images(req, max_images=BULK_UPLOAD_MAX_IMAGES, max_bytes=BULK_UPLOAD_MAX_BYTES):
+    """BulkItems from a multipart request.
+
+    Images are either file fields named image_<prawn_id> (repeatable) or
+    one 'archive' zip whose entries are named <prawn_id>/<file> or
+    <prawn_id>_<file>. Raises UploadError if the request as a whole is
+    unusable; problems with single images are reported on their item.
+    """
+    if req.mimetype != 'multipart/form-data':
+        raise UploadError('Send the images as multipart/form-data.', 415)
+
+    items = []
+    archive = req.files.get('archive')
+    if archive is not None:
+        try:
+            zf = zipfile.ZipFile(archive.stream)
+        except zipfile.BadZipFile:
+            raise UploadError('Archive is not a valid zip file.', 400)
+        with zf:
+            entries = [
+                info for info in zf.infolist()
+                if not info.is_dir()
+                and not info.filename.startswith('__MACOSX/')
+                and not posixpath.basename(info.filename).startswith('.')
+            ]
+            if len(entries) > max_images:
+                raise UploadError(f'Too many images (max {max_images}).', 413)
+            too_large = UploadError('Archive is too large once unpacked.', 413)
+            if sum(info.file_size for info in entries) > max_bytes:
+                raise too_large
+            budget = {'remaining': max_bytes}
+            for info in entries:
+                prawn_id = _prawn_id_from_zip_name(info.filename)
+                if info.file_size > IMAGE_UPLOAD_MAX_BYTES:
+                    items.append(BulkItem(len(items), prawn_id, info.filename,
+                                          error='Image is too large.'))
+                    continue
+                try:
+                    with zf.open(info) as entry:
+                        items.append(_bulk_item(len(items), prawn_id, info.filename,
+                                                _BudgetedStream(entry, budget), info.file_size))
+                except _OverBudget:
+                    raise too_large
+                except (zipfile.BadZipFile, zlib.error, EOFError):
+                    items.append(BulkItem(len(items), prawn_id, info.filename,
+                                          error='Damaged archive entry.'))
+        return items
+
+    for field, file in req.files.items(multi=True):
+        if not field.startswith('image_'):
+            continue
+        if len(items) >= max_images:
+            raise UploadError(f'Too many images (max {max_images}).', 413)
+        prawn_id = _parse_prawn_id(field[len('image_'):])
+        items.append(_bulk_item(len(items), prawn_id, file.filename, file.stream, None))
+    return items
@@ -0,0 +1,288 @@
+"""
+Hatchly write-behind image I/O
+
+Re-encoding an upload and writing it (plus its thumbnail) to the upload
+volume, and removing files on delete, run on a background thread instead of
+the request thread:
+
+  1. The request spools the raw upload to IMAGE_SPOOL_DIR, which must be on
+     local disk (a staged pending prediction is simply renamed there).
+  2. It inserts the prediction row with its final content-addressed
+     image_path and image_status = 'pending', commits, then enqueues the
+     write.
+  3. The writer thread stores the image through ImageStore, marks every row
+     with that image_path 'ready' and deletes the spool file.
+
+A failed write is retried IMAGE_WRITE_RETRIES times with backoff, then the
+rows are marked 'failed' and the spool file is kept. Spool files left by a
+crash or restart are picked up again when each worker starts (start()),
+and `flask flush-image-spool` retries everything still spooled.
+
+Requests saving the same photo share one spool file. unspool() after a
+rollback only removes it once no other request in the process still holds
+it; if the file is gone anyway when the write runs (another worker wrote or
+dropped it), the rows are marked 'ready' if the store has the image and
+'failed' otherwise, never left 'pending'. The queue is
+bounded (IMAGE_WRITE_QUEUE_SIZE); when it is full the request does the I/O
+itself. drain() is called at exit so queued work is not lost on shutdown.
+
+Deletes are queued too, but they are not spooled: a delete lost in a crash
+leaves an unreferenced file behind, never a missing one.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+IMAGE_SPOOL_DIR = os.environ.get('IMAGE_SPOOL_DIR', 'instance/image_spool')
+IMAGE_WRITE_QUEUE_SIZE = int(os.environ.get('IMAGE_WRITE_QUEUE_SIZE', '256'))
+IMAGE_WRITE_RETRIES = int(os.environ.get('IMAGE_WRITE_RETRIES', '3'))
+IMAGE_WRITE_DRAIN_TIMEOUT = float(os.environ.get('IMAGE_WRITE_DRAIN_TIMEOUT', '30'))
+
+# Spool files older than this belong to no live request
+_ORPHAN_AGE = 60.0
+_BACKOFF = (0.5, 2.0, 5.0)
+
+logger = logging.getLogger(__name__)
+
+
+class ImageWriter:
+    """Bounded background queue for image store writes and deletes.
+
+    store is an ImageStore. mark_status(image_path, status) is called from
+    the writer thread after a write succeeds ('ready') or finally fails
+    ('failed'); it must use its own database connection.
+    """
+
+    def __init__(self, store, mark_status, spool_dir=IMAGE_SPOOL_DIR,
+                 max_queue=IMAGE_WRITE_QUEUE_SIZE, retries=IMAGE_WRITE_RETRIES):
+        self.store = store
+        self.mark_status = mark_status
+        self.spool_dir = spool_dir
+        self.max_queue = max_queue
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker = None
+        self._queue = None
+        self._retrying = 0
+        self._spool_refs = {}
+        self.counters = {
+            'writes': 0,
+            'deletes': 0,
+            'retries': 0,
+            'failures': 0,
+            'inline': 0,
+            'resumed': 0,
+            'missing_spool': 0
+        }
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    # ------------------------------------------
+    # Request side
+    # ------------------------------------------
+
+    def spool_path(self, sha256):
+        return os.path.join(self.spool_dir, f'{sha256}.img')
+
+    def spool(self, data, sha256):
+        """Durably hand the upload bytes to the writer. Returns the final image_path."""
+        path = self.spool_path(sha256)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._hold(sha256)
+        return self.store.image_path_for(sha256)
+
+    def _hold(self, sha256):
+        with self._lock:
+            self._spool_refs[sha256] = self._spool_refs.get(sha256, 0) + 1
+
+    def _release(self, sha256):
+        """Drop one request's hold; True if no request in this process holds it now"""
+        with self._lock:
+            refs = self._spool_refs.get(sha256, 0) - 1
+            if refs > 0:
+                self._spool_refs[sha256] = refs
+                return False
+            self._spool_refs.pop(sha256, None)
+            return True
+
+    def adopt(self, sha256):
+        """Hold a spool file that was moved into place (a staged pending prediction)"""
+        self._hold(sha256)
+
+    def unspool(self, sha256):
+        """Drop a spooled upload whose row was never committed"""
+        if not self._release(sha256):
+            # Another request still needs the same file
+            return
+        try:
+            os.remove(self.spool_path(sha256))
+        except OSError:
+            pass
+
+    def write(self, sha256):
+        """Queue the store write of a spooled upload (after the row is committed)"""
+        self._release(sha256)
+        self._submit(('write', sha256, 0))
+
+    def delete(self, image_path, unless_used_since=None):
+        """Queue removal of an image and its thumbnail"""
+        self._submit(('delete', image_path, unless_used_since, 0))
+
+    def _submit(self, job):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            # Back-pressure: do the I/O on the request thread rather than grow
+            with self._lock:
+                self.counters['inline'] += 1
+            self._process(job, inline=True)
+
+    # ------------------------------------------
+    # Writer thread
+    # ------------------------------------------
+
+    def start(self):
+        """Start the writer and resume orphaned spool files, once per process"""
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        """Start the writer thread, once per process (gunicorn forks workers)"""
+        pid = os.getpid()
+        if self._pid == pid and self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            resume = self._pid != pid
+            if resume:
+                # Threads and queue locks do not survive a fork
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._pid = pid
+                self._worker = None
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='hatchly-image-writer', daemon=True
+                )
+                self._worker.start()
+        if resume:
+            self.resume(min_age=_ORPHAN_AGE)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._process(job)
+            except Exception as e:
+                logger.exception('Image writer error: %s', e)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, job, inline=False):
+        kind, attempt = job[0], job[-1]
+        try:
+            if kind == 'write':
+                self._write(job[1])
+            else:
+                self.store.delete(job[1], unless_used_since=job[2])
+                with self._lock:
+                    self.counters['deletes'] += 1
+        except Exception as e:
+            if attempt + 1 < self.retries and not inline:
+                with self._lock:
+                    self.counters['retries'] += 1
+                    self._retrying += 1
+                # Retry later without blocking the rest of the queue
+                delay = _BACKOFF[min(attempt, len(_BACKOFF) - 1)]
+                timer = threading.Timer(delay, self._retry, (job[:-1] + (attempt + 1,),))
+                timer.daemon = True
+                timer.start()
+                return
+            with self._lock:
+                self.counters['failures'] += 1
+            logger.error('Image %s failed after %d attempts: %s', kind, attempt + 1, e)
+            if kind == 'write':
+                self.mark_status(self.store.image_path_for(job[1]), 'failed')
+
+    def _retry(self, job):
+        try:
+            self._submit(job)
+        finally:
+            with self._lock:
+                self._retrying -= 1
+
+    def _write(self, sha256):
+        path = self.spool_path(sha256)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Written by another worker, or dropped by a rollback there
+            with self._lock:
+                self.counters['missing_spool'] += 1
+            if self.store.exists(sha256):
+                self.mark_status(self.store.image_path_for(sha256), 'ready')
+            else:
+                logger.error('Spooled image %s is missing and was never stored', sha256)
+                self.mark_status(self.store.image_path_for(sha256), 'failed')
+            return
+        stored = self.store.put(data, sha256)
+        self.mark_status(stored.image_path, 'ready')
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.counters['writes'] += 1
+
+    # ------------------------------------------
+    # Recovery and shutdown
+    # ------------------------------------------
+
+    def resume(self, min_age=0.0):
+        """Queue every spooled upload older than min_age seconds. Returns the count."""
+        cutoff = time.time() - min_age
+        count = 0
+        try:
+            names = os.listdir(self.spool_dir)
+        except OSError:
+            return 0
+        for name in names:
+            if not name.endswith('.img'):
+                continue
+            try:
+                if os.path.getmtime(os.path.join(self.spool_dir, name)) > cutoff:
+                    continue
+            except OSError:
+                continue
+            self._submit(('write', name[:-len('.img')], 0))
+            count += 1
+        with self._lock:
+            self.counters['resumed'] += count
+        return count
+
+    def drain(self, timeout=IMAGE_WRITE_DRAIN_TIMEOUT):
+        """Wait for queued jobs to finish. Returns True if the queue emptied."""
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks or self._retrying:
+            if time.monotonic() > deadline:
+                logger.warning('Image writer: %d jobs left at shutdown (spooled writes resume on next start)',
+                               self._queue.unfinished_tasks + self._retrying)
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'queued': self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0,
+            'max_queue': self.max_queue,
+            **counters
+        }
@@ -0,0 +1,216 @@
+"""
+Hatchly inference engine
+
+Collects preprocessed 224x224 images from concurrent /api/predict requests
+and runs them through the binary prawn-egg gate and the hatch regression
+model as one batch. Each request gets its own result back through a Future.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Batching configuration
+INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', '8'))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', '10'))
+INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', '30'))
+INFERENCE_STATS_WINDOW = int(os.environ.get('INFERENCE_STATS_WINDOW', '200'))
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    return float(np.percentile(values, pct))
+
+
+class InferenceEngine:
+    """Micro-batching front end for the binary gate and the hatch regressor.
+
+    binary_fn(batch) returns one prawn-egg probability per image, or None when
+    no binary model is loaded. regression_fn(batch) returns one predicted-days
+    value per image and only sees the images that passed the gate.
+
+    fused_fn(batch), if given, returns (probabilities, predicted_days) for the
+    whole batch from a single forward pass, or None to fall back to the two
+    separate calls. The gate is applied to its output afterwards.
+    """
+
+    def __init__(self, binary_fn, regression_fn, gate_threshold=0.7,
+                 max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+                 max_wait_ms=INFERENCE_MAX_WAIT_MS,
+                 stats_window=INFERENCE_STATS_WINDOW,
+                 fused_fn=None):
+        self.binary_fn = binary_fn
+        self.regression_fn = regression_fn
+        self.fused_fn = fused_fn
+        self.gate_threshold = gate_threshold
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+
+        self._stats_lock = threading.Lock()
+        self._recent = deque(maxlen=stats_window)
+        self._total_batches = 0
+        self._total_items = 0
+
+    def infer(self, image_array, timeout=INFERENCE_TIMEOUT):
+        """Run one image of shape (1, 224, 224, 3) through the batcher.
+
+        Returns (prawn_confidence, predicted_days). predicted_days is None when
+        the image did not pass the gate.
+        """
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((image_array, future, time.perf_counter()))
+        return future.result(timeout=timeout)
+
+    def _ensure_worker(self):
+        """Start the batching thread, once per process (gunicorn forks workers)"""
+        pid = os.getpid()
+        if self._pid == pid and self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._pid != pid:
+                # Threads and queue locks do not survive a fork
+                self._queue = queue.Queue()
+                self._pid = pid
+                self._worker = None
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='hatchly-inference', daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _run_binary(self, images):
+        try:
+            confidences = self.binary_fn(images)
+        except Exception as e:
+            # Same fallback as is_prawn_egg: a broken gate lets images through
+            logger.exception('Binary model error: %s', e)
+            confidences = None
+        if confidences is None:
+            return [1.0] * len(images)
+        return [float(c) for c in np.ravel(confidences)]
+
+    def _apply_gate(self, confidences, predictions):
+        """Split a fused result into gated (confidence, days) lists"""
+        confidences = [float(c) for c in np.ravel(confidences)]
+        predictions = np.ravel(predictions)
+        passed = [i for i, c in enumerate(confidences) if c >= self.gate_threshold]
+        days = [None] * len(confidences)
+        for idx in passed:
+            days[idx] = float(predictions[idx])
+        return confidences, days, passed
+
+    def _compute(self, images):
+        """(confidences, days, passed indexes) for a stacked batch of images"""
+        fused = self.fused_fn(images) if self.fused_fn is not None else None
+        if fused is not None:
+            return self._apply_gate(*fused)
+        confidences = self._run_binary(images)
+        passed = [i for i, c in enumerate(confidences) if c >= self.gate_threshold]
+        days = [None] * len(images)
+        if passed:
+            predictions = np.ravel(self.regression_fn(images[passed]))
+            for idx, value in zip(passed, predictions):
+                days[idx] = float(value)
+        return confidences, days, passed
+
+    def infer_batch(self, images):
+        """Run an already stacked (n, 224, 224, 3) array in chunks of max_batch_size.
+
+        Used by bulk endpoints that have the whole batch up front. Returns a
+        list of (prawn_confidence, predicted_days), like infer().
+        """
+        results = []
+        for start in range(0, len(images), self.max_batch_size):
+            chunk = images[start:start + self.max_batch_size]
+            started = time.perf_counter()
+            confidences, days, passed = self._compute(chunk)
+            self._record(len(chunk), len(passed), time.perf_counter() - started, 0.0)
+            results.extend(zip(confidences, days))
+        return results
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        try:
+            images = np.concatenate([item[0] for item in batch], axis=0)
+            confidences, days, passed = self._compute(images)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result((confidences[i], days[i]))
+
+        oldest = min(item[2] for item in batch)
+        self._record(len(batch), len(passed), finished - started, started - oldest)
+
+    def _record(self, size, gated, latency, queue_wait):
+        with self._stats_lock:
+            self._total_batches += 1
+            self._total_items += size
+            self._recent.append({
+                'size': size,
+                'passed_gate': gated,
+                'latency_ms': round(latency * 1000, 2),
+                'queue_wait_ms': round(queue_wait * 1000, 2),
+                'at': time.time()
+            })
+
+    def stats(self):
+        """Per-batch size and latency stats for tuning batch size and wait time"""
+        with self._stats_lock:
+            recent = list(self._recent)
+            total_batches = self._total_batches
+            total_items = self._total_items
+
+        sizes = [b['size'] for b in recent]
+        latencies = [b['latency_ms'] for b in recent]
+        waits = [b['queue_wait_ms'] for b in recent]
+        return {
+            'fused': self.fused_fn is not None,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'total_batches': total_batches,
+            'total_items': total_items,
+            'avg_batch_size': round(total_items / total_batches, 2) if total_batches else 0.0,
+            'recent': {
+                'batches': len(recent),
+                'avg_batch_size': round(float(np.mean(sizes)), 2) if sizes else 0.0,
+                'max_batch_size': max(sizes) if sizes else 0,
+                'latency_ms_p50': round(_percentile(latencies, 50), 2),
+                'latency_ms_p95': round(_percentile(latencies, 95), 2),
+                'queue_wait_ms_p50': round(_percentile(waits, 50), 2),
+                'queue_wait_ms_p95': round(_percentile(waits, 95), 2),
+                'last': recent[-10:]
+            }
+        }
@@ -0,0 +1,324 @@
+"""
+Hatchly metrics in the Prometheus text format
+
+/metrics serves request latency per route, per-stage /api/predict timings,
+database query counts and times per request, and prediction rejections by
+reason. prometheus_client is not a dependency, so this module keeps its own
+small registry of counters and histograms.
+
+Gunicorn runs several worker processes and a scrape reaches only one of
+them, so every worker's numbers are shared through the local disk, like the
+read cache's version files:
+
+  - Each process records into its own in-memory registry and a background
+    thread writes a JSON snapshot to METRICS_DIR/metrics_<pid>.json every
+    METRICS_FLUSH_INTERVAL seconds (and on every scrape and worker exit).
+  - A scrape sums the snapshots of all processes on the host.
+  - The file of a process that has exited is folded into archive.json, so
+    counters never go backwards when gunicorn replaces a worker. clear()
+    empties the directory when the gunicorn master starts.
+
+Recording is a dict update under a lock; with METRICS_ENABLED=false it is a
+no-op and /metrics answers 404.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev server: one process, nothing to fold
+    fcntl = None
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_DIR = os.environ.get('METRICS_DIR', 'instance/metrics')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '10'))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_ARCHIVE = 'archive.json'
+_LOCK_FILE = '.lock'
+
+logger = logging.getLogger(__name__)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._registry.lock():
+            values = self._registry.values(self.name)
+            values[key] = values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set"""
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        # Per-bucket (not cumulative) counts, then +Inf, then the sum
+        position = bisect_left(self.buckets, value)
+        with self._registry.lock():
+            values = self._registry.values(self.name)
+            entry = values.get(key)
+            if entry is None:
+                entry = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[position] += 1
+            entry[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the with block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class Registry:
+    """This process's metrics, shared with the other workers through METRICS_DIR"""
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL,
+                 enabled=METRICS_ENABLED):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._metrics = {}
+        self._values = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._flusher = None
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    # ------------------------------------------
+    # Recording
+    # ------------------------------------------
+
+    def lock(self):
+        """The registry lock, after starting this process's flusher if needed"""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    # A forked worker starts from zero; the parent flushes its own
+                    self._values = {}
+                    self._flusher = threading.Thread(
+                        target=self._flush_periodically, name='hatchly-metrics-flush', daemon=True
+                    )
+                    self._pid = pid
+                    self._flusher.start()
+        return self._lock
+
+    def values(self, name):
+        # Called with the lock held
+        return self._values.setdefault(name, {})
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning('Metrics flush failed: %s', e)
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                name: [[list(key), value if isinstance(value, (int, float)) else list(value)]
+                       for key, value in values.items()]
+                for name, values in self._values.items()
+            }
+
+    def flush(self):
+        """Write this process's values for the other workers to read"""
+        if not self.enabled or self._pid != os.getpid():
+            return
+        path = self._path(self._pid)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'pid': self._pid, 'values': self._snapshot()}, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------
+    # Collecting
+    # ------------------------------------------
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics_{pid}.json')
+
+    @contextmanager
+    def _dir_lock(self, exclusive):
+        with open(os.path.join(self.directory, _LOCK_FILE), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f).get('values', {})
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _merge(total, values):
+        for name, samples in values.items():
+            merged = total.setdefault(name, {})
+            for key, value in samples:
+                key = tuple(key)
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = value
+                elif isinstance(value, list):
+                    merged[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[key] = current + value
+        return total
+
+    def retire(self, pid):
+        """Fold an exited process's snapshot into the archive"""
+        if not self.enabled:
+            return
+        path = self._path(pid)
+        with self._dir_lock(exclusive=True):
+            # Another worker's scrape may have folded it already
+            if not os.path.exists(path):
+                return
+            archive_path = os.path.join(self.directory, _ARCHIVE)
+            total = self._merge(self._merge({}, self._read(archive_path)), self._read(path))
+            tmp_path = f'{archive_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'values': {
+                    name: [[list(key), value] for key, value in samples.items()]
+                    for name, samples in total.items()
+                }}, f, separators=(',', ':'))
+            os.replace(tmp_path, archive_path)
+            os.remove(path)
+
+    def _retire_exited(self):
+        for entry in os.listdir(self.directory):
+            if not (entry.startswith('metrics_') and entry.endswith('.json')):
+                continue
+            try:
+                pid = int(entry[len('metrics_'):-len('.json')])
+                os.kill(pid, 0)
+            except ValueError:
+                continue
+            except ProcessLookupError:
+                self.retire(pid)
+            except PermissionError:
+                pass
+
+    def collect(self):
+        """{name: {label key: value}} summed over every process on the host"""
+        self.flush()
+        self._retire_exited()
+        total = {}
+        with self._dir_lock(exclusive=False):
+            for entry in sorted(os.listdir(self.directory)):
+                if entry == _ARCHIVE or (entry.startswith('metrics_') and entry.endswith('.json')):
+                    self._merge(total, self._read(os.path.join(self.directory, entry)))
+        return total
+
+    def clear(self):
+        """Forget every process's numbers (the gunicorn master calls this on start)"""
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.listdir(self.directory):
+            if entry.endswith('.json') or entry.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self.directory, entry))
+                except OSError:
+                    pass
+
+    def render(self):
+        """The Prometheus text exposition of collect()"""
+        total = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f'# HELP {name} {_escape_help(metric.documentation)}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(total.get(name, {}).items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + [("le", _number(bound))])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+registry = Registry()
@@ -0,0 +1,308 @@
+"""
+Hatchly schema migrations and query-plan checks
+
+Migrations are the files in migrations/, applied in order of their numeric
+prefix and recorded in schema_migrations:
+
+  - NNNN_name.sql  statements separated by ';' (-- comments allowed)
+  - NNNN_name.py   a module with upgrade(cursor)
+
+Each migration is recorded only after all of its statements succeed. MySQL
+commits DDL implicitly, so a failed migration can be half applied; adding
+an index or column that already exists is therefore treated as done, which
+makes re-running after a fix (or on a hand-built database) safe.
+
+Migrations run once at deploy or startup, never from a web request:
+`flask db-migrate`, or run_at_startup() from the gunicorn master's
+on_starting hook (and `python app.py`) unless DB_AUTO_MIGRATE is false.
+Both hold a MySQL named lock while migrating, so hosts starting together
+apply each migration once.
+
+check_query_plans() runs EXPLAIN on every query literal in QUERY_MODULES and
+reports each one that reads a whole table (EXPLAIN type ALL), apart from
+the SMALL_TABLES and FULL_SCAN_FUNCTIONS allowlists.
+"""
+
+import ast
+import importlib.util
+import logging
+import os
+import re
+
+import mysql.connector
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+_MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.(sql|py)$')
+DB_AUTO_MIGRATE = os.environ.get('DB_AUTO_MIGRATE', 'true').lower() == 'true'
+MIGRATION_LOCK_TIMEOUT = int(os.environ.get('MIGRATION_LOCK_TIMEOUT', '60'))
+
+# Duplicate column / duplicate index: already applied
+_ALREADY_APPLIED = {1060, 1061}
+_LOCK_NAME = 'hatchly_schema_migrations'
+
+logger = logging.getLogger(__name__)
+
+CREATE_MIGRATIONS_TABLE = '''CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT NOT NULL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)'''
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def statements(self):
+        with open(self.path, 'r') as f:
+            sql = '\n'.join(
+                line for line in f.read().splitlines() if not line.strip().startswith('--')
+            )
+        return [statement.strip() for statement in sql.split(';') if statement.strip()]
+
+    def apply(self, cursor):
+        if self.path.endswith('.py'):
+            spec = importlib.util.spec_from_file_location(f'migration_{self.version}', self.path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.upgrade(cursor)
+            return
+        for statement in self.statements():
+            try:
+                cursor.execute(statement)
+            except mysql.connector.Error as e:
+                if e.errno not in _ALREADY_APPLIED:
+                    raise
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """All migrations, ordered by version"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2),
+                                        os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f'Duplicate migration version in {directory}')
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute('SELECT version FROM schema_migrations')
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending(conn):
+    cursor = conn.cursor()
+    try:
+        done = applied_versions(cursor)
+    finally:
+        cursor.close()
+    return [m for m in discover() if m.version not in done]
+
+
+def migrate(conn, on_apply=None):
+    """Apply every pending migration in order. Returns the ones applied."""
+    applied = []
+    for migration in pending(conn):
+        if on_apply:
+            on_apply(migration)
+        cursor = conn.cursor()
+        try:
+            migration.apply(cursor)
+            cursor.execute(
+                'INSERT INTO schema_migrations (version, name) VALUES (%s, %s)',
+                (migration.version, migration.name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        applied.append(migration)
+    return applied
+
+
+def migrate_locked(conn, on_apply=None):
+    """migrate() while holding the schema migration lock, one process at a time"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT GET_LOCK(%s, %s)', (_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError('Timed out waiting for the schema migration lock')
+        try:
+            return migrate(conn, on_apply=on_apply)
+        finally:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (_LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def run_at_startup(config):
+    """Apply pending migrations before any worker serves requests.
+
+    config is the mysql.connector settings. Does nothing when
+    DB_AUTO_MIGRATE is false; a failing migration raises, so the server
+    does not start on a half-migrated schema.
+    """
+    if not DB_AUTO_MIGRATE:
+        return []
+    conn = mysql.connector.connect(**config)
+    try:
+        return migrate_locked(
+            conn, on_apply=lambda m: logger.info('Applying migration %04d %s', m.version, m.name)
+        )
+    finally:
+        conn.close()
+
+
+# ------------------------------------------
+# Query plans
+# ------------------------------------------
+
+# Modules whose cursor.execute() literals check_query_plans() covers
+QUERY_MODULES = ('app.py', 'hatch_summary.py', 'capture_scheduler.py', 'image_writer.py')
+
+# Tables small enough that a full scan of them is fine in any query
+SMALL_TABLES = frozenset({'schema_migrations'})
+
+# Maintenance commands that read or rewrite a whole table on purpose
+FULL_SCAN_FUNCTIONS = frozenset({'hatch_summary.rebuild'})
+
+
+def _literal(node, assigned):
+    """SQL text of an execute() argument, or None if it is built at runtime.
+
+    Handles string constants, f-strings, '+' concatenation, str.format()
+    and ', '.join() of a constant tuple with literal arguments, and names
+    assigned a literal earlier in the same function or at module level.
+    An f-string {...} that is not a literal becomes %s, as the IN (...)
+    placeholder lists do.
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for part in node.values:
+            if isinstance(part, ast.Constant):
+                parts.append(part.value)
+            else:
+                value = _literal(part.value, assigned)
+                parts.append('%s' if value is None else value)
+        return ''.join(parts)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _literal(node.left, assigned), _literal(node.right, assigned)
+        if left is not None and right is not None:
+            return left + right
+        return None
+    if isinstance(node, ast.Name):
+        value = assigned.get(node.id)
+        return value if isinstance(value, str) else None
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        if node.func.attr == 'format' and not node.args:
+            template = _literal(node.func.value, assigned)
+            values = {keyword.arg: _literal(keyword.value, assigned) for keyword in node.keywords}
+            if template is not None and all(
+                name is not None and value is not None for name, value in values.items()
+            ):
+                return template.format(**values)
+        if node.func.attr == 'join' and len(node.args) == 1 and not node.keywords \
+                and isinstance(node.args[0], ast.Name):
+            separator = _literal(node.func.value, assigned)
+            items = assigned.get(node.args[0].id)
+            if separator is not None and isinstance(items, tuple):
+                return separator.join(items)
+    return None
+
+
+def _assignments(body, assigned):
+    """Add the names a list of statements assigns a literal (or tuple of them)"""
+    for node in body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 \
+                and isinstance(node.targets[0], ast.Name):
+            if isinstance(node.value, ast.Tuple):
+                items = [_literal(item, assigned) for item in node.value.elts]
+                value = tuple(items) if None not in items else None
+            else:
+                value = _literal(node.value, assigned)
+            if value is not None:
+                assigned[node.targets[0].id] = value
+    return assigned
+
+
+def module_queries(path):
+    """[(function, line, sql)] for every cursor.execute() literal in a module.
+
+    function is '<module>.<name>', e.g. 'hatch_summary.refresh'.
+    """
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read(), filename=path)
+    module = os.path.splitext(os.path.basename(path))[0]
+    constants = _assignments(tree.body, {})
+    queries = []
+    for function in ast.walk(tree):
+        if not isinstance(function, ast.FunctionDef):
+            continue
+        assigned = _assignments(
+            [node for node in ast.walk(function) if isinstance(node, ast.Assign)], dict(constants)
+        )
+        for node in ast.walk(function):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                    and node.func.attr in ('execute', 'executemany') and node.args:
+                sql = _literal(node.args[0], assigned)
+                if sql is not None:
+                    queries.append((f'{module}.{function.name}', node.lineno, ' '.join(sql.split())))
+    return sorted(set(queries), key=lambda q: q[1])
+
+
+def project_queries(directory, modules=QUERY_MODULES):
+    """module_queries() of every QUERY_MODULES file, in module order"""
+    queries = []
+    for module in modules:
+        queries.extend(module_queries(os.path.join(directory, module)))
+    return queries
+
+
+def check_query_plans(conn, queries):
+    """EXPLAIN each SELECT / UPDATE / DELETE / INSERT ... SELECT with sample parameters.
+
+    Returns [(function, line, sql, problems)] where problems lists every
+    table read with a full scan (type ALL), whether or not an index was a
+    candidate: an unused candidate still means every row is read. Derived
+    tables, the target of an INSERT, SMALL_TABLES and FULL_SCAN_FUNCTIONS
+    are not reported.
+    """
+    results = []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for function, line, sql in queries:
+            verb = sql.split(None, 1)[0].upper()
+            if verb == 'INSERT':
+                # Only the SELECT of an INSERT ... SELECT reads a table
+                if not re.search(r'\bSELECT\b', sql, re.IGNORECASE):
+                    continue
+            elif verb not in ('SELECT', 'UPDATE', 'DELETE'):
+                continue
+            if 'information_schema' in sql:
+                continue
+            cursor.execute('EXPLAIN ' + sql, (1,) * sql.count('%s'))
+            rows = cursor.fetchall()
+            problems = [] if function in FULL_SCAN_FUNCTIONS else [
+                row['table'] for row in rows
+                if row.get('type') == 'ALL' and row.get('select_type') != 'INSERT'
+                and row.get('table') and not row['table'].startswith('<')
+                and row['table'] not in SMALL_TABLES
+            ]
+            results.append((function, line, sql, problems))
+    finally:
+        cursor.close()
+    return results
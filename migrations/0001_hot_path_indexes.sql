@@ -0,0 +1,18 @@
+-- Composite indexes for the per-user queries in app.py.
+-- InnoDB appends the primary key to every secondary index, so
+-- (..., created_at) also serves ORDER BY created_at DESC, id DESC.
+
+-- get_predictions: WHERE user_id AND prawn_id ORDER BY created_at
+CREATE INDEX idx_predictions_user_prawn_created ON predictions (user_id, prawn_id, created_at);
+
+-- Dashboard feed: WHERE user_id ORDER BY created_at DESC LIMIT 6
+CREATE INDEX idx_predictions_user_created ON predictions (user_id, created_at);
+
+-- Hatch summary refresh: latest prediction per prawn
+CREATE INDEX idx_predictions_prawn_created ON predictions (prawn_id, created_at);
+
+-- get_prawns / dashboard: WHERE user_id ORDER BY created_at
+CREATE INDEX idx_prawns_user_created ON prawns (user_id, created_at);
+
+-- get_locations and the duplicate-name checks: WHERE user_id [AND name]
+CREATE INDEX idx_locations_user_name ON locations (user_id, name);
@@ -0,0 +1,49 @@
+"""Per-prawn hatch summary table, filled from existing predictions
+
+The DDL and the fill are frozen copies of hatch_summary.py as of this
+migration, so later changes to that module cannot change what it applies.
+"""
+
+CREATE_TABLE = '''CREATE TABLE IF NOT EXISTS prawn_hatch_summary (
+    prawn_id INT NOT NULL PRIMARY KEY,
+    user_id INT NOT NULL,
+    location_id INT NULL,
+    latest_prediction_id INT NULL,
+    predicted_days INT NULL,
+    current_day INT NULL,
+    confidence FLOAT NULL,
+    latest_image_path VARCHAR(255) NULL,
+    latest_created_at DATETIME NULL,
+    projected_hatch_date DATE NULL,
+    prediction_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_hatch_summary_user_days (user_id, predicted_days)
+)'''
+
+FILL = '''INSERT INTO prawn_hatch_summary (
+        prawn_id, user_id, location_id, latest_prediction_id, predicted_days, current_day,
+        confidence, latest_image_path, latest_created_at, projected_hatch_date, prediction_count
+    )
+    SELECT latest.prawn_id, pr.user_id, pr.location_id, latest.id,
+           latest.predicted_days, latest.current_day, latest.confidence, latest.image_path,
+           latest.created_at,
+           DATE_ADD(DATE(latest.created_at), INTERVAL latest.predicted_days DAY),
+           latest.prediction_count
+    FROM (
+        SELECT p.id, p.prawn_id, p.predicted_days, p.current_day, p.confidence,
+               p.image_path, p.created_at,
+               ROW_NUMBER() OVER (
+                   PARTITION BY p.prawn_id ORDER BY p.created_at DESC, p.id DESC
+               ) AS rn,
+               COUNT(*) OVER (PARTITION BY p.prawn_id) AS prediction_count
+        FROM predictions p
+        JOIN prawns pr ON pr.id = p.prawn_id AND pr.user_id = p.user_id
+    ) latest
+    JOIN prawns pr ON pr.id = latest.prawn_id
+    WHERE latest.rn = 1'''
+
+
+def upgrade(cursor):
+    cursor.execute(CREATE_TABLE)
+    cursor.execute('DELETE FROM prawn_hatch_summary')
+    cursor.execute(FILL)
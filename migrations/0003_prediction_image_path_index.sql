@@ -0,0 +1,3 @@
+-- Identical photos share one stored file (image_store.py); delete_prediction
+-- counts the remaining references before removing it.
+CREATE INDEX idx_predictions_image_path ON predictions (image_path(191));
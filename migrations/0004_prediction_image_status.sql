@@ -0,0 +1,3 @@
+-- Images are written after the row is committed (image_writer.py):
+-- 'pending' until the file is on the upload volume, 'failed' if it never was.
+ALTER TABLE predictions ADD COLUMN image_status VARCHAR(16) NOT NULL DEFAULT 'ready';
@@ -0,0 +1,22 @@
+-- Scheduled camera capture-and-predict (capture_scheduler.py).
+-- One schedule per prawn; a worker claims due rows by writing its token to
+-- claimed_by, and the lease in claimed_until lets another worker take over
+-- a job whose worker died mid-run.
+CREATE TABLE IF NOT EXISTS capture_schedules (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    prawn_id INT NOT NULL,
+    camera_url VARCHAR(255) NULL,
+    interval_minutes INT NOT NULL,
+    enabled TINYINT(1) NOT NULL DEFAULT 1,
+    next_run_at DATETIME NOT NULL,
+    last_run_at DATETIME NULL,
+    last_status VARCHAR(255) NULL,
+    claimed_by CHAR(32) NULL,
+    claimed_until DATETIME NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_capture_schedules_prawn (prawn_id),
+    KEY idx_capture_schedules_due (enabled, next_run_at),
+    KEY idx_capture_schedules_claim (claimed_by),
+    KEY idx_capture_schedules_user (user_id)
+);
@@ -0,0 +1,3 @@
+-- Moving every prawn out of a location (delete_location with reassignment):
+-- WHERE user_id AND location_id
+CREATE INDEX idx_prawns_user_location ON prawns (user_id, location_id);
@@ -0,0 +1,206 @@
+"""
+Hatchly model backends
+
+Wraps a loaded Keras model behind one predict(batch) interface so the app
+can serve it through:
+  - keras:       model.predict() (the original path)
+  - tf_function: a traced tf.function call of the model
+  - tflite:      a TFLite interpreter built from the model
+
+predict(batch) always returns a list of numpy arrays, one per model output.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+BACKENDS = ('keras', 'tf_function', 'tflite')
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'keras').lower()
+TFLITE_NUM_THREADS = int(os.environ.get('TFLITE_NUM_THREADS', '0')) or None
+
+logger = logging.getLogger(__name__)
+
+
+def _as_output_list(outputs, names=()):
+    """Outputs as a list in the Keras output order (names: model.output_names)"""
+    if isinstance(outputs, dict):
+        if sorted(outputs) != sorted(names):
+            raise ValueError(f"Model outputs {sorted(outputs)} do not match its output_names {list(names)}")
+        outputs = [outputs[k] for k in names]
+    elif not isinstance(outputs, (list, tuple)):
+        outputs = [outputs]
+    return [np.asarray(o) for o in outputs]
+
+
+class KerasBackend:
+    """Plain Keras model.predict()"""
+    name = 'keras'
+
+    def __init__(self, keras_model):
+        self.keras_model = keras_model
+
+    def predict(self, batch):
+        return _as_output_list(self.keras_model.predict(batch, verbose=0),
+                               getattr(self.keras_model, 'output_names', ()))
+
+
+class TFFunctionBackend:
+    """Model call traced once into a tf.function graph"""
+    name = 'tf_function'
+
+    def __init__(self, keras_model):
+        import tensorflow as tf
+        self.keras_model = keras_model
+        input_shape = (None,) + tuple(keras_model.input_shape[1:])
+        self._fn = tf.function(
+            lambda x: keras_model(x, training=False),
+            input_signature=[tf.TensorSpec(input_shape, tf.float32)],
+            reduce_retracing=True
+        )
+
+    def predict(self, batch):
+        outputs = self._fn(np.asarray(batch, dtype=np.float32))
+        if isinstance(outputs, dict):
+            outputs = {k: v.numpy() for k, v in outputs.items()}
+        elif isinstance(outputs, (list, tuple)):
+            outputs = [o.numpy() for o in outputs]
+        else:
+            outputs = outputs.numpy()
+        return _as_output_list(outputs, getattr(self.keras_model, 'output_names', ()))
+
+
+class TFLiteBackend:
+    """TFLite interpreter, converted from the Keras model or loaded from a .tflite file"""
+    name = 'tflite'
+
+    def __init__(self, keras_model, tflite_path=None, source_paths=()):
+        import tensorflow as tf
+        self.keras_model = keras_model
+        if tflite_path and _is_fresh(tflite_path, source_paths):
+            with open(tflite_path, 'rb') as f:
+                content = f.read()
+            logger.info('TFLite model loaded from %s', tflite_path)
+        else:
+            converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+            content = converter.convert()
+            if tflite_path:
+                try:
+                    with open(tflite_path, 'wb') as f:
+                        f.write(content)
+                    logger.info('TFLite model converted and cached at %s', tflite_path)
+                except OSError as e:
+                    logger.warning('Could not cache TFLite model at %s: %s', tflite_path, e)
+        self._interpreter = tf.lite.Interpreter(
+            model_content=content, num_threads=TFLITE_NUM_THREADS
+        )
+        # The signature runner resizes the input tensor for each batch size
+        self._runner = self._interpreter.get_signature_runner()
+        self._input_name = list(self._runner.get_input_details())[0]
+        self._output_keys = _output_order(self._runner.get_output_details(), keras_model)
+        # The interpreter is not thread-safe
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            outputs = self._runner(**{self._input_name: batch})
+        return [np.array(outputs[k]) for k in self._output_keys]
+
+
+def _is_fresh(tflite_path, source_paths):
+    """A cached .tflite file is reused only if it is newer than the models it came from"""
+    if not os.path.exists(tflite_path):
+        return False
+    cached_at = os.path.getmtime(tflite_path)
+    return all(
+        not os.path.exists(src) or os.path.getmtime(src) <= cached_at
+        for src in source_paths
+    )
+
+
+def _output_order(details, keras_model):
+    """TFLite signature output keys in the Keras model's output order.
+
+    Matched by name against keras_model.output_names, then by the
+    converter's default output_0, output_1, ... naming, then by shape when
+    every output shape is distinct. Anything else raises ValueError: with a
+    fused model a wrong guess would swap the gate and the days head.
+    """
+    keys = list(details)
+    names = list(getattr(keras_model, 'output_names', None) or [])
+    if len(keys) == 1 and len(names) <= 1:
+        return keys
+    if names and sorted(keys) == sorted(names):
+        return names
+
+    numbered = {}
+    for key in keys:
+        prefix, _, suffix = key.rpartition('_')
+        if prefix == 'output' and suffix.isdigit():
+            numbered[int(suffix)] = key
+    if sorted(numbered) == list(range(len(keys))) and (not names or len(names) == len(keys)):
+        return [numbered[i] for i in range(len(keys))]
+
+    keras_shapes = [tuple(output.shape[1:]) for output in getattr(keras_model, 'outputs', ())]
+    by_shape = {tuple(int(d) for d in details[key]['shape'][1:]): key for key in keys}
+    if (len(keras_shapes) == len(keys) and len(set(keras_shapes)) == len(keras_shapes)
+            and len(by_shape) == len(keys) and set(by_shape) == set(keras_shapes)):
+        return [by_shape[shape] for shape in keras_shapes]
+
+    raise ValueError(
+        f"Cannot match TFLite outputs {sorted(keys)} to the Keras outputs {names}; "
+        "name the model outputs or use another INFERENCE_BACKEND"
+    )
+
+
+def create_backend(keras_model, kind=INFERENCE_BACKEND, tflite_path=None, source_paths=()):
+    """Wrap a Keras model in the requested backend"""
+    kind = (kind or 'keras').lower()
+    if kind == 'keras':
+        return KerasBackend(keras_model)
+    if kind == 'tf_function':
+        return TFFunctionBackend(keras_model)
+    if kind == 'tflite':
+        return TFLiteBackend(keras_model, tflite_path, source_paths)
+    raise ValueError(f"Unknown inference backend '{kind}', expected one of {', '.join(BACKENDS)}")
+
+
+def compare_backends(keras_model, batch, kinds=BACKENDS, runs=20, tflite_path=None):
+    """Side-by-side latency and output parity of each backend against Keras.
+
+    Returns one dict per backend with build time, single-batch latency
+    percentiles and the max absolute difference of every output from the
+    Keras reference.
+    """
+    reference = KerasBackend(keras_model).predict(batch)
+    results = []
+    for kind in kinds:
+        try:
+            started = time.perf_counter()
+            backend = create_backend(keras_model, kind, tflite_path)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            backend.predict(batch)  # first call pays tracing / allocation
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                outputs = backend.predict(batch)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            max_diff = max(
+                float(np.max(np.abs(out.reshape(ref.shape) - ref)))
+                for out, ref in zip(outputs, reference)
+            )
+            results.append({
+                'backend': kind,
+                'build_ms': round(build_ms, 1),
+                'latency_ms_p50': round(float(np.percentile(timings, 50)), 2),
+                'latency_ms_p95': round(float(np.percentile(timings, 95)), 2),
+                'max_abs_diff': max_diff
+            })
+        except Exception as e:
+            results.append({'backend': kind, 'error': str(e)})
+    return results
@@ -0,0 +1,232 @@
+"""
+Hatchly model lifecycle
+
+Loads the regression model, the binary classifier and the optional fused
+graph, warms them up with a dummy batch and reports readiness for
+/api/ready. TensorFlow is only imported once loading starts, so importing
+the app (and serving login and other non-ML routes) does not wait on it.
+
+Load modes (MODEL_LOAD_MODE):
+  - preload:    load in the gunicorn master before fork so workers share the
+                weights copy-on-write; each worker warms up after fork.
+                Opt-in only (GUNICORN_PRELOAD=true): TensorFlow is not
+                fork-safe once its runtime has started
+  - background: each process loads and warms up in a background thread
+  - lazy:       nothing happens until the first request needs the models
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from model_backends import create_backend
+
+MODEL_LOAD_MODE = os.environ.get('MODEL_LOAD_MODE', 'background').lower()
+MODEL_READY_TIMEOUT = float(os.environ.get('MODEL_READY_TIMEOUT', '30'))
+
+logger = logging.getLogger(__name__)
+
+
+class ModelManager:
+    """Owns model loading, warm-up and readiness for one process"""
+
+    def __init__(self, model_path, binary_model_path,
+                 model_backend='keras', binary_model_backend='keras',
+                 model_tflite_path=None, binary_model_tflite_path=None,
+                 fused=False, fused_tflite_path=None, warmup_batch_sizes=(1,)):
+        self.model_path = model_path
+        self.binary_model_path = binary_model_path
+        self.model_backend = model_backend
+        self.binary_model_backend = binary_model_backend
+        self.model_tflite_path = model_tflite_path
+        self.binary_model_tflite_path = binary_model_tflite_path
+        self.fused = fused
+        self.fused_tflite_path = fused_tflite_path
+        self.warmup_batch_sizes = tuple(sorted(set(warmup_batch_sizes)))
+
+        # Backends from model_backends; call .predict(batch) on them
+        self.model = None
+        self.binary_model = None
+        self.fused_model = None
+
+        self.state = 'not_loaded'
+        self.model_version = 'unloaded'
+        self.loaded = False
+        self.warmed_up = False
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.error = None
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    # ------------------------------------------
+    # Loading
+    # ------------------------------------------
+
+    def load(self):
+        """Load all models in this process. Safe to call more than once."""
+        with self._lock:
+            if self.loaded:
+                return
+            self.state = 'loading'
+            started = time.perf_counter()
+            self._load_regression()
+            self._load_binary()
+            if self.fused:
+                self._build_fused()
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self.model_version = self._compute_version()
+            self.loaded = True
+            self.state = 'loaded'
+            logger.info('Models loaded in %.2fs', self.load_seconds)
+
+    def _load_regression(self):
+        try:
+            from tensorflow.keras.models import load_model as load_keras_model
+            keras_model = load_keras_model(self.model_path, compile=False)
+            keras_model.compile(
+                optimizer='adam',
+                loss='mae',
+                metrics=['mae']
+            )
+            self.model = create_backend(
+                keras_model, self.model_backend, self.model_tflite_path, (self.model_path,)
+            )
+            logger.info('Model loaded from %s (%s backend)', self.model_path, self.model.name)
+        except Exception as e:
+            self.error = str(e)
+            logger.error('Error loading model, predictions will be dummies: %s', e)
+
+    def _load_binary(self):
+        """Load the binary classifier (prawn egg vs not prawn egg)"""
+        try:
+            from tensorflow.keras.models import load_model as load_keras_model
+            keras_model = load_keras_model(self.binary_model_path)
+            self.binary_model = create_backend(
+                keras_model, self.binary_model_backend,
+                self.binary_model_tflite_path, (self.binary_model_path,)
+            )
+            logger.info('Binary model loaded from %s (%s backend)', self.binary_model_path, self.binary_model.name)
+        except Exception as e:
+            logger.warning('Binary model not loaded: %s', e)
+
+    def _build_fused(self):
+        """Combine the binary classifier and the regressor into one graph.
+
+        Both models read the same 224x224 input, so one forward pass returns the
+        prawn egg probability and the days-until-hatch output together.
+        """
+        if self.model is None or self.binary_model is None:
+            logger.warning('Fused inference needs both models, using separate passes')
+            return
+        try:
+            import tensorflow as tf
+            inputs = tf.keras.Input(shape=(224, 224, 3), name='image')
+            keras_model = tf.keras.Model(
+                inputs=inputs,
+                outputs=[self.binary_model.keras_model(inputs), self.model.keras_model(inputs)],
+                name='hatchly_fused'
+            )
+            self.fused_model = create_backend(
+                keras_model, self.model_backend, self.fused_tflite_path,
+                (self.model_path, self.binary_model_path)
+            )
+            logger.info('Fused binary + regression graph built (%s backend)', self.fused_model.name)
+        except Exception as e:
+            logger.error('Error building fused model: %s', e)
+            self.fused_model = None
+
+    def _compute_version(self):
+        """Short id of the loaded model files and serving setup, used as a cache key prefix"""
+        parts = [self.model_backend, self.binary_model_backend, str(self.fused_model is not None)]
+        for path in (self.model_path, self.binary_model_path):
+            try:
+                st = os.stat(path)
+                parts.append(f'{path}:{st.st_size}:{int(st.st_mtime)}')
+            except OSError:
+                parts.append(f'{path}:missing')
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:12]
+
+    # ------------------------------------------
+    # Warm-up and readiness
+    # ------------------------------------------
+
+    def warm_up(self):
+        """Run dummy batches so the first real request does not pay tracing cost"""
+        self.state = 'warming_up'
+        started = time.perf_counter()
+        if self.fused_model is not None:
+            backends = [self.fused_model]
+        else:
+            backends = [b for b in (self.binary_model, self.model) if b is not None]
+        for batch_size in self.warmup_batch_sizes:
+            dummy = np.zeros((batch_size, 224, 224, 3), dtype=np.float32)
+            for backend in backends:
+                try:
+                    backend.predict(dummy)
+                except Exception as e:
+                    logger.warning('Warm-up failed for %s backend: %s', backend.name, e)
+        self.warmup_seconds = round(time.perf_counter() - started, 3)
+        self.warmed_up = True
+        self.state = 'ready'
+        logger.info('Models warmed up in %.2fs', self.warmup_seconds)
+
+    def start(self, background=True):
+        """Load (if needed) and warm up, once per process"""
+        pid = os.getpid()
+        with self._lock:
+            if self._pid == pid and (self._thread is not None or self._ready.is_set()):
+                return
+            if self._pid != pid:
+                # Forked worker: weights are inherited, warm-up is not
+                self._ready = threading.Event()
+                self.warmed_up = False
+                self._pid = pid
+            if background:
+                self._thread = threading.Thread(
+                    target=self._load_and_warm_up, name='hatchly-model-loader', daemon=True
+                )
+                self._thread.start()
+                return
+        self._load_and_warm_up()
+
+    def _load_and_warm_up(self):
+        try:
+            self.load()
+            self.warm_up()
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            logger.exception('Model startup failed: %s', e)
+        finally:
+            self._ready.set()
+
+    def wait_until_ready(self, timeout=MODEL_READY_TIMEOUT):
+        """Block until load and warm-up have finished in this process"""
+        self.start()
+        return self._ready.wait(timeout)
+
+    def is_ready(self):
+        return self._pid == os.getpid() and self._ready.is_set()
+
+    def status(self):
+        return {
+            'ready': self.is_ready() and self.state == 'ready',
+            'state': self.state,
+            'pid': os.getpid(),
+            'model_loaded': self.model is not None,
+            'binary_model_loaded': self.binary_model is not None,
+            'fused': self.fused_model is not None,
+            'model_version': self.model_version,
+            'warmed_up': self.warmed_up,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'error': self.error
+        }
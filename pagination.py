@@ -0,0 +1,82 @@
+"""
+Hatchly keyset pagination
+
+List endpoints are ordered newest first by (created_at, id). A page ends
+with next_cursor, an opaque token holding the last row's (created_at, id);
+the next page asks for rows strictly older than it, so it is an index range
+scan whatever the depth, and rows inserted meanwhile never shift pages.
+
+Pagination is opt-in: send ?cursor= (empty for the first page) and
+optionally ?limit=. Without a cursor parameter the endpoints return every
+row as before.
+"""
+
+import base64
+import binascii
+import os
+from datetime import datetime
+
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', '50'))
+PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', '200'))
+
+
+class PageRequest:
+    """Where a page starts and how many rows it holds"""
+
+    def __init__(self, after=None, limit=PAGE_SIZE):
+        self.after = after   # (created_at, id) of the previous page's last row, or None
+        self.limit = limit
+
+    def where(self, alias):
+        """SQL condition (and its parameters) selecting rows after the cursor"""
+        if self.after is None:
+            return '', ()
+        created_at, row_id = self.after
+        return (
+            f' AND ({alias}.created_at < %s OR ({alias}.created_at = %s AND {alias}.id < %s))',
+            (created_at, created_at, row_id)
+        )
+
+    def order_limit(self, alias):
+        """ORDER BY / LIMIT clause; one extra row tells whether another page follows"""
+        return f' ORDER BY {alias}.created_at DESC, {alias}.id DESC LIMIT {self.limit + 1}'
+
+    def split(self, rows):
+        """(rows of this page, next_cursor or None)"""
+        if len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        last = rows[-1]
+        return rows, encode_cursor(last['created_at'], last['id'])
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def page_request(args):
+    """PageRequest from query args, or None when the client did not ask for pages.
+
+    Raises ValueError for a malformed cursor or limit.
+    """
+    if 'cursor' not in args:
+        return None
+    cursor = args.get('cursor') or None
+    limit = args.get('limit', PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be a number')
+    limit = max(1, min(PAGE_SIZE_MAX, limit))
+    return PageRequest(decode_cursor(cursor) if cursor else None, limit)
@@ -0,0 +1,141 @@
+"""
+Hatchly password hashing and step-up tokens
+
+Werkzeug's default password hash is scrypt, which is deliberately slow and
+memory hungry (~16 MB per hash). Two things keep it from hurting the rest of
+a worker:
+
+  - PasswordHasher runs hashes on a small pool of PASSWORD_HASH_WORKERS
+    threads, with at most PASSWORD_HASH_QUEUE more waiting, which caps the
+    cores and memory scrypt can take. The request thread still waits for
+    its hash, for at most PASSWORD_HASH_TIMEOUT seconds. The queue defaults
+    to the gunicorn request threads (GUNICORN_THREADS) minus the hash
+    workers minus one, so a burst of logins can never occupy every request
+    thread: the next one is turned away at once with HashingBusy (the
+    route answers 503) and other pages keep being served.
+  - StepUpTokens: after one successful password check for a destructive
+    action, the user gets a signed token valid for STEP_UP_TTL seconds.
+    Further deletes send the token instead of the password, so a cleanup
+    session pays for scrypt once. Tokens are bound to the user and to their
+    current password hash, so changing the password revokes them.
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+# Keep one request thread out of reach of password hashing
+PASSWORD_HASH_QUEUE = int(os.environ.get(
+    'PASSWORD_HASH_QUEUE',
+    str(max(0, int(os.environ.get('GUNICORN_THREADS', '4')) - PASSWORD_HASH_WORKERS - 1))
+))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+STEP_UP_TTL = int(os.environ.get('STEP_UP_TTL', '300'))
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are running or queued in this worker"""
+
+
+class PasswordHasher:
+    """Bounded pool for password hash checks and generation"""
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_QUEUE,
+                 timeout=PASSWORD_HASH_TIMEOUT):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool = None
+        self._in_flight = 0
+        self.counters = {
+            'checks': 0,
+            'generated': 0,
+            'rejected': 0
+        }
+
+    def _executor(self):
+        """Thread pool, once per process (gunicorn forks workers)"""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='hatchly-password-hash'
+                    )
+                    self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+                    self._in_flight = 0
+                    self._pid = pid
+        return self._pool
+
+    def _run(self, counter, fn, *args):
+        pool = self._executor()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counters['rejected'] += 1
+            raise HashingBusy('Too many sign-in attempts right now. Please try again.')
+        with self._lock:
+            self._in_flight += 1
+            self.counters[counter] += 1
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        # The slot stays taken until the hash really finishes, even after a timeout
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy('Password check timed out. Please try again.')
+
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def check(self, password_hash, password):
+        return self._run('checks', check_password_hash, password_hash, password)
+
+    def generate(self, password):
+        return self._run('generated', generate_password_hash, password)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                **self.counters
+            }
+
+
+class StepUpTokens:
+    """Short-lived signed proof that the user just re-entered their password"""
+
+    def __init__(self, secret_key, ttl=STEP_UP_TTL):
+        self.ttl = ttl
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='hatchly-step-up')
+
+    @staticmethod
+    def _fingerprint(password_hash):
+        return hashlib.sha256(password_hash.encode()).hexdigest()[:16]
+
+    def issue(self, user_id, password_hash):
+        return self._serializer.dumps({'uid': user_id, 'pw': self._fingerprint(password_hash)})
+
+    def verify(self, token, user_id, password_hash):
+        """True if the token was issued to this user, for this password, within ttl"""
+        try:
+            data = self._serializer.loads(token, max_age=self.ttl)
+        except BadSignature:
+            return False
+        return (isinstance(data, dict) and data.get('uid') == user_id
+                and data.get('pw') == self._fingerprint(password_hash))
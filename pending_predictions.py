@@ -0,0 +1,158 @@
+"""
+Hatchly pending predictions
+
+/api/predict stages the decoded image and the model's result under an
+opaque token. /api/save_prediction then commits by token, so the client
+does not upload the image a second time and the saved values are exactly
+what the model returned.
+
+Staged entries live on disk (PENDING_PREDICTION_DIR) so any gunicorn
+worker can commit a token issued by another one. A token is claimed with
+an atomic rename, so it can only be committed once.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import time
+
+PENDING_PREDICTION_DIR = os.environ.get('PENDING_PREDICTION_DIR', 'instance/pending_predictions')
+PENDING_PREDICTION_TTL = float(os.environ.get('PENDING_PREDICTION_TTL', '900'))
+
+# Sweep expired entries every N stores
+_SWEEP_EVERY = 64
+
+
+class PendingPrediction:
+    """A claimed token: the staged image file and the stored prediction result"""
+
+    def __init__(self, store, token, user_id, result, image_path, sha256=None):
+        self.store = store
+        self.token = token
+        self.user_id = user_id
+        self.result = result
+        self.image_path = image_path
+        self._sha256 = sha256
+        self._moved_to = None
+
+    @property
+    def sha256(self):
+        """SHA-256 of the staged image (hashed from disk for older entries)"""
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            with open(self.image_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(chunk)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def move_image_to(self, destination):
+        """Move the staged image into place (a rename when on the same filesystem)"""
+        shutil.move(self.image_path, destination)
+        self._moved_to = destination
+
+    def discard(self):
+        """Drop the entry after a successful commit"""
+        self.store._remove(self.token, claimed=True)
+
+    def release(self):
+        """Put the entry back so the client can retry the commit"""
+        try:
+            if self._moved_to:
+                # Copy: another request may share the spooled file; the
+                # image writer's unspool() removes it when nobody does
+                shutil.copyfile(self._moved_to, self.image_path)
+                self._moved_to = None
+            os.replace(self.store._meta_path(self.token, claimed=True),
+                       self.store._meta_path(self.token))
+        except OSError:
+            pass
+
+
+class PendingPredictionStore:
+    """Short-lived, token-addressed staging area for predict-then-save"""
+
+    def __init__(self, directory=PENDING_PREDICTION_DIR, ttl=PENDING_PREDICTION_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._stores = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _meta_path(self, token, claimed=False):
+        suffix = '.claimed' if claimed else ''
+        return os.path.join(self.directory, f'{token}.json{suffix}')
+
+    def _image_path(self, token):
+        return os.path.join(self.directory, f'{token}.img')
+
+    def put(self, user_id, upload, result):
+        """Stage an image and its prediction result, returning the token"""
+        token = secrets.token_urlsafe(24)
+        with open(self._image_path(token), 'wb') as f:
+            f.write(upload.getbuffer())
+        meta = {
+            'user_id': user_id,
+            'result': result,
+            'content_type': upload.content_type,
+            'sha256': upload.sha256,
+            'created_at': time.time()
+        }
+        tmp_path = f'{self._meta_path(token)}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(token))
+
+        self._stores += 1
+        if self._stores % _SWEEP_EVERY == 0:
+            self.sweep()
+        return token
+
+    def claim(self, token, user_id):
+        """Claim a token for commit. Returns a PendingPrediction, or None if
+        the token is unknown, expired, already used or belongs to another user."""
+        if not token or not all(c.isalnum() or c in '-_' for c in token):
+            return None
+        try:
+            os.rename(self._meta_path(token), self._meta_path(token, claimed=True))
+        except OSError:
+            return None
+        try:
+            with open(self._meta_path(token, claimed=True), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            self._remove(token, claimed=True)
+            return None
+
+        if meta.get('user_id') != user_id:
+            # Not yours - put it back untouched
+            os.replace(self._meta_path(token, claimed=True), self._meta_path(token))
+            return None
+        if time.time() - meta.get('created_at', 0) > self.ttl:
+            self._remove(token, claimed=True)
+            return None
+        return PendingPrediction(self, token, user_id, meta['result'], self._image_path(token),
+                                 meta.get('sha256'))
+
+    def _remove(self, token, claimed=False):
+        for path in (self._meta_path(token, claimed), self._image_path(token)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def sweep(self):
+        """Delete entries older than the TTL"""
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,162 @@
+"""
+Hatchly prediction result cache
+
+Re-submitted photos (network retries, double-taps, re-running the same
+camera capture) return the stored /api/predict response instead of going
+through preprocessing and both models again.
+
+Entries are keyed by a SHA-256 of the decoded image bytes plus the model
+version and the preprocessing settings (preprocessing.PIPELINE_VERSION), so
+neither a model update nor a change to how images are turned into model
+input ever serves stale results. The in-process tier
+is a bounded LRU with a TTL. An optional on-disk tier (PREDICTION_CACHE_DIR)
+is shared by every gunicorn worker on the host.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '512'))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', '600'))
+PREDICTION_CACHE_DIR = os.environ.get('PREDICTION_CACHE_DIR', '')
+
+# Sweep expired files from the disk tier every N writes
+_DISK_SWEEP_EVERY = 256
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """LRU + TTL cache of (payload, status) prediction responses"""
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL,
+                 disk_dir=PREDICTION_CACHE_DIR):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl
+        self.disk_dir = disk_dir or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expired': 0
+        }
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for_digest(sha256_hex, model_version, pipeline_version):
+        """Key from a SHA-256 already computed while streaming the upload"""
+        return f"{model_version}-{pipeline_version}-{sha256_hex}"
+
+    def get(self, key):
+        """Return (payload, status) or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, payload, status = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return payload, status
+                del self._entries[key]
+                self.counters['expired'] += 1
+
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['disk_hits'] += 1
+            self._memory_set(key, *entry)
+        return entry[1], entry[2]
+
+    def set(self, key, payload, status=200):
+        stored_at = time.time()
+        with self._lock:
+            self._memory_set(key, stored_at, payload, status)
+            self.counters['stores'] += 1
+            self._writes += 1
+            sweep = bool(self.disk_dir) and self._writes % _DISK_SWEEP_EVERY == 0
+        self._disk_set(key, stored_at, payload, status)
+        if sweep:
+            self._disk_sweep()
+
+    def _memory_set(self, key, stored_at, payload, status):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = (stored_at, payload, status)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    # ------------------------------------------
+    # Shared disk tier
+    # ------------------------------------------
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[-2:], f'{key}.json')
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'r') as f:
+                data = json.load(f)
+            return data['stored_at'], data['payload'], data['status']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _disk_set(self, key, stored_at, payload, status):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'stored_at': stored_at, 'payload': payload, 'status': status}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning('Prediction cache write failed: %s', e)
+
+    def _disk_sweep(self):
+        if not self.disk_dir:
+            return
+        cutoff = time.time() - self.ttl
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            size = len(self._entries)
+        lookups = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
+        hits = counters['memory_hits'] + counters['disk_hits']
+        return {
+            'entries': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'disk_tier': self.disk_dir is not None,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            **counters
+        }
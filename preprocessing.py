@@ -0,0 +1,154 @@
+"""
+Hatchly image preprocessing
+
+Turns an uploaded photo into the (1, 224, 224, 3) float32 tensor both models
+expect, plus the brightness / texture numbers used by the quality gates.
+
+  - The defaults produce the same pixels as the original pipeline (full
+    decode, bicubic resize), which the models were trained and validated
+    on. Three opt-in settings make it much cheaper but change the model
+    input slightly:
+      PREPROCESS_DRAFT=true         JPEGs are decoded in draft mode, so the
+                                    decoder downscales by 1/2, 1/4 or 1/8
+                                    instead of producing full phone resolution
+      PREPROCESS_RESAMPLE=bilinear  a cheaper resize filter
+      PREPROCESS_REDUCING_GAP=3     a cheap box reduction before the resize
+    Measure the drift with `flask benchmark-preprocessing` (max_abs_diff)
+    against real photos before enabling them.
+  - The uint8 pixels are scaled straight into a float32 output buffer (one
+    per thread unless the caller passes its own, e.g. a row of a batch).
+  - Mean and standard deviation for the gates come from Pillow's uint8
+    histogram, so no float64 copy of the image is made.
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+TARGET_SIZE = (224, 224)
+_RESAMPLE_FILTERS = {
+    'nearest': Image.NEAREST,
+    'bilinear': Image.BILINEAR,
+    'bicubic': Image.BICUBIC,
+    'lanczos': Image.LANCZOS,
+}
+_RESAMPLE_NAME = os.environ.get('PREPROCESS_RESAMPLE', 'bicubic').lower()
+if _RESAMPLE_NAME not in _RESAMPLE_FILTERS:
+    _RESAMPLE_NAME = 'bicubic'
+PREPROCESS_RESAMPLE = _RESAMPLE_FILTERS[_RESAMPLE_NAME]
+PREPROCESS_DRAFT = os.environ.get('PREPROCESS_DRAFT', 'false').lower() == 'true'
+PREPROCESS_REDUCING_GAP = float(os.environ.get('PREPROCESS_REDUCING_GAP', '0')) or None
+
+# Names the settings that change the model input; part of the prediction cache key
+PIPELINE_VERSION = (
+    f"{_RESAMPLE_NAME}{'-draft' if PREPROCESS_DRAFT else ''}"
+    f"{f'-gap{PREPROCESS_REDUCING_GAP:g}' if PREPROCESS_REDUCING_GAP else ''}"
+)
+
+_SCALE = np.float32(255.0)
+_LEVELS = np.arange(256, dtype=np.float64)
+_local = threading.local()
+
+
+def _thread_buffer():
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = np.empty((1,) + TARGET_SIZE[::-1] + (3,), dtype=np.float32)
+        _local.buffer = buffer
+    return buffer
+
+
+class PreprocessedImage:
+    """Model input plus the statistics the quality gates need"""
+
+    def __init__(self, array, brightness, contrast):
+        self.array = array            # (1, 224, 224, 3) float32 in [0, 1]
+        self.brightness = brightness  # mean pixel value in [0, 1]
+        self.contrast = contrast      # pixel standard deviation in [0, 1]
+
+
+def load_resized(image_file, size=TARGET_SIZE):
+    """Decode and resize to an RGB PIL image of the target size"""
+    image = Image.open(image_file)
+    if PREPROCESS_DRAFT and image.format == 'JPEG':
+        image.draft('RGB', size)
+    image = image.convert('RGB')
+    if image.size != size:
+        image = image.resize(size, resample=PREPROCESS_RESAMPLE, reducing_gap=PREPROCESS_REDUCING_GAP)
+    return image
+
+
+def pixel_stats(image):
+    """(mean, std) of all RGB values scaled to [0, 1], from Pillow's histogram"""
+    histogram = np.asarray(image.histogram(), dtype=np.float64).reshape(-1, 256)
+    counts = histogram.sum(axis=0)
+    total = counts.sum()
+    mean = float(counts @ _LEVELS) / total
+    var = float(counts @ (_LEVELS * _LEVELS)) / total - mean * mean
+    return mean / 255.0, (max(var, 0.0) ** 0.5) / 255.0
+
+
+def preprocess(image_file, out=None):
+    """Decode, resize and scale one image.
+
+    out is an optional float32 array of shape (1, 224, 224, 3) or
+    (224, 224, 3) to write into. Without it, a per-thread buffer is reused,
+    so the result is only valid until the same thread preprocesses again.
+    """
+    image = load_resized(image_file)
+    pixels = np.asarray(image)
+    if out is None:
+        out = _thread_buffer()
+    np.divide(pixels, _SCALE, out=out.reshape(pixels.shape), casting='unsafe')
+    brightness, contrast = pixel_stats(image)
+    array = out if out.ndim == 4 else out[np.newaxis]
+    return PreprocessedImage(array, brightness, contrast)
+
+
+def legacy_preprocess(image_file):
+    """The original pipeline from predict(), kept for benchmarking"""
+    image = Image.open(image_file)
+    image = image.convert('RGB')
+    image = image.resize(TARGET_SIZE)
+    image_array = np.array(image) / 255.0
+    image_array = np.expand_dims(image_array, axis=0)
+    return image_array, float(np.mean(image_array)), float(np.std(image_array))
+
+
+def benchmark(paths, runs=10):
+    """Per-image time and peak traced memory of the legacy vs new pipeline.
+
+    tracemalloc sees Python and numpy allocations; Pillow's decoder buffers
+    are not traced, so draft-mode savings show up in the timings.
+
+    Returns {'legacy': {...}, 'lean': {...}, 'max_abs_diff': float}.
+    """
+    def measure(fn):
+        timings = []
+        peak = 0
+        for _ in range(runs):
+            for path in paths:
+                tracemalloc.start()
+                started = time.perf_counter()
+                fn(path)
+                timings.append((time.perf_counter() - started) * 1000)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+        return {
+            'ms_p50': round(float(np.percentile(timings, 50)), 2),
+            'ms_p95': round(float(np.percentile(timings, 95)), 2),
+            'peak_kb': round(peak / 1024, 1)
+        }
+
+    results = {
+        'legacy': measure(legacy_preprocess),
+        'lean': measure(lambda p: preprocess(p))
+    }
+    results['max_abs_diff'] = max(
+        float(np.max(np.abs(legacy_preprocess(p)[0] - preprocess(p).array))) for p in paths
+    )
+    return results
@@ -0,0 +1,122 @@
+"""
+Hatchly per-user read cache
+
+The read endpoints (locations, prawns, predictions, dashboard) are cached
+per user and validated by a per-user data version:
+
+  - Every mutating route bumps the user's version after it runs.
+  - A read's ETag is derived from the version and the request path, so an
+    unchanged If-None-Match is answered with 304 without touching MySQL.
+  - Otherwise the JSON body cached for (user, path, version) is served, or
+    the route runs and its body is stored under the version read *before*
+    the query. A write that lands during the query bumps the version, so
+    that body is never served as current.
+
+Versions live in small files under READ_CACHE_DIR, which all gunicorn
+workers on the host share, so a write in one worker invalidates the others
+at once. Response bodies are kept in a bounded in-process LRU per worker.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+READ_CACHE_DIR = os.environ.get('READ_CACHE_DIR', 'instance/read_cache')
+READ_CACHE_SIZE = int(os.environ.get('READ_CACHE_SIZE', '1024'))
+READ_CACHE_TTL = float(os.environ.get('READ_CACHE_TTL', '300'))
+
+
+class ReadCache:
+    """Version-validated LRU of JSON response bodies, keyed per user"""
+
+    def __init__(self, directory=READ_CACHE_DIR, max_entries=READ_CACHE_SIZE, ttl=READ_CACHE_TTL):
+        self.directory = directory
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bumps = 0
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+            'stores': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _version_path(self, user_id):
+        return os.path.join(self.directory, f'user_{int(user_id)}.version')
+
+    def version(self, user_id):
+        """The user's current data version, shared by every worker"""
+        try:
+            with open(self._version_path(user_id), 'r') as f:
+                version = f.read()
+            if version:
+                return version
+        except OSError:
+            pass
+        return self.bump(user_id)
+
+    def bump(self, user_id):
+        """Start a new data version for the user, invalidating their cached reads"""
+        with self._lock:
+            self._bumps += 1
+            version = f'{time.time_ns():x}.{os.getpid():x}.{self._bumps:x}'
+            self.counters['invalidations'] += 1
+        path = self._version_path(user_id)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, path)
+        return version
+
+    @staticmethod
+    def etag(version, key):
+        return hashlib.sha1(f'{version}|{key}'.encode()).hexdigest()
+
+    def get(self, user_id, key, version):
+        """Cached body for this version, or None"""
+        now = time.time()
+        cache_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == version and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(cache_key)
+                self.counters['hits'] += 1
+                return entry[2]
+            self.counters['misses'] += 1
+            return None
+
+    def set(self, user_id, key, version, body):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            cache_key = (user_id, key)
+            self._entries[cache_key] = (version, time.time(), body)
+            self._entries.move_to_end(cache_key)
+            self.counters['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def not_modified(self):
+        with self._lock:
+            self.counters['not_modified'] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            size = len(self._entries)
+        lookups = counters['hits'] + counters['misses'] + counters['not_modified']
+        return {
+            'entries': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hit_rate': round((counters['hits'] + counters['not_modified']) / lookups, 3) if lookups else 0.0,
+            **counters
+        }
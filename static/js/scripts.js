@@ -24,6 +24,15 @@ let isNavigating    = false;
 const LOGS_PER_PAGE = 5;
 let currentLogsPage = 1;
 let currentFilteredLogs = [];
+let liveEvents        = null;
+let liveEventsRetry   = null;
+let liveNeedsResync   = false;
+let dashboardReloadTimer = null;
+// Step-up token from the last password check; lets further deletes skip the password
+let stepUpToken       = null;
+let stepUpExpiresAt   = 0;
+// Caches kept current by live events, so navigation can skip the re-fetch
+let liveSynced        = { prawns: false, logsPrawnId: null };
 
 // ============================================
 // NAVIGATION LOCK
@@ -66,6 +75,8 @@ function _clearLocalSession() {
     currentUserId = null;
     selectedPrawn = null;
     updatePrawnBadge(null);
+    stopLiveUpdates();
+    _clearStepUp();
 }
 
 // ============================================
@@ -117,6 +128,7 @@ function _restoreSession(savedUser, savedUserId) {
     const savedPage = localStorage.getItem('hatchly_current_page');
     showPage(savedPage || 'dashboardPage');
     updateUserName();
+    startLiveUpdates();
 }
 
 function updateUserName() {
@@ -204,7 +216,11 @@ function _renderPage(pageId) {
     // Page-specific init
     switch (pageId) {
         case 'selectPrawnPage':
-            loadPrawnList();
+            if (liveSynced.prawns) {
+                loadLocationFilterDropdown().then(filterPrawnsByLocation);
+            } else {
+                loadPrawnList();
+            }
             break;
         case 'capturePage':
             updateSelectedPrawnInfo();
@@ -223,7 +239,11 @@ function _renderPage(pageId) {
             updateSelectedPrawnInfo();
             if (selectedPrawn) {
                 document.getElementById('prawnNameTitle').textContent = `"${selectedPrawn.name}"`;
-                loadPrawnHistory();
+                if (String(liveSynced.logsPrawnId) === String(selectedPrawn.id)) {
+                    showCachedHistory();
+                } else {
+                    loadPrawnHistory();
+                }
             } else {
                 showPage('selectPrawnPage');
                 return;
@@ -367,6 +387,7 @@ async function handleLogin() {
             showPage('dashboardPage');
             navigationHistory = ['dashboardPage'];
             updateUserName();
+            startLiveUpdates();
         } else {
             document.getElementById('loginCredentialsError').classList.add('show');
             emailInput.classList.add('error-input');
@@ -461,6 +482,8 @@ async function handleSignup() {
 async function handleLogout() {
     try {
         await fetch('/api/logout', { method: 'POST' });
+        stopLiveUpdates();
+        _clearStepUp();
 
         // Clear all local storage
         ['hatchly_current_user','hatchly_current_user_id','hatchly_user_name',
@@ -606,8 +629,9 @@ async function loadPrawnList() {
         const result   = await response.json();
         if (result.success) {
             allPrawnsCache = result.prawns;
+            liveSynced.prawns = isLiveUpdating();
             await loadLocationFilterDropdown();
-            renderPrawnList(allPrawnsCache);
+            filterPrawnsByLocation();
         } else {
             container.innerHTML = '<div class="no-prawns">Failed to load prawns.</div>';
         }
@@ -623,6 +647,7 @@ async function loadLocationFilterDropdown() {
     try {
         const response = await fetch('/api/get_locations');
         const result   = await response.json();
+        const previous = select.value;
         select.innerHTML = '<option value="">All Prawns</option>';
         if (result.success && result.locations.length > 0) {
             result.locations.forEach(loc => {
@@ -632,6 +657,8 @@ async function loadLocationFilterDropdown() {
                 select.appendChild(option);
             });
         }
+        // Keep the chosen filter when the list is refreshed by a live update
+        if ([...select.options].some(o => o.value === previous)) select.value = previous;
     } catch (error) {
         console.error('Load location filter error:', error);
     }
@@ -739,11 +766,34 @@ async function handleSavePrawn() {
 }
 
 // — Delete Prawn
+function _hasStepUp() {
+    // Keep a margin so the token does not expire on the way to the server
+    return !!stepUpToken && Date.now() < stepUpExpiresAt - 10000;
+}
+
+function _saveStepUp(result) {
+    if (!result.step_up_token) return;
+    stepUpToken     = result.step_up_token;
+    stepUpExpiresAt = Date.now() + (result.step_up_expires_in || result.expires_in || 0) * 1000;
+}
+
+function _clearStepUp() {
+    stepUpToken     = null;
+    stepUpExpiresAt = 0;
+}
+
+function _showDeletePasswordField(show) {
+    const field = document.getElementById('deleteConfirmPassword').closest('.form-group');
+    if (field) field.style.display = show ? '' : 'none';
+}
+
 function showDeleteModal(prawn) {
     selectedPrawn = prawn;
     document.getElementById('deletePrawnName').textContent = prawn.name;
     document.getElementById('deleteConfirmPassword').value = '';
     document.getElementById('deletePasswordError').classList.remove('show');
+    // Password was confirmed a moment ago; the step-up token covers this delete
+    _showDeletePasswordField(!_hasStepUp());
     document.getElementById('deletePrawnModal').style.display = 'block';
 }
 
@@ -754,7 +804,9 @@ function closeDeleteModal(event) {
 
 async function confirmDeletePrawn() {
     const password = document.getElementById('deleteConfirmPassword').value;
-    if (!password) {
+    const useToken = !password && _hasStepUp();
+    if (!password && !useToken) {
+        _showDeletePasswordField(true);
         document.getElementById('deletePasswordError').textContent = 'Please enter your password';
         document.getElementById('deletePasswordError').classList.add('show');
         shakeInput(document.getElementById('deleteConfirmPassword'));
@@ -765,14 +817,23 @@ async function confirmDeletePrawn() {
         const response = await fetch('/api/delete_prawn', {
             method:  'POST',
             headers: { 'Content-Type': 'application/json' },
-            body:    JSON.stringify({ user_id: currentUserId, prawn_id: selectedPrawn.id, password })
+            body:    JSON.stringify(useToken
+                ? { user_id: currentUserId, prawn_id: selectedPrawn.id, step_up_token: stepUpToken }
+                : { user_id: currentUserId, prawn_id: selectedPrawn.id, password })
         });
         const result = await response.json();
 
         if (result.success) {
+            _saveStepUp(result);
             showToast(`Prawn "${selectedPrawn.name}" deleted successfully`, 'success');
             closeDeleteModal();
             loadPrawnList();
+        } else if (useToken && result.step_up_required) {
+            // Token expired or the password changed; ask for the password again
+            _clearStepUp();
+            _showDeletePasswordField(true);
+            document.getElementById('deletePasswordError').textContent = 'Please enter your password to confirm';
+            document.getElementById('deletePasswordError').classList.add('show');
         } else {
             document.getElementById('deletePasswordError').textContent = result.message;
             document.getElementById('deletePasswordError').classList.add('show');
@@ -909,10 +970,12 @@ async function predictHatchDate() {
     _createPredictTryAgainBtn();
 
     try {
-        const response = await fetch('/api/predict', {
+        // Send the image as a raw binary body instead of base64 JSON
+        const imageBlob = await dataUrlToBlob(capturedImageData);
+        const response  = await fetch('/api/predict', {
             method:  'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body:    JSON.stringify({ image: capturedImageData })
+            headers: { 'Content-Type': imageBlob.type || 'application/octet-stream' },
+            body:    imageBlob
         });
         const result = await response.json();
 
@@ -935,7 +998,8 @@ async function predictHatchDate() {
         loadingSpinner.style.display = 'none';
         resultContent.style.display  = 'block';
 
-        await savePrediction(selectedPrawn, capturedImageData, daysUntilHatch, confidence, currentDay);
+        await savePrediction(selectedPrawn, capturedImageData, daysUntilHatch, confidence, currentDay,
+                             result.prediction_token);
         localStorage.setItem('hatchly_prediction_days',       daysUntilHatch);
         localStorage.setItem('hatchly_prediction_confidence', confidence);
 
@@ -948,6 +1012,11 @@ async function predictHatchDate() {
     }
 }
 
+async function dataUrlToBlob(dataUrl) {
+    const response = await fetch(dataUrl);
+    return response.blob();
+}
+
 function _createPredictTryAgainBtn() {
     if (document.getElementById('predictTryAgainBtn')) return;
     const predictBtn = document.getElementById('predictBtn');
@@ -975,20 +1044,33 @@ function _createPredictTryAgainBtn() {
     document.getElementById('predictBtnGroup').insertBefore(btn, predictBtn.nextSibling);
 }
 
-async function savePrediction(prawn, imageData, days, confidence, currentDay = null) {
+async function savePrediction(prawn, imageData, days, confidence, currentDay = null, predictionToken = null) {
     try {
+        // The server already holds the image and result from /api/predict
+        if (predictionToken) {
+            const response = await fetch('/api/save_prediction', {
+                method:  'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body:    JSON.stringify({
+                    prawn_id:         prawn ? prawn.id : null,
+                    prediction_token: predictionToken
+                })
+            });
+            const result = await response.json();
+            if (!result.success) console.error('Failed to save prediction:', result.message);
+            return;
+        }
+
+        const formData = new FormData();
+        if (prawn) formData.append('prawn_id', prawn.id);
+        formData.append('predicted_days', days);
+        if (currentDay !== null) formData.append('current_day', currentDay);
+        formData.append('confidence', confidence);
+        if (imageData) formData.append('image', await dataUrlToBlob(imageData), 'prediction.jpg');
+
         const response = await fetch('/api/save_prediction', {
-            method:  'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body:    JSON.stringify({
-                user_id:       currentUserId,
-                prawn_id:      prawn ? prawn.id   : null,
-                prawn_name:    prawn ? prawn.name : 'Unknown',
-                image_path:    imageData,
-                predicted_days: days,
-                current_day:   currentDay,
-                confidence
-            })
+            method: 'POST',
+            body:   formData
         });
         const result = await response.json();
         if (!result.success) console.error('Failed to save prediction:', result.message);
@@ -1021,11 +1103,12 @@ async function loadPrawnHistory() {
         const result   = await response.json();
 
         if (result.success) {
+            allLogsCache = result.predictions;
+            liveSynced.logsPrawnId = isLiveUpdating() ? selectedPrawn.id : null;
             if (result.predictions.length === 0) {
                 logsContainer.innerHTML = '<div class="no-logs">No logs available for this prawn yet.</div>';
                 return;
             }
-            allLogsCache = result.predictions;
             renderHistoryLogs(allLogsCache);
         } else {
             logsContainer.innerHTML = '<div class="no-logs">Failed to load history.</div>';
@@ -1036,6 +1119,18 @@ async function loadPrawnHistory() {
     }
 }
 
+function showCachedHistory() {
+    const logsContainer = document.getElementById('logsContainer');
+    if (!logsContainer) return;
+    if (allLogsCache.length === 0) {
+        logsContainer.innerHTML = '<div class="no-logs">No logs available for this prawn yet.</div>';
+        document.getElementById('logsCountText')?.remove();
+        document.getElementById('loadMoreBtn')?.remove();
+        return;
+    }
+    filterHistoryLogs();
+}
+
 function renderHistoryLogs(predictions) {
     const logsContainer = document.getElementById('logsContainer');
     if (!logsContainer) return;
@@ -1073,7 +1168,7 @@ function renderLogsBatch(container, predictions, page) {
                 <p><strong>Status:</strong> ${log.predicted_days} Days before egg hatching</p>
             </div>
             <div class="log-image-preview" onclick="openImageModal('/static/${log.image_path}')">
-                <img src="/static/${log.image_path}" alt="Prawn Image">
+                <img src="/static/${log.thumbnail_path || log.image_path}" alt="Prawn Image" loading="lazy">
             </div>
             <button class="delete-log-btn" onclick="deleteLogEntry(${log.id}, this)">🗑️</button>
         `;
@@ -1152,11 +1247,236 @@ async function deleteLogEntry(predictionId, btnEl) {
     }, 'error');
 }
 
+// ============================================
+// LIVE UPDATES (Server-Sent Events from /api/events)
+// ============================================
+function isLiveUpdating() {
+    return !!liveEvents && liveEvents.readyState === EventSource.OPEN;
+}
+
+function _activePageId() {
+    return document.querySelector('.page.active')?.id || null;
+}
+
+function startLiveUpdates() {
+    if (liveEvents || !currentUser || typeof EventSource === 'undefined') return;
+    clearTimeout(liveEventsRetry);
+    liveEvents = new EventSource('/api/events');
+
+    const handlers = {
+        'prawn.created':       _livePrawnCreated,
+        'prawn.updated':       _livePrawnUpdated,
+        'prawn.deleted':       _livePrawnDeleted,
+        'prawns.updated':      _livePrawnsUpdated,
+        'prawns.deleted':      _livePrawnsDeleted,
+        'prediction.created':  _livePredictionCreated,
+        'predictions.created': _livePredictionsCreated,
+        'prediction.deleted':  _livePredictionDeleted,
+        'predictions.deleted': _livePredictionsDeleted,
+        'location.created':    _liveLocationChanged,
+        'location.updated':    _liveLocationChanged,
+        'location.deleted':    _liveLocationChanged,
+        'resync':              _liveResync
+    };
+    Object.entries(handlers).forEach(([name, handler]) => {
+        liveEvents.addEventListener(name, event => {
+            try {
+                handler(JSON.parse(event.data));
+            } catch (error) {
+                console.error(`Live update (${name}) error:`, error);
+            }
+        });
+    });
+
+    liveEvents.onopen = () => {
+        // A fresh EventSource cannot resume by id, so reload what is on screen
+        if (liveNeedsResync) {
+            liveNeedsResync = false;
+            _liveResync();
+        }
+    };
+    liveEvents.onerror = () => {
+        // Events may be missed until the stream is back; stop trusting caches
+        liveSynced = { prawns: false, logsPrawnId: null };
+        if (liveEvents && liveEvents.readyState === EventSource.CLOSED) {
+            // The server refused the stream (e.g. 503); the browser will not retry itself
+            liveEvents = null;
+            liveNeedsResync = true;
+            liveEventsRetry = setTimeout(startLiveUpdates, 30000);
+        }
+    };
+}
+
+function stopLiveUpdates() {
+    clearTimeout(liveEventsRetry);
+    clearTimeout(dashboardReloadTimer);
+    if (liveEvents) liveEvents.close();
+    liveEvents      = null;
+    liveNeedsResync = false;
+    liveSynced      = { prawns: false, logsPrawnId: null };
+}
+
+function _scheduleDashboardReload() {
+    if (_activePageId() !== 'dashboardPage') return;
+    clearTimeout(dashboardReloadTimer);
+    dashboardReloadTimer = setTimeout(() => loadDashboard(false), 1000);
+}
+
+function _rerenderPrawnList() {
+    if (_activePageId() === 'selectPrawnPage') filterPrawnsByLocation();
+}
+
+function _rerenderHistory(prawnId) {
+    if (_activePageId() !== 'historyPage' || !selectedPrawn) return;
+    if (String(selectedPrawn.id) !== String(prawnId)) return;
+    showCachedHistory();
+}
+
+function _livePrawnCreated(prawn) {
+    if (!allPrawnsCache.some(p => String(p.id) === String(prawn.id))) {
+        allPrawnsCache.unshift(prawn);
+    }
+    _rerenderPrawnList();
+    _scheduleDashboardReload();
+}
+
+function _livePrawnUpdated(change) {
+    _patchPrawn(change);
+    _rerenderPrawnList();
+    _scheduleDashboardReload();
+}
+
+function _patchPrawn(change) {
+    const prawn = allPrawnsCache.find(p => String(p.id) === String(change.id));
+    if (prawn) Object.assign(prawn, change, { id: prawn.id });
+    if (selectedPrawn && String(selectedPrawn.id) === String(change.id)) {
+        Object.assign(selectedPrawn, change, { id: selectedPrawn.id });
+        localStorage.setItem('hatchly_selected_prawn', JSON.stringify(selectedPrawn));
+        updateSelectedPrawnInfo();
+        const title = document.getElementById('prawnNameTitle');
+        if (title && _activePageId() === 'historyPage') title.textContent = `"${selectedPrawn.name}"`;
+    }
+}
+
+function _livePrawnDeleted(change) {
+    allPrawnsCache = allPrawnsCache.filter(p => String(p.id) !== String(change.id));
+    if (selectedPrawn && String(selectedPrawn.id) === String(change.id)) {
+        if (String(liveSynced.logsPrawnId) === String(change.id)) liveSynced.logsPrawnId = null;
+        const prawnPages = ['imageSelectionPage', 'capturePage', 'predictPage', 'historyPage'];
+        if (prawnPages.includes(_activePageId())) {
+            showToast(`Prawn "${selectedPrawn.name}" was deleted.`, 'warning');
+            selectedPrawn = null;
+            localStorage.removeItem('hatchly_selected_prawn');
+            updatePrawnBadge(null);
+            showPage('selectPrawnPage');
+            return;
+        }
+    }
+    _rerenderPrawnList();
+    _scheduleDashboardReload();
+}
+
+function _livePrawnsUpdated(change) {
+    // Bulk move: {ids, location_id, location_name}; bulk rename: {names: {id: name}}
+    if (change.names) {
+        Object.entries(change.names).forEach(([id, name]) => _patchPrawn({ id, name }));
+    } else {
+        change.ids.forEach(id => _patchPrawn({
+            id, location_id: change.location_id, location_name: change.location_name
+        }));
+    }
+    _rerenderPrawnList();
+    _scheduleDashboardReload();
+}
+
+function _livePrawnsDeleted(change) {
+    const ids = change.ids.map(String);
+    if (selectedPrawn && ids.includes(String(selectedPrawn.id))) {
+        // Same handling as a single delete for the prawn on screen
+        _livePrawnDeleted({ id: selectedPrawn.id });
+    }
+    allPrawnsCache = allPrawnsCache.filter(p => !ids.includes(String(p.id)));
+    _rerenderPrawnList();
+    _scheduleDashboardReload();
+}
+
+function _livePredictionCreated(prediction) {
+    if (String(liveSynced.logsPrawnId) === String(prediction.prawn_id)
+            && !allLogsCache.some(l => String(l.id) === String(prediction.id))) {
+        allLogsCache.unshift(prediction);
+        _rerenderHistory(prediction.prawn_id);
+    }
+    _scheduleDashboardReload();
+}
+
+function _livePredictionsCreated(change) {
+    // Batch saves carry no rows; reload the history if it shows one of the prawns
+    const affected = change.prawn_ids.map(String);
+    if (liveSynced.logsPrawnId !== null && affected.includes(String(liveSynced.logsPrawnId))) {
+        liveSynced.logsPrawnId = null;
+        if (_activePageId() === 'historyPage' && selectedPrawn
+                && affected.includes(String(selectedPrawn.id))) {
+            loadPrawnHistory();
+        }
+    }
+    _scheduleDashboardReload();
+}
+
+function _livePredictionDeleted(change) {
+    const before = allLogsCache.length;
+    allLogsCache = allLogsCache.filter(l => String(l.id) !== String(change.id));
+    if (allLogsCache.length !== before) _rerenderHistory(change.prawn_id);
+    _scheduleDashboardReload();
+}
+
+function _livePredictionsDeleted(change) {
+    const ids = change.predictions.map(p => String(p.id));
+    const before = allLogsCache.length;
+    allLogsCache = allLogsCache.filter(l => !ids.includes(String(l.id)));
+    if (allLogsCache.length !== before && selectedPrawn) _rerenderHistory(selectedPrawn.id);
+    _scheduleDashboardReload();
+}
+
+function _liveLocationChanged(location) {
+    // A deleted location's prawns may have moved to location.reassigned_to
+    const patch = location.reassigned_to
+        ? { location_id: location.reassigned_to.id, location_name: location.reassigned_to.name }
+        : (location.name !== undefined ? { location_name: location.name } : null);
+    if (patch) {
+        allPrawnsCache.forEach(p => {
+            if (String(p.location_id) === String(location.id)) Object.assign(p, patch);
+        });
+        if (selectedPrawn && String(selectedPrawn.location_id) === String(location.id)) {
+            Object.assign(selectedPrawn, patch);
+            localStorage.setItem('hatchly_selected_prawn', JSON.stringify(selectedPrawn));
+            updateSelectedPrawnInfo();
+        }
+    }
+    switch (_activePageId()) {
+        case 'locationSetupPage': loadLocationList();            break;
+        case 'registerPrawnPage': loadLocationDropdown();        break;
+        case 'selectPrawnPage':
+            loadLocationFilterDropdown().then(filterPrawnsByLocation);
+            break;
+    }
+    _scheduleDashboardReload();
+}
+
+function _liveResync() {
+    liveSynced = { prawns: false, logsPrawnId: null };
+    switch (_activePageId()) {
+        case 'selectPrawnPage':   loadPrawnList();       break;
+        case 'historyPage':       if (selectedPrawn) loadPrawnHistory(); break;
+        case 'locationSetupPage': loadLocationList();    break;
+        case 'dashboardPage':     loadDashboard(false);  break;
+    }
+}
+
 // ============================================
 // DASHBOARD
 // ============================================
-async function loadDashboard() {
-    showDashboardLoading(true);
+async function loadDashboard(showLoading = true) {
+    if (showLoading) showDashboardLoading(true);
     try {
         const response = await fetch('/api/get_dashboard_data');
         const result   = await response.json();
@@ -1286,7 +1606,7 @@ function renderLatestPredictions(predictions) {
             if (prawn) { selectPrawnForImage(prawn); showHistoryPage(); }
         };
         card.innerHTML = `
-            <img src="/static/${item.image_path}" alt="Prawn prediction" class="prediction-image"
+            <img src="/static/${item.thumbnail_path || item.image_path}" alt="Prawn prediction" class="prediction-image"
                 onerror="this.src='data:image/svg+xml,%3Csvg xmlns=\\'http://www.w3.org/2000/svg\\' width=\\'200\\' height=\\'200\\'%3E%3Crect fill=\\'%23ddd\\' width=\\'200\\' height=\\'200\\'/%3E%3Ctext x=\\'50%25\\' y=\\'50%25\\' text-anchor=\\'middle\\' fill=\\'%23999\\' font-size=\\'14\\'%3ENo Image%3C/text%3E%3C/svg%3E'">
             <div class="prediction-details">
                 <h4>${item.prawn_name}</h4>
@@ -1895,6 +2215,8 @@ async function handleDeleteLocation(locationId, locationName) {
                     });
                     const delResult = await delResponse.json();
                     if (delResult.success) { loadLocationList(); showToast('Location deleted.', 'success'); }
+                    // Prawns were added meanwhile — ask where to move them
+                    else if (delResult.reassign_required) _showReassignModal(locationId, locationName, delResult.prawn_count);
                     else showToast(delResult.message || 'Failed to delete location.', 'error');
                 } catch (error) { showToast('Cannot connect to server.', 'error'); }
             }, 'error');
@@ -1902,34 +2224,38 @@ async function handleDeleteLocation(locationId, locationName) {
         }
 
         // Has prawns — show reassign modal
-        deletingLocationId   = locationId;
-        deletingLocationName = locationName;
-        document.getElementById('reassignPrawnCount').textContent = affectedPrawns.length;
-        document.getElementById('reassignLocationError').classList.remove('show');
-
-        const select     = document.getElementById('reassignLocationSelect');
-        select.innerHTML = '<option value="">-- Select Location --</option>';
-        try {
-            const locResponse = await fetch('/api/get_locations');
-            const locResult   = await locResponse.json();
-            if (locResult.success) {
-                locResult.locations
-                    .filter(loc => String(loc.id) !== String(locationId))
-                    .forEach(loc => {
-                        const option       = document.createElement('option');
-                        option.value       = loc.id;
-                        option.textContent = loc.name;
-                        select.appendChild(option);
-                    });
-            }
-        } catch (e) { console.error(e); }
-
-        document.getElementById('reassignLocationModal').style.display = 'block';
+        await _showReassignModal(locationId, locationName, affectedPrawns.length);
     } catch (error) {
         showToast('Cannot connect to server.', 'error');
     }
 }
 
+async function _showReassignModal(locationId, locationName, prawnCount) {
+    deletingLocationId   = locationId;
+    deletingLocationName = locationName;
+    document.getElementById('reassignPrawnCount').textContent = prawnCount;
+    document.getElementById('reassignLocationError').classList.remove('show');
+
+    const select     = document.getElementById('reassignLocationSelect');
+    select.innerHTML = '<option value="">-- Select Location --</option>';
+    try {
+        const locResponse = await fetch('/api/get_locations');
+        const locResult   = await locResponse.json();
+        if (locResult.success) {
+            locResult.locations
+                .filter(loc => String(loc.id) !== String(locationId))
+                .forEach(loc => {
+                    const option       = document.createElement('option');
+                    option.value       = loc.id;
+                    option.textContent = loc.name;
+                    select.appendChild(option);
+                });
+        }
+    } catch (e) { console.error(e); }
+
+    document.getElementById('reassignLocationModal').style.display = 'block';
+}
+
 function closeReassignModal(event) {
     if (event) event.stopPropagation();
     document.getElementById('reassignLocationModal').style.display = 'none';
@@ -1944,29 +2270,18 @@ async function confirmReassignAndDelete() {
     if (!newLocationId) { err.classList.add('show'); return; }
 
     try {
-        const response       = await fetch(`/api/get_prawns?user_id=${currentUserId}`);
-        const result         = await response.json();
-        const affectedPrawns = result.prawns.filter(p => String(p.location_id) === String(deletingLocationId));
-
-        for (const prawn of affectedPrawns) {
-            await fetch('/api/transfer_prawn', {
-                method:  'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body:    JSON.stringify({ prawn_id: prawn.id, new_location_id: newLocationId })
-            });
-        }
-
+        // Moves the prawns and deletes the location in one transaction
         const delResponse = await fetch('/api/delete_location', {
             method:  'POST',
             headers: { 'Content-Type': 'application/json' },
-            body:    JSON.stringify({ location_id: deletingLocationId })
+            body:    JSON.stringify({ location_id: deletingLocationId, reassign_location_id: newLocationId })
         });
         const delResult = await delResponse.json();
 
         if (delResult.success) {
             closeReassignModal();
             loadLocationList();
-            showToast(`Location deleted. ${affectedPrawns.length} prawn(s) transferred.`, 'success');
+            showToast(`Location deleted. ${delResult.prawns_moved} prawn(s) transferred.`, 'success');
         } else {
             showToast(delResult.message || 'Failed to delete location.', 'error');
         }
@@ -0,0 +1,68 @@
+import time
+from types import SimpleNamespace
+
+import camera_client
+from camera_client import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def breaker(monkeypatch, threshold=3, reset_after=30):
+    clock = Clock()
+    # Only this module's clock; time.monotonic itself stays real
+    monkeypatch.setattr(camera_client, 'time', SimpleNamespace(monotonic=clock, time=time.time, sleep=time.sleep))
+    return CircuitBreaker(threshold=threshold, reset_after=reset_after), clock
+
+
+def test_opens_after_consecutive_failures(monkeypatch):
+    cb, _ = breaker(monkeypatch)
+    cb.record_failure()
+    cb.record_failure()
+    assert cb.state == 'closed' and cb.allow()
+
+    cb.record_failure()
+
+    assert cb.state == 'open'
+    assert not cb.allow()
+    assert cb.stats()['opened'] == 1 and cb.stats()['rejected'] == 1
+
+
+def test_success_resets_the_failure_count(monkeypatch):
+    cb, _ = breaker(monkeypatch)
+    cb.record_failure()
+    cb.record_failure()
+    cb.record_success()
+    cb.record_failure()
+
+    assert cb.state == 'closed'
+
+
+def test_half_open_lets_one_trial_through(monkeypatch):
+    cb, clock = breaker(monkeypatch, threshold=1)
+    cb.record_failure()
+    clock.now += 30
+
+    assert cb.state == 'half_open'
+    assert cb.allow()
+    assert not cb.allow()
+
+
+def test_trial_success_closes_and_failure_reopens(monkeypatch):
+    cb, clock = breaker(monkeypatch, threshold=1)
+    cb.record_failure()
+    clock.now += 30
+    cb.allow()
+    cb.record_failure()
+    assert cb.state == 'open'
+    assert cb.stats()['opened'] == 1
+
+    clock.now += 30
+    cb.allow()
+    cb.record_success()
+    assert cb.state == 'closed' and cb.allow()
@@ -0,0 +1,48 @@
+import camera_stream
+from camera_stream import FrameParser, open_stream
+
+FRAME_A = b'\xff\xd8' + b'a' * 10 + b'\xff\xd9'
+FRAME_B = b'\xff\xd8' + b'b' * 10 + b'\xff\xd9'
+
+
+def test_frames_split_across_chunks():
+    parser = FrameParser()
+    stream = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + FRAME_A + b'\r\n--frame\r\n' + FRAME_B
+
+    frames = []
+    for i in range(0, len(stream), 5):
+        frames += parser.feed(stream[i:i + 5])
+
+    assert frames == [FRAME_A, FRAME_B]
+
+
+def test_several_frames_in_one_chunk_oldest_first():
+    assert FrameParser().feed(FRAME_A + b'junk' + FRAME_B) == [FRAME_A, FRAME_B]
+
+
+def test_marker_split_between_chunks():
+    parser = FrameParser()
+
+    assert parser.feed(b'xxx\xff') == []
+    assert parser.feed(FRAME_A[1:]) == [FRAME_A]
+
+
+def test_runaway_frame_is_dropped(monkeypatch):
+    monkeypatch.setattr(camera_stream, '_MAX_FRAME_BYTES', 64)
+    parser = FrameParser()
+
+    assert parser.feed(b'\xff\xd8' + b'x' * 100) == []
+    assert parser.feed(FRAME_B) == [FRAME_B]
+
+
+def test_viewer_limit_per_worker():
+    first = open_stream('http://camera.invalid/video_feed', max_viewers=1)
+    try:
+        assert first is not None
+        assert open_stream('http://other.invalid/video_feed', max_viewers=1) is None
+    finally:
+        first.close()
+    second = open_stream('http://camera.invalid/video_feed', max_viewers=1)
+    assert second is not None
+    second.close()
+    assert camera_stream.viewer_stats()['viewers'] == 0
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+import event_broker
+from event_broker import EventBroker, EventTooLarge
+
+
+def make_broker(tmp_path, **kwargs):
+    kwargs.setdefault('poll_interval', 0.005)
+    kwargs.setdefault('stream_seconds', 0.05)
+    kwargs.setdefault('heartbeat', 60)
+    return EventBroker(directory=str(tmp_path), **kwargs)
+
+
+def read_stream(broker, user_id, last_event_id=None):
+    """[(event, id, data)] sent on one stream until it times out"""
+    subscription = broker.subscribe(user_id, last_event_id)
+    try:
+        body = b''.join(subscription)
+    finally:
+        subscription.close()
+    events = []
+    for block in body.decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+        if 'event' in fields:
+            events.append((fields['event'], fields['id'], fields['data']))
+    return events
+
+
+def journal_start(broker, user_id):
+    return f'{os.stat(broker._path(user_id)).st_ino}-0'
+
+
+def test_resume_after_last_event_id(tmp_path):
+    broker = make_broker(tmp_path)
+    for n in range(3):
+        broker.publish(1, 'prawn.updated', {'n': n})
+
+    events = read_stream(broker, 1, journal_start(broker, 1))
+    assert [data for _, _, data in events] == ['{"n":0}', '{"n":1}', '{"n":2}']
+
+    resumed = read_stream(broker, 1, events[0][1])
+    assert [data for _, _, data in resumed] == ['{"n":1}', '{"n":2}']
+
+
+def test_new_stream_starts_at_the_end(tmp_path):
+    broker = make_broker(tmp_path)
+    broker.publish(1, 'prawn.updated', {'n': 0})
+
+    assert read_stream(broker, 1) == []
+
+
+def test_rotation_keeps_events_readable_from_old_journal(tmp_path):
+    broker = make_broker(tmp_path, max_bytes=120)
+    broker.publish(1, 'prawn.updated', {'n': 0})
+    start = journal_start(broker, 1)
+    for n in range(1, 4):
+        broker.publish(1, 'prawn.updated', {'n': n})
+
+    assert broker.stats()['rotations'] >= 1
+    assert os.path.exists(broker._path(1) + '.old')
+    events = read_stream(broker, 1, start)
+    assert [data for _, _, data in events][-1] == '{"n":3}'
+
+
+def test_unknown_event_id_gets_resync(tmp_path):
+    broker = make_broker(tmp_path)
+    broker.publish(1, 'prawn.updated', {'n': 0})
+
+    events = read_stream(broker, 1, '1-0')
+    assert [event for event, _, _ in events] == ['resync']
+    assert broker.stats()['resyncs'] == 1
+
+
+def test_oversized_event_is_rejected_without_rotating(tmp_path):
+    broker = make_broker(tmp_path, max_bytes=64)
+
+    with pytest.raises(EventTooLarge):
+        broker.publish(1, 'prawn.updated', {'notes': 'x' * 200})
+
+    stats = broker.stats()
+    assert stats['rotations'] == 0
+    assert stats['rejected'] == 1
+    broker.publish(1, 'prawn.updated', {'n': 1})
+    assert broker.stats()['published'] == 1
+
+
+def test_event_filling_an_empty_journal_is_written(tmp_path, monkeypatch):
+    # A fixed clock keeps both lines the same length
+    monkeypatch.setattr(event_broker.time, 'time', lambda: 1700000000.123)
+    broker = make_broker(tmp_path, max_bytes=10_000)
+    probe = make_broker(tmp_path / 'probe')
+    probe.publish(1, 'e', {'pad': ''})
+    overhead = os.path.getsize(probe._path(1))
+    broker.max_bytes = overhead + 40
+
+    broker.publish(1, 'e', {'pad': 'x' * 40})
+
+    assert broker.stats()['rotations'] == 0
+    assert os.path.getsize(broker._path(1)) == broker.max_bytes
+
+
+def test_stream_limit_per_worker(tmp_path):
+    broker = make_broker(tmp_path, max_streams=1)
+    first = broker.subscribe(1)
+
+    assert broker.subscribe(1) is None
+    first.close()
+    assert broker.subscribe(1) is not None
@@ -0,0 +1,136 @@
+import io
+import zipfile
+
+import pytest
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+import image_upload
+from image_upload import (
+    ImageUpload, UploadError, read_bulk_images, read_stream, sniff_image_type
+)
+
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 60
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 60
+
+
+def multipart_request(data):
+    return Request(EnvironBuilder(method='POST', data=data).get_environ())
+
+
+def zip_request(entries, compression=zipfile.ZIP_STORED):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', compression) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+    archive.seek(0)
+    return multipart_request({'archive': (archive, 'round.zip')})
+
+
+@pytest.mark.parametrize('head, expected', [
+    (JPEG, 'image/jpeg'),
+    (PNG, 'image/png'),
+    (b'GIF89a' + b'\x00' * 10, 'image/gif'),
+    (b'RIFF\x00\x00\x00\x00WEBPVP8 ', 'image/webp'),
+    (b'%PDF-1.7', None),
+])
+def test_sniff_image_type(head, expected):
+    assert sniff_image_type(head[:16]) == expected
+
+
+def test_read_stream_hashes_what_it_reads():
+    upload = read_stream(io.BytesIO(PNG))
+
+    assert (upload.size, upload.content_type) == (len(PNG), 'image/png')
+    assert upload.sha256 == ImageUpload.from_bytes(PNG).sha256
+    assert upload.open().read() == PNG
+
+
+def test_read_stream_rejects_non_images_and_oversized_bodies():
+    with pytest.raises(UploadError) as error:
+        read_stream(io.BytesIO(b'not an image at all'))
+    assert error.value.status == 415
+
+    with pytest.raises(UploadError) as error:
+        read_stream(io.BytesIO(JPEG), max_bytes=16)
+    assert error.value.status == 413
+
+    with pytest.raises(UploadError) as error:
+        read_stream(io.BytesIO(JPEG), content_length=10_000, max_bytes=100)
+    assert error.value.status == 413
+
+
+def test_read_stream_empty_body():
+    assert read_stream(io.BytesIO(b'')) is None
+
+
+def test_bulk_multipart_fields():
+    items = read_bulk_images(multipart_request({
+        'image_7': (io.BytesIO(JPEG), 'a.jpg'),
+        'image_x': (io.BytesIO(JPEG), 'b.jpg'),
+        'notes': 'ignored',
+    }))
+
+    assert [(item.prawn_id, item.error) for item in items] == [
+        (7, None), (None, 'Cannot tell which prawn this image belongs to.')
+    ]
+
+
+def test_bulk_zip_names_and_per_item_errors():
+    items = read_bulk_images(zip_request([
+        ('3/first.jpg', JPEG),
+        ('4_second.png', PNG),
+        ('5.jpg', b'plain text'),
+        ('__MACOSX/3/._first.jpg', JPEG),
+        ('.DS_Store', b'x'),
+    ]))
+
+    assert [(item.prawn_id, item.filename) for item in items] == [
+        (3, '3/first.jpg'), (4, '4_second.png'), (5, '5.jpg')
+    ]
+    assert items[0].upload.content_type == 'image/jpeg'
+    assert items[1].upload.content_type == 'image/png'
+    assert items[2].upload is None and 'Unsupported image format' in items[2].error
+
+
+def test_bulk_zip_image_count_limit():
+    with pytest.raises(UploadError) as error:
+        read_bulk_images(zip_request([(f'{n}.jpg', JPEG) for n in range(3)]), max_images=2)
+    assert error.value.status == 413
+
+
+def test_bulk_zip_declared_total_over_budget_is_rejected_before_reading(monkeypatch):
+    request = zip_request([(f'{n}.jpg', JPEG + b'\x00' * 1000) for n in range(4)],
+                          zipfile.ZIP_DEFLATED)
+    opened = []
+    monkeypatch.setattr(zipfile.ZipFile, 'open', lambda self, *args, **kwargs: opened.append(args))
+
+    with pytest.raises(UploadError) as error:
+        read_bulk_images(request, max_bytes=2000)
+    assert error.value.status == 413
+    assert opened == []
+
+
+def test_bulk_zip_decompressed_bytes_count_against_budget():
+    budget = {'remaining': 100}
+    stream = image_upload._BudgetedStream(io.BytesIO(b'x' * 150), budget)
+
+    assert len(stream.read(64)) == 64
+    with pytest.raises(image_upload._OverBudget):
+        stream.read(64)
+
+
+def test_bulk_zip_oversized_entry_is_reported_on_its_item(monkeypatch):
+    monkeypatch.setattr(image_upload, 'IMAGE_UPLOAD_MAX_BYTES', 100)
+    items = read_bulk_images(zip_request([('1.jpg', JPEG), ('2.jpg', JPEG + b'\x00' * 200)]))
+
+    assert items[0].error is None
+    assert items[1].error == 'Image is too large.'
+
+
+def test_bulk_requires_multipart():
+    request = Request(EnvironBuilder(method='POST', data=JPEG, content_type='image/jpeg').get_environ())
+
+    with pytest.raises(UploadError) as error:
+        read_bulk_images(request)
+    assert error.value.status == 415
@@ -0,0 +1,103 @@
+import threading
+
+import numpy as np
+import pytest
+
+from inference import InferenceEngine
+
+
+def image(value):
+    """A tiny (1, 2, 2, 3) 'image' whose pixels all equal value"""
+    return np.full((1, 2, 2, 3), value, dtype=np.float32)
+
+
+def gate_by_pixel(calls):
+    # Confidence is the image's pixel value
+    def binary_fn(batch):
+        calls.append(len(batch))
+        return batch.reshape(len(batch), -1)[:, :1]
+    return binary_fn
+
+
+def days_by_pixel(calls):
+    def regression_fn(batch):
+        calls.append(len(batch))
+        return batch.reshape(len(batch), -1)[:, :1] * 10
+    return regression_fn
+
+
+def test_infer_batch_chunks_and_gates():
+    binary_calls, regression_calls = [], []
+    engine = InferenceEngine(gate_by_pixel(binary_calls), days_by_pixel(regression_calls),
+                             gate_threshold=0.7, max_batch_size=2)
+    images = np.concatenate([image(v) for v in (0.9, 0.1, 0.8, 0.75, 0.2)])
+
+    results = engine.infer_batch(images)
+
+    assert binary_calls == [2, 2, 1]
+    # Only images that passed the gate reach the regressor
+    assert regression_calls == [1, 2]
+    assert [days is not None for _, days in results] == [True, False, True, True, False]
+    assert results[0] == pytest.approx((0.9, 9.0))
+    assert engine.stats()['total_items'] == 5
+
+
+def test_missing_or_broken_gate_lets_images_through():
+    def broken(batch):
+        raise RuntimeError('gate exploded')
+
+    for binary_fn in (lambda batch: None, broken):
+        engine = InferenceEngine(binary_fn, days_by_pixel([]), max_batch_size=4)
+        results = engine.infer_batch(np.concatenate([image(0.1), image(0.2)]))
+        assert [confidence for confidence, _ in results] == [1.0, 1.0]
+        assert all(days is not None for _, days in results)
+
+
+def test_fused_output_is_gated_and_falls_back_when_unavailable():
+    def fused(batch):
+        flat = batch.reshape(len(batch), -1)[:, :1]
+        return flat, flat * 100
+
+    engine = InferenceEngine(gate_by_pixel([]), days_by_pixel([]), gate_threshold=0.5,
+                             max_batch_size=4, fused_fn=fused)
+    results = engine.infer_batch(np.concatenate([image(0.9), image(0.2)]))
+    assert results[0] == pytest.approx((0.9, 90.0))
+    assert results[1][1] is None
+
+    engine.fused_fn = lambda batch: None
+    assert engine.infer_batch(image(0.9))[0] == pytest.approx((0.9, 9.0))
+
+
+def test_concurrent_requests_share_a_batch():
+    binary_calls = []
+    engine = InferenceEngine(gate_by_pixel(binary_calls), days_by_pixel([]),
+                             gate_threshold=0.0, max_batch_size=4, max_wait_ms=500)
+    start = threading.Barrier(4)
+    results = {}
+
+    def request(value):
+        start.wait()
+        results[value] = engine.infer(image(value), timeout=5)
+
+    threads = [threading.Thread(target=request, args=(v,)) for v in (0.1, 0.2, 0.3, 0.4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every caller gets its own image's result back
+    for value, (confidence, days) in results.items():
+        assert confidence == pytest.approx(value)
+        assert days == pytest.approx(value * 10)
+    assert sum(binary_calls) == 4
+    assert len(binary_calls) < 4
+
+
+def test_model_errors_reach_the_caller():
+    def failing(batch):
+        raise ValueError('bad weights')
+
+    engine = InferenceEngine(lambda batch: None, failing, max_wait_ms=0)
+
+    with pytest.raises(ValueError):
+        engine.infer(image(0.9), timeout=5)
@@ -0,0 +1,88 @@
+import json
+import os
+
+from metrics import Registry
+
+
+def registry(tmp_path, enabled=True):
+    return Registry(directory=str(tmp_path), flush_interval=3600, enabled=enabled)
+
+
+def test_render_counters_and_cumulative_histograms(tmp_path):
+    reg = registry(tmp_path)
+    requests = reg.counter('hatchly_requests_total', 'Requests', ('route',))
+    latency = reg.histogram('hatchly_request_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    requests.inc(route='/api/predict')
+    requests.inc(2, route='/api/predict')
+    latency.observe(0.05, route='/a')
+    latency.observe(0.5, route='/a')
+    latency.observe(5.0, route='/a')
+
+    text = reg.render()
+
+    assert '# TYPE hatchly_requests_total counter' in text
+    assert 'hatchly_requests_total{route="/api/predict"} 3' in text
+    assert 'hatchly_request_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'hatchly_request_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'hatchly_request_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'hatchly_request_seconds_count{route="/a"} 3' in text
+    assert 'hatchly_request_seconds_sum{route="/a"} 5.55' in text
+
+
+def test_label_values_are_escaped(tmp_path):
+    reg = registry(tmp_path)
+    reg.counter('c', 'Help', ('reason',)).inc(reason='say "hi"\n')
+
+    assert 'c{reason="say \\"hi\\"\\n"} 1' in reg.render()
+
+
+def test_merge_sums_counters_and_histogram_buckets():
+    total = Registry._merge({}, {'c': [[['a'], 1]], 'h': [[['a'], [1, 0, 0.5]]]})
+    Registry._merge(total, {'c': [[['a'], 2], [['b'], 5]], 'h': [[['a'], [0, 1, 2.0]]]})
+
+    assert total['c'] == {('a',): 3, ('b',): 5}
+    assert total['h'] == {('a',): [1, 1, 2.5]}
+
+
+def test_collect_sums_every_process_snapshot(tmp_path):
+    reg = registry(tmp_path)
+    counter = reg.counter('c', 'Help')
+    counter.inc(4)
+    # Another live process (the parent) with its own snapshot
+    with open(reg._path(os.getppid()), 'w') as f:
+        json.dump({'pid': os.getppid(), 'values': {'c': [[[], 6]]}}, f)
+
+    assert reg.collect()['c'] == {(): 10}
+    assert os.path.exists(reg._path(os.getppid()))
+
+
+def test_retire_folds_an_exited_process_into_the_archive(tmp_path):
+    reg = registry(tmp_path)
+    for pid, value in ((999991, 2), (999992, 3)):
+        with open(reg._path(pid), 'w') as f:
+            json.dump({'pid': pid, 'values': {'c': [[[], value]]}}, f)
+
+    reg.retire(999991)
+    reg.retire(999992)
+    reg.retire(999992)
+
+    assert not os.path.exists(reg._path(999991))
+    assert Registry._read(os.path.join(tmp_path, 'archive.json')) == {'c': [[[], 5]]}
+    assert reg.collect()['c'] == {(): 5}
+
+
+def test_clear_forgets_everything(tmp_path):
+    reg = registry(tmp_path)
+    reg.counter('c', 'Help').inc()
+    reg.flush()
+
+    reg.clear()
+
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.json')] == []
+
+
+def test_disabled_registry_records_nothing(tmp_path):
+    reg = registry(tmp_path / 'off', enabled=False)
+    reg.counter('c', 'Help').inc()
+
+    assert not os.path.exists(tmp_path / 'off')
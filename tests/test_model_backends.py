@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from model_backends import _as_output_list, _output_order
+
+
+def keras_model(names, shapes):
+    return SimpleNamespace(
+        output_names=names,
+        outputs=[SimpleNamespace(shape=(None,) + shape) for shape in shapes]
+    )
+
+
+def details(**shapes):
+    return {name: {'shape': np.array((1,) + shape)} for name, shape in shapes.items()}
+
+
+def test_outputs_matched_by_name():
+    model = keras_model(['gate', 'days'], [(1,), (1,)])
+
+    assert _output_order(details(days=(1,), gate=(1,)), model) == ['gate', 'days']
+
+
+def test_converter_numbering_keeps_keras_order():
+    model = keras_model(['dense_3', 'dense_7'], [(1,), (1,)])
+
+    order = _output_order(details(output_1=(1,), output_0=(1,)), model)
+    assert order == ['output_0', 'output_1']
+
+
+def test_numbering_past_nine_sorts_numerically():
+    names = [f'head_{i}' for i in range(11)]
+    model = keras_model(names, [(1,)] * 11)
+
+    order = _output_order(details(**{f'output_{i}': (1,) for i in range(11)}), model)
+    assert order == [f'output_{i}' for i in range(11)]
+
+
+def test_distinct_shapes_are_matched_by_shape():
+    model = keras_model(['gate', 'days'], [(1,), (3,)])
+
+    assert _output_order(details(b=(1,), a=(3,)), model) == ['b', 'a']
+
+
+def test_unmatchable_outputs_fail_loudly():
+    model = keras_model(['gate', 'days'], [(1,), (1,)])
+
+    with pytest.raises(ValueError):
+        _output_order(details(StatefulPartitionedCall_0=(1,), StatefulPartitionedCall_1=(1,)), model)
+
+
+def test_single_output():
+    model = keras_model(['days'], [(1,)])
+
+    assert _output_order(details(anything=(1,)), model) == ['anything']
+
+
+def test_as_output_list_wraps_single_arrays():
+    outputs = _as_output_list(np.zeros((2, 1)))
+
+    assert len(outputs) == 1 and outputs[0].shape == (2, 1)
+
+
+def test_dict_outputs_follow_output_names():
+    outputs = _as_output_list({'days': np.ones(1), 'gate': np.zeros(1)}, ['gate', 'days'])
+
+    assert [o[0] for o in outputs] == [0.0, 1.0]
+    with pytest.raises(ValueError):
+        _as_output_list({'a': np.ones(1)}, ['gate'])
@@ -0,0 +1,65 @@
+import base64
+from datetime import datetime
+
+import pytest
+
+from pagination import PageRequest, decode_cursor, encode_cursor, page_request
+
+CREATED = datetime(2026, 3, 1, 8, 30, 15)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(CREATED, 42)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (CREATED, 42)
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64 at all!',
+    base64.urlsafe_b64encode(b'2026-03-01T08:30:15').decode(),
+    base64.urlsafe_b64encode(b'2026-03-01T08:30:15|x').decode(),
+    base64.urlsafe_b64encode(b'yesterday|42').decode(),
+    base64.urlsafe_b64encode(b'2026-03-01|1|2').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe|1').decode(),
+])
+def test_malformed_or_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_truncated_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(CREATED, 42)[:-6])
+
+
+def test_page_request_is_opt_in_and_clamps_limit():
+    assert page_request({}) is None
+
+    first = page_request({'cursor': ''})
+    assert first.after is None
+
+    assert page_request({'cursor': '', 'limit': '0'}).limit == 1
+    assert page_request({'cursor': '', 'limit': '100000'}).limit == 200
+    with pytest.raises(ValueError):
+        page_request({'cursor': '', 'limit': 'ten'})
+    with pytest.raises(ValueError):
+        page_request({'cursor': 'garbage!'})
+
+
+def test_page_after_cursor_uses_keyset_condition():
+    page = page_request({'cursor': encode_cursor(CREATED, 42), 'limit': '10'})
+
+    where, params = page.where('p')
+    assert where == ' AND (p.created_at < %s OR (p.created_at = %s AND p.id < %s))'
+    assert params == (CREATED, CREATED, 42)
+    assert page.order_limit('p') == ' ORDER BY p.created_at DESC, p.id DESC LIMIT 11'
+
+
+def test_split_returns_next_cursor_only_when_more_rows_follow():
+    rows = [{'id': n, 'created_at': CREATED} for n in (5, 4, 3)]
+
+    assert PageRequest(limit=3).split(rows) == (rows, None)
+    page, next_cursor = PageRequest(limit=2).split(rows)
+    assert page == rows[:2]
+    assert decode_cursor(next_cursor) == (CREATED, 4)
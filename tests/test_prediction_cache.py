@@ -0,0 +1,39 @@
+import os
+
+from prediction_cache import PredictionCache, _DISK_SWEEP_EVERY
+
+
+def test_memory_only_cache_survives_sweep_interval():
+    cache = PredictionCache(max_entries=16, ttl=60, disk_dir='')
+    writes = _DISK_SWEEP_EVERY * 2 + 1
+    for i in range(writes):
+        cache.set(f'v1-{i:064x}', {'success': True, 'days_until_hatch': i % 21})
+
+    assert cache.stats()['stores'] == writes
+    assert cache.get(f'v1-{writes - 1:064x}') == ({'success': True, 'days_until_hatch': (writes - 1) % 21}, 200)
+
+
+def test_disk_sweep_removes_expired_entries(tmp_path):
+    cache = PredictionCache(max_entries=0, ttl=-1, disk_dir=str(tmp_path))
+    for i in range(_DISK_SWEEP_EVERY):
+        cache.set(f'v1-{i:064x}', {'success': True})
+
+    assert [name for _, _, files in os.walk(tmp_path) for name in files] == []
+
+
+def test_key_depends_on_model_and_preprocessing():
+    digest = 'ab' * 32
+    key = PredictionCache.key_for_digest(digest, 'm1', 'bicubic')
+
+    assert key.endswith(digest)
+    assert key != PredictionCache.key_for_digest(digest, 'm2', 'bicubic')
+    assert key != PredictionCache.key_for_digest(digest, 'm1', 'bilinear-draft')
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    key = PredictionCache.key_for_digest('cd' * 32, 'm1', 'bicubic')
+    PredictionCache(max_entries=0, ttl=60, disk_dir=str(tmp_path)).set(key, {'success': True})
+
+    other = PredictionCache(max_entries=0, ttl=60, disk_dir=str(tmp_path))
+    assert other.get(key) == ({'success': True}, 200)
+    assert other.get(PredictionCache.key_for_digest('cd' * 32, 'm1', 'bilinear')) is None
@@ -0,0 +1,39 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from preprocessing import legacy_preprocess, preprocess
+
+
+def photo(fmt, size=(1200, 900)):
+    rng = np.random.default_rng(7)
+    gradient = np.linspace(0, 255, size[0], dtype=np.float64)[np.newaxis, :, np.newaxis]
+    pixels = np.clip(gradient + rng.normal(0, 20, (size[1], size[0], 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('fmt', ['JPEG', 'PNG'])
+def test_default_pipeline_matches_the_original(fmt):
+    data = photo(fmt)
+    legacy, legacy_mean, legacy_std = legacy_preprocess(io.BytesIO(data))
+
+    prepared = preprocess(io.BytesIO(data))
+
+    assert prepared.array.shape == (1, 224, 224, 3)
+    assert prepared.array.dtype == np.float32
+    assert float(np.max(np.abs(prepared.array - legacy))) < 1e-6
+    assert prepared.brightness == pytest.approx(legacy_mean, abs=1e-6)
+    assert prepared.contrast == pytest.approx(legacy_std, abs=1e-6)
+
+
+def test_writes_into_a_caller_buffer():
+    batch = np.zeros((2, 224, 224, 3), dtype=np.float32)
+
+    preprocess(io.BytesIO(photo('PNG')), out=batch[1])
+
+    assert not batch[0].any()
+    assert batch[1].max() <= 1.0 and batch[1].any()
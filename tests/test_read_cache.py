@@ -0,0 +1,65 @@
+from read_cache import ReadCache
+
+
+def test_version_is_stable_until_bumped(tmp_path):
+    cache = ReadCache(directory=str(tmp_path))
+    version = cache.version(1)
+
+    assert cache.version(1) == version
+    assert cache.bump(1) != version
+    assert cache.version(1) != version
+
+
+def test_versions_are_shared_through_the_directory(tmp_path):
+    worker_a = ReadCache(directory=str(tmp_path))
+    worker_b = ReadCache(directory=str(tmp_path))
+    version = worker_a.version(1)
+
+    assert worker_b.version(1) == version
+    worker_b.bump(1)
+    assert worker_a.version(1) != version
+
+
+def test_versions_are_per_user(tmp_path):
+    cache = ReadCache(directory=str(tmp_path))
+    other = cache.version(2)
+    cache.bump(1)
+
+    assert cache.version(2) == other
+
+
+def test_body_is_served_only_for_its_version(tmp_path):
+    cache = ReadCache(directory=str(tmp_path))
+    version = cache.version(1)
+    cache.set(1, '/api/get_prawns', version, b'{"prawns":[]}')
+
+    assert cache.get(1, '/api/get_prawns', version) == b'{"prawns":[]}'
+    assert cache.get(2, '/api/get_prawns', version) is None
+    assert cache.get(1, '/api/get_prawns', cache.bump(1)) is None
+
+
+def test_expired_body_is_not_served(tmp_path):
+    cache = ReadCache(directory=str(tmp_path), ttl=-1)
+    version = cache.version(1)
+    cache.set(1, '/api/get_prawns', version, b'{}')
+
+    assert cache.get(1, '/api/get_prawns', version) is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = ReadCache(directory=str(tmp_path), max_entries=2)
+    version = cache.version(1)
+    cache.set(1, 'a', version, b'a')
+    cache.set(1, 'b', version, b'b')
+    cache.get(1, 'a', version)
+    cache.set(1, 'c', version, b'c')
+
+    assert cache.get(1, 'b', version) is None
+    assert cache.get(1, 'a', version) == b'a'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_etag_depends_on_version_and_key():
+    assert ReadCache.etag('v1', '/a') == ReadCache.etag('v1', '/a')
+    assert ReadCache.etag('v1', '/a') != ReadCache.etag('v2', '/a')
+    assert ReadCache.etag('v1', '/a') != ReadCache.etag('v1', '/b')
@@ -0,0 +1,338 @@
+"""
+Hatchly structured logs, request tracing and profiling
+
+Logs: configure_logging() sends every module's logging output to stderr as
+one JSON object per line (LOG_FORMAT=text for plain lines in development).
+A record written while a request is traced carries its trace_id.
+
+Tracing (TRACING_ENABLED): each request gets a trace, and span(name) blocks
+inside it record nested timings - database checkouts and statements, model
+calls, cache / journal / spool file I/O and JSON serialization. When the
+request ends the trace is logged as one 'request trace' record with all of
+its spans, if it took at least TRACE_SLOW_MS. Outside a trace span() returns
+a shared no-op context manager, so disabled tracing costs one ContextVar
+lookup per span.
+
+Profiling (PROFILE_REQUESTS):
+  - 'header': requests sending X-Hatchly-Profile: <PROFILE_TOKEN> are
+    profiled (ignored while PROFILE_TOKEN is unset)
+  - 'all': every request is profiled (local debugging only)
+PROFILE_KIND picks cProfile (.prof, open with pstats or snakeviz) or a
+sampling profiler that reads the request thread's stack every
+PROFILE_SAMPLE_INTERVAL seconds (.folded, for flamegraph.pl / speedscope).
+The sampler does not slow the profiled code down the way cProfile does.
+Files go to PROFILE_DIR; only the newest PROFILE_MAX_FILES are kept. One
+request per process is profiled at a time; others run normally.
+"""
+
+import cProfile
+import contextvars
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'false').lower() == 'true'
+TRACE_SLOW_MS = float(os.environ.get('TRACE_SLOW_MS', '0'))
+TRACE_MAX_SPANS = int(os.environ.get('TRACE_MAX_SPANS', '200'))
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', 'off').lower()
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_KIND = os.environ.get('PROFILE_KIND', 'cprofile').lower()
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'instance/profiles')
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', '0.005'))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '100'))
+
+PROFILE_HEADER = 'X-Hatchly-Profile'
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('hatchly_trace', default=None)
+NO_SPAN = nullcontext()
+
+
+# ------------------------------------------
+# Structured logs
+# ------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName
+        }
+        trace = _current.get()
+        if trace is not None:
+            entry['trace_id'] = trace.trace_id
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain lines for development, with any structured fields appended"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line = f"{line} {json.dumps(fields, separators=(',', ':'), default=str)}"
+        return line
+
+
+def configure_logging(log_format=LOG_FORMAT, level=LOG_LEVEL):
+    """Log to stderr unless the root logger was set up already"""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else TextFormatter())
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+# ------------------------------------------
+# Tracing
+# ------------------------------------------
+
+class _Span:
+    __slots__ = ('_trace', '_index', '_started')
+
+    def __init__(self, trace, index):
+        self._trace = trace
+        self._index = index
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._trace._open.append(self._index)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = self._trace
+        trace._open.pop()
+        span = trace.spans[self._index]
+        span['duration_ms'] = round((time.perf_counter() - self._started) * 1000, 3)
+        if exc_type is not None:
+            span['error'] = exc_type.__name__
+        return False
+
+
+class Trace:
+    """Spans recorded for one request, in start order"""
+
+    def __init__(self, attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+        self._open = []
+
+    def _add(self, name, started, attrs):
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return None
+        self.spans.append({
+            'id': len(self.spans),
+            'parent': self._open[-1] if self._open else None,
+            'name': name,
+            'start_ms': round((started - self.started) * 1000, 3),
+            **attrs
+        })
+        return len(self.spans) - 1
+
+    def span(self, name, attrs):
+        index = self._add(name, time.perf_counter(), attrs)
+        return NO_SPAN if index is None else _Span(self, index)
+
+    def record(self, name, seconds, attrs):
+        index = self._add(name, time.perf_counter() - seconds, attrs)
+        if index is not None:
+            self.spans[index]['duration_ms'] = round(seconds * 1000, 3)
+
+
+def span(name, **attrs):
+    """Context manager timing a block as a span of the current trace"""
+    trace = _current.get()
+    if trace is None:
+        return NO_SPAN
+    return trace.span(name, attrs)
+
+
+def record_span(name, seconds, **attrs):
+    """Add a span that has just finished and took `seconds`"""
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, seconds, attrs)
+
+
+def tracing_active():
+    return _current.get() is not None
+
+
+# ------------------------------------------
+# Profiling
+# ------------------------------------------
+
+class _CProfiler:
+    kind = 'cprofile'
+    suffix = '.prof'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self, path):
+        self._profile.disable()
+        self._profile.dump_stats(path)
+
+
+class _Sampler:
+    """Counts the request thread's stacks from a side thread"""
+    kind = 'sampling'
+    suffix = '.folded'
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._target = None
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, name='hatchly-profile-sampler', daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self._stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self, path):
+        self._stop.set()
+        self._thread.join()
+        with open(path, 'w') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+_PROFILERS = {'cprofile': _CProfiler, 'sampling': _Sampler}
+_profile_slot = threading.Lock()
+
+
+def _wants_profile(header_value):
+    if PROFILE_REQUESTS == 'all':
+        return True
+    if PROFILE_REQUESTS == 'header' and PROFILE_TOKEN and header_value:
+        return header_value == PROFILE_TOKEN
+    return False
+
+
+def _prune_profiles(directory, keep):
+    try:
+        entries = [os.path.join(directory, name) for name in os.listdir(directory)]
+        entries.sort(key=os.path.getmtime)
+    except OSError:
+        return
+    for path in entries[:max(0, len(entries) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ------------------------------------------
+# Requests
+# ------------------------------------------
+
+class RequestTrace:
+    """The trace and optional profiler of one request"""
+
+    def __init__(self, trace, profiler):
+        self.trace = trace
+        self.profiler = profiler
+        self.profile_file = None
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+
+def begin_request(method, path, profile_header=None):
+    """Start tracing (and maybe profiling) the current request; None if neither is on"""
+    profile = _wants_profile(profile_header)
+    if not (TRACING_ENABLED or profile):
+        return None
+    trace = Trace({'method': method, 'path': path})
+    _current.set(trace)
+    profiler = None
+    # One profiled request per process at a time; the rest run normally
+    if profile and _PROFILERS.get(PROFILE_KIND) and _profile_slot.acquire(blocking=False):
+        profiler = _PROFILERS[PROFILE_KIND]()
+        try:
+            profiler.start()
+        except Exception as e:
+            _profile_slot.release()
+            profiler = None
+            logger.warning('Profiler did not start: %s', e)
+    return RequestTrace(trace, profiler)
+
+
+def end_request(state, route, status):
+    """Stop the profiler, write its file and log the trace"""
+    trace = state.trace
+    if state.profiler is not None:
+        profiler, state.profiler = state.profiler, None
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{trace.trace_id}-{slug}{profiler.suffix}"
+            profiler.stop(os.path.join(PROFILE_DIR, name))
+            state.profile_file = name
+            _prune_profiles(PROFILE_DIR, PROFILE_MAX_FILES)
+        except Exception as e:
+            logger.warning('Profile not written: %s', e)
+        finally:
+            _profile_slot.release()
+
+    duration_ms = round((time.perf_counter() - trace.started) * 1000, 3)
+    if TRACING_ENABLED and duration_ms >= TRACE_SLOW_MS:
+        logger.info('request trace', extra={'fields': {
+            **trace.attrs,
+            'route': route,
+            'status': status,
+            'duration_ms': duration_ms,
+            'spans': trace.spans,
+            'spans_dropped': trace.dropped,
+            'profile_file': state.profile_file
+        }})
+    _current.set(None)